@@ -0,0 +1,304 @@
+"""
+Benchmark offline QuakeSee terhadap server pengganti lokal (standin_server).
+
+Skenario: catalog bulk fetch (ISC), event query (FDSN text), station search,
+waveform fetch serial dan paralel, merge, plot seismogram, dan ekspor.
+Setiap skenario melaporkan wall time, puncak RSS selama skenario, dan byte
+yang dipindahkan (respons server + keluaran ekspor).
+
+    python benchmarks/bench_offline.py --latency 0.05 --stations 100 --repeat 3
+    python benchmarks/bench_offline.py --json results.json --only waveform_parallel merge
+"""
+import argparse
+import datetime
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server  # noqa: E402
+
+
+def current_rss():
+    """RSS proses saat ini (byte)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RSSSampler:
+    """Mencatat puncak RSS selama blok berjalan (sampling di thread)"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class Context:
+    """Status bersama antar skenario (dibangun ulang untuk setiap ulangan)"""
+
+    def __init__(self, args):
+        from quakesee_web.wave_fetcher_web import WaveFetcherParam
+
+        self.args = args
+        self.wave = WaveFetcherParam()
+        # Tanpa prefetch spekulatif agar skenario station_search tetap dingin
+        self.wave.prefetch_check.value = False
+        self.wave.selected_quake = dict(time="2024-03-01T12:00:00", latitude=0.0, longitude=0.0,
+                                        depth=10.0, magnitude=6.0)
+        self.wave.channel.value = "HH?"
+        self.wave.min_radius.value = 0.0
+        self.wave.max_radius.value = args.radius
+        self.wave.start_offset.value = 0
+        self.wave.end_offset.value = args.window
+        self.wave.avail_check.value = False
+        self.wave.phase_check.value = False
+        self.output_bytes = 0
+
+
+def _wait_fetch(wave):
+    while wave.fetch_task is not None:
+        time.sleep(0.01)
+
+
+def scenario_catalog_bulk(ctx):
+    from quakesee_web.eqcat_fetcher_web import EQCatFetcherParam
+
+    eqcat = EQCatFetcherParam()
+    eqcat.start_date.value = datetime.date(2024, 1, 1)
+    eqcat.end_date.value = datetime.date(2024, 1, 1) + datetime.timedelta(days=ctx.args.days)
+    eqcat.step_days.value = 7
+    eqcat.rec_var.value = True
+    buffer = eqcat.download_catalog()
+    ctx.output_bytes += len(buffer.getvalue())
+
+
+def scenario_event_query(ctx):
+    ctx.wave.start_date.value = datetime.date(2024, 1, 1)
+    ctx.wave.end_date.value = datetime.date(2024, 1, 1) + datetime.timedelta(days=ctx.args.days)
+    ctx.wave.limit_check.value = True
+    ctx.wave.min_mag.value = 0.0
+    ctx.wave.page_days.value = 7
+    ctx.wave.fetch_earthquake_data(None)
+    _wait_fetch(ctx.wave)
+
+
+def scenario_station_search(ctx):
+    ctx.wave.seis_check.value = False
+    ctx.wave.rest_check.value = True
+    ctx.wave.search_stations(None)
+
+
+def _fetch_waveforms(ctx, wave_limit):
+    ctx.wave.seis_check.value = True
+    ctx.wave.rest_check.value = True
+    ctx.wave.merge_check.value = False
+    ctx.wave.wave_limit.value = wave_limit
+    ctx.wave.search_stations(None)
+
+
+def scenario_waveform_serial(ctx):
+    _fetch_waveforms(ctx, 0)
+
+
+def scenario_waveform_parallel(ctx):
+    _fetch_waveforms(ctx, -1)
+
+
+def scenario_merge(ctx):
+    from obspy import Stream
+
+    from quakesee_web.merge_engine import DEFAULT_MERGE, merge_stream
+
+    if ctx.wave.waveform_data is None:
+        _fetch_waveforms(ctx, -1)
+    # Pecah setiap trace menjadi potongan bertumpuk/bercelah agar merge bekerja penuh
+    st = Stream()
+    for tr in ctx.wave.waveform_data.to_stream():
+        step = tr.stats.npts // 10
+        for i in range(10):
+            piece = tr.copy()
+            piece.data = tr.data[i * step:(i + 1) * step + (5 if i % 2 else -5)].copy()
+            piece.stats.starttime = tr.stats.starttime + i * step * tr.stats.delta
+            st.append(piece)
+    merge_stream(st, **DEFAULT_MERGE)
+
+
+def scenario_merge_lazy(ctx):
+    from obspy import Stream
+
+    from quakesee_web.merge_engine import DEFAULT_MERGE, merge_stream
+    from quakesee_web.mseed_index import WaveformSpool
+
+    if ctx.wave.waveform_data is None:
+        _fetch_waveforms(ctx, -1)
+    # Jalur UI: hasil unduhan berupa LazyStream, merge per stasiun di pool proses
+    spool = WaveformSpool()
+    for station in ctx.wave.waveform_data.stations():
+        st = Stream()
+        for tr in ctx.wave.waveform_data.select(station=station):
+            step = tr.stats.npts // 10
+            for i in range(10):
+                piece = tr.copy()
+                piece.data = tr.data[i * step:(i + 1) * step + (5 if i % 2 else -5)].copy()
+                piece.stats.starttime = tr.stats.starttime + i * step * tr.stats.delta
+                st.append(piece)
+        spool.append(st)
+    merge_stream(spool.finalize(), **DEFAULT_MERGE)
+
+
+def scenario_seismogram_plot(ctx):
+    if ctx.wave.waveform_data is None:
+        _fetch_waveforms(ctx, -1)
+    ctx.wave.show_seismogram(None)
+    for _ in range(3):
+        ctx.wave.seis_next_button.clicks += 1
+
+
+def scenario_exports(ctx):
+    from quakesee_web.exporter import export_file, write_sac_zip
+
+    if ctx.wave.waveform_data is None:
+        _fetch_waveforms(ctx, -1)
+    for f in (export_file(ctx.wave.waveform_data, "MSEED"),
+              write_sac_zip(ctx.wave.waveform_data, compresslevel=1),
+              export_file(ctx.wave.inventory, "STATIONXML")):
+        f.seek(0, os.SEEK_END)
+        ctx.output_bytes += f.tell()
+        f.close()
+
+
+SCENARIOS = {
+    "catalog_bulk": scenario_catalog_bulk,
+    "event_query": scenario_event_query,
+    "station_search": scenario_station_search,
+    "waveform_serial": scenario_waveform_serial,
+    "waveform_parallel": scenario_waveform_parallel,
+    "merge": scenario_merge,
+    "merge_lazy": scenario_merge_lazy,
+    "seismogram_plot": scenario_seismogram_plot,
+    "exports": scenario_exports,
+}
+
+
+def clear_caches(ctx):
+    """
+    Mengosongkan cache tingkat proses dan sesi agar setiap skenario diukur
+    dingin: cache bersama, spektrum respons, tabel waktu tempuh dan hasil
+    decode LazyStream milik sesi.
+    """
+    from quakesee_web import processing, traveltime
+    from quakesee_web.shared_cache import get_shared_cache
+
+    get_shared_cache().clear()
+    with processing._RESPONSE_LOCK:
+        processing._RESPONSE_CACHE.clear()
+    processing.bandpass_sos.cache_clear()
+    processing.taper_window.cache_clear()
+    with traveltime._tables_lock:
+        traveltime._tables.clear()
+    for data in (ctx.wave.waveform_data, ctx.wave.raw_waveform_data, ctx.wave.waveform_cache):
+        if hasattr(data, "clear_cache"):
+            data.clear_cache()
+
+
+def run(args):
+    results = {name: [] for name in args.only}
+    saved = os.environ.get("XDG_CACHE_HOME")
+    try:
+        for _ in range(args.repeat):
+            # Tabel waktu tempuh di disk (~/.cache/quakesee) tidak terbawa antar ulangan
+            with tempfile.TemporaryDirectory(prefix="quakesee-bench-") as cache_home:
+                os.environ["XDG_CACHE_HOME"] = cache_home
+                run_once(args, results)
+    finally:
+        if saved is None:
+            os.environ.pop("XDG_CACHE_HOME", None)
+        else:
+            os.environ["XDG_CACHE_HOME"] = saved
+    return results
+
+
+def run_once(args, results):
+    ctx = Context(args)
+    for name in args.only:
+        clear_caches(ctx)
+        standin_server.reset_counters()
+        ctx.output_bytes = 0
+        with RSSSampler() as rss:
+            t0 = time.perf_counter()
+            SCENARIOS[name](ctx)
+            wall = time.perf_counter() - t0
+        results[name].append(dict(wall=wall, peak_rss=rss.peak,
+                                  bytes_in=standin_server.StandinHandler.bytes_sent,
+                                  requests=standin_server.StandinHandler.requests_served,
+                                  bytes_out=ctx.output_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="server delay per request (s)")
+    parser.add_argument("--stations", type=int, default=60, help="stations in the stand-in network")
+    parser.add_argument("--events-per-day", type=int, default=50)
+    parser.add_argument("--days", type=int, default=28, help="catalog time span (days)")
+    parser.add_argument("--radius", type=float, default=60.0, help="station search radius (deg)")
+    parser.add_argument("--window", type=int, default=600, help="waveform window length (s)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--json", help="write raw results to this file")
+    args = parser.parse_args()
+
+    config = standin_server.StandinConfig(latency=args.latency, events_per_day=args.events_per_day,
+                                          stations=args.stations)
+    server, url = standin_server.start_server(config)
+    # Harus diatur sebelum modul quakesee_web diimpor
+    os.environ["QUAKESEE_FDSN_URL"] = url
+    os.environ["QUAKESEE_ISC_URL"] = url + "/cgi-bin/web-db-run"
+
+    try:
+        results = run(args)
+    finally:
+        server.shutdown()
+
+    print(f"{'scenario':<20s} {'wall (s)':>10s} {'peak RSS (MB)':>14s} {'in (MB)':>9s} "
+          f"{'requests':>9s} {'out (MB)':>9s}")
+    for name, runs in results.items():
+        print(f"{name:<20s} {statistics.median(r['wall'] for r in runs):10.3f} "
+              f"{max(r['peak_rss'] for r in runs) / 2**20:14.1f} "
+              f"{statistics.median(r['bytes_in'] for r in runs) / 2**20:9.2f} "
+              f"{statistics.median(r['requests'] for r in runs):9.0f} "
+              f"{statistics.median(r['bytes_out'] for r in runs) / 2**20:9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(args=vars(args), results=results), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark skala jalur data UI tanpa browser.
+
+Data sintetis (benchmarks/fixtures.py) dengan ukuran bertingkat didorong
+melalui update_map, update_table, show_tm_plot, show_seismogram,
+update_record_section (stasiun = trace / 3, komponen Z), save_seisan_hyp2 (unduhan .hyp) dan convert_to_inventory (unggah CSV
+stasiun). Untuk setiap ukuran dicatat waktu dan ukuran payload yang akan
+dikirim ke browser (dokumen Bokeh terserialisasi, buffer biner dihitung
+per byte). Satu seri berhenti setelah langkah melebihi --budget detik.
+
+    python benchmarks/bench_scaling.py                 # skala kecil, cepat
+    python benchmarks/bench_scaling.py --scale large --budget 120 --json scaling.json
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures  # noqa: E402
+
+SCALES = {
+    "small": dict(events=[1_000, 10_000, 100_000], stations=[10, 1_000, 10_000], traces=[1_000]),
+    "medium": dict(events=[10_000, 100_000, 1_000_000], stations=[10, 1_000, 10_000, 50_000],
+                   traces=[1_000, 5_000]),
+    "large": dict(events=[10_000, 100_000, 1_000_000, 10_000_000], stations=[10, 1_000, 10_000, 50_000],
+                  traces=[1_000, 5_000, 10_000]),
+}
+
+
+def payload_size(viewable):
+    """Ukuran dokumen Bokeh untuk viewable (JSON + buffer biner)"""
+    from bokeh.document import Document
+
+    doc = Document()
+    doc.add_root(viewable.get_root(doc))
+
+    def default(obj):
+        if isinstance(obj, memoryview):
+            return "#" * obj.nbytes
+        if isinstance(obj, bytes):
+            return "#" * len(obj)
+        return str(obj)
+
+    return len(json.dumps(doc.to_json(), default=default))
+
+
+def new_fetcher():
+    from quakesee_web.wave_fetcher_web import WaveFetcherParam
+
+    return WaveFetcherParam()
+
+
+def _set_quietly(obj, **values):
+    """Mengisi param tanpa memicu watcher (agar tiap jalur diukur terpisah)"""
+    import param
+
+    with param.parameterized.discard_events(obj):
+        obj.param.update(**values)
+
+
+def bench_update_map(n):
+    wave = new_fetcher()
+    _set_quietly(wave, earthquake_data=fixtures.synthetic_catalog(n))
+    t0 = time.perf_counter()
+    wave.update_map()
+    return time.perf_counter() - t0, payload_size(wave.map_pane)
+
+
+def bench_update_table(n):
+    wave = new_fetcher()
+    _set_quietly(wave, earthquake_data=fixtures.synthetic_catalog(n))
+    t0 = time.perf_counter()
+    wave.update_table()
+    return time.perf_counter() - t0, payload_size(wave.table)
+
+
+def bench_show_tm_plot(n):
+    wave = new_fetcher()
+    _set_quietly(wave, earthquake_data=fixtures.synthetic_catalog(n))
+    t0 = time.perf_counter()
+    wave.show_tm_plot(None)
+    return time.perf_counter() - t0, payload_size(wave.tm_pane[0])
+
+
+def bench_show_seismogram(n):
+    wave = new_fetcher()
+    wave.waveform_data = fixtures.synthetic_lazy_stream(n)
+    t0 = time.perf_counter()
+    wave.show_seismogram(None)
+    return time.perf_counter() - t0, payload_size(wave.seis_pane[0])
+
+
+def bench_record_section(n):
+    wave = new_fetcher()
+    wave.waveform_data = fixtures.synthetic_lazy_stream(n)
+    # Stream sintetis hanya memakai jaringan XA
+    wave.inventory = fixtures.synthetic_inventory((n + 2) // 3, network_codes=("XA",))
+    _set_quietly(wave, selected_quake=dict(time="2024-01-01T00:00:00", latitude=0.0, longitude=0.0,
+                                           depth=10.0, magnitude=6.0))
+    t0 = time.perf_counter()
+    wave.show_record_section(None)
+    return time.perf_counter() - t0, payload_size(wave.section_pane[0])
+
+
+def bench_save_seisan_hyp2(n):
+    wave = new_fetcher()
+    _set_quietly(wave, station_data=fixtures.synthetic_station_data(n))
+    t0 = time.perf_counter()
+    buffer = wave.download_station_seisan_button.callback()
+    return time.perf_counter() - t0, len(buffer.getvalue())
+
+
+def bench_convert_to_inventory(n):
+    import param
+
+    wave = new_fetcher()
+    csv = io.BytesIO()
+    pd.DataFrame(fixtures.synthetic_station_data(n)).to_csv(csv, index=False)
+    t0 = time.perf_counter()
+    # Watcher station_data (peta/tabel) tidak ikut diukur
+    with param.parameterized.discard_events(wave):
+        wave.upload_station.value = csv.getvalue()
+    elapsed = time.perf_counter() - t0
+    assert sum(len(net) for net in wave.inventory) == n
+    return elapsed, csv.tell()
+
+
+PATHS = {
+    "update_map": ("events", bench_update_map),
+    "update_table": ("events", bench_update_table),
+    "show_tm_plot": ("events", bench_show_tm_plot),
+    "show_seismogram": ("traces", bench_show_seismogram),
+    "record_section": ("traces", bench_record_section),
+    "save_seisan_hyp2": ("stations", bench_save_seisan_hyp2),
+    "convert_to_inventory": ("stations", bench_convert_to_inventory),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--budget", type=float, default=60.0,
+                        help="stop a series once one step takes longer than this (s)")
+    parser.add_argument("--only", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--json", help="write raw results to this file")
+    args = parser.parse_args()
+
+    sizes = SCALES[args.scale]
+    results = {}
+    print(f"{'path':<22s} {'size':>10s} {'time (s)':>10s} {'payload (MB)':>13s}")
+    for name in args.only:
+        kind, func = PATHS[name]
+        results[name] = []
+        for n in sizes[kind]:
+            elapsed, payload = func(n)
+            results[name].append(dict(size=n, seconds=elapsed, payload=payload))
+            print(f"{name:<22s} {n:>10d} {elapsed:10.3f} {payload / 2**20:13.2f}", flush=True)
+            if elapsed > args.budget:
+                print(f"{name:<22s} stopped: over budget at {n} {kind}")
+                break
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(scale=args.scale, results=results), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
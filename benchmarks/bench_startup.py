@@ -0,0 +1,85 @@
+"""
+Benchmark waktu startup QuakeSee.
+
+Mengukur (1) impor dingin quakesee_web.app di proses baru, (2) pembuatan
+MainApp per sesi, dan (3) navigasi pertama ke tiap halaman.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLD_IMPORT = """
+import time
+t0 = time.perf_counter()
+import quakesee_web.app
+t1 = time.perf_counter()
+app = quakesee_web.app.MainApp()
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+class _Click:
+    """Pengganti event klik tombol untuk navigate_handler"""
+
+    def __init__(self, name):
+        self.obj = type("Button", (), {"name": name})()
+
+
+def cold_start(repeat):
+    imports, sessions = [], []
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", COLD_IMPORT], capture_output=True,
+                             text=True, env=env, check=True).stdout.split()
+        imports.append(float(out[-2]))
+        sessions.append(float(out[-1]))
+    return imports, sessions
+
+
+def warm_sessions(repeat):
+    from quakesee_web.app import MainApp
+
+    MainApp()  # impor modul halaman awal sudah terjadi
+    connect, navigate = [], {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        app = MainApp()
+        connect.append(time.perf_counter() - t0)
+        for page in app.frame_factories:
+            t0 = time.perf_counter()
+            app.navigate_handler(_Click(page))
+            navigate.setdefault(page, []).append(time.perf_counter() - t0)
+    return connect, navigate
+
+
+def report(name, values):
+    print(f"{name:<40s} median {statistics.median(values):8.4f} s   "
+          f"min {min(values):8.4f} s   max {max(values):8.4f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    imports, sessions = cold_start(args.repeat)
+    report("cold import quakesee_web.app", imports)
+    report("first session (cold)", sessions)
+
+    connect, navigate = warm_sessions(args.repeat)
+    report("new session (warm)", connect)
+    for page, values in navigate.items():
+        report(f"first navigation: {page}", values)
+
+
+if __name__ == "__main__":
+    main()
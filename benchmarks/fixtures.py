@@ -0,0 +1,138 @@
+"""
+Generator data sintetis skala besar untuk benchmark (tanpa jaringan).
+
+    synthetic_catalog(n)        katalog n event sebagai DataFrame kolom UI
+    synthetic_station_data(n)   daftar stasiun seperti WaveFetcherParam.station_data
+    synthetic_inventory(n)      obspy Inventory dengan n stasiun
+    synthetic_stream(n)         obspy Stream dengan n trace (3 kanal per stasiun)
+    synthetic_lazy_stream(n)    sama, sebagai LazyStream (seperti hasil unduhan)
+
+Semua generator deterministik untuk seed yang sama. Jalankan modul ini untuk
+menyimpan fixture ke disk:
+
+    python benchmarks/fixtures.py --out /tmp/quakesee_fixtures --events 1000000 --stations 50000
+"""
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_ALPHABET = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"))
+
+
+def station_codes(n):
+    """Kode stasiun unik maksimum 5 karakter (basis 36, diawali huruf)"""
+    idx = np.arange(n)
+    chars = [_ALPHABET[idx % 26]]
+    rest = idx // 26
+    for _ in range(3):
+        chars.append(_ALPHABET[rest % 36])
+        rest //= 36
+    return ["".join(c) for c in zip(*chars)]
+
+
+def synthetic_catalog(n, seed=0, start="2000-01-01", years=20):
+    """n event dengan kolom time, latitude, longitude, depth, magnitude, magnitude_type"""
+    rng = np.random.default_rng(seed)
+    t0 = np.datetime64(start, "ms").astype(np.int64)
+    span = int(years * 365.25 * 86400 * 1000)
+    times = np.sort(t0 + rng.integers(0, span, n))
+    return pd.DataFrame({
+        "time": pd.to_datetime(times, unit="ms", utc=True).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "latitude": np.round(rng.uniform(-60, 60, n), 4),
+        "longitude": np.round(rng.uniform(-180, 180, n), 4),
+        "depth": np.round(rng.exponential(30, n), 1),
+        # Gutenberg-Richter dengan b = 1 di atas M 2.5
+        "magnitude": np.round(2.5 + rng.exponential(1 / np.log(10), n), 1),
+        "magnitude_type": rng.choice(["mb", "Mw", "ML"], n),
+    })
+
+
+def synthetic_station_data(n, seed=0, networks=("XA", "XB", "XC", "XD")):
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({
+        "network": rng.choice(list(networks), n),
+        "station": station_codes(n),
+        "latitude": np.round(rng.uniform(-70, 70, n), 4),
+        "longitude": np.round(rng.uniform(-180, 180, n), 4),
+        "elevation": np.round(rng.uniform(0, 3000, n), 1),
+    }).to_dict(orient="records")
+
+
+def synthetic_inventory(n, seed=0, channels=("HHZ", "HHN", "HHE"), sampling_rate=100.0,
+                        network_codes=("XA", "XB", "XC", "XD")):
+    from obspy import UTCDateTime
+    from obspy.core.inventory import Channel, Inventory, Network, Station
+
+    start = UTCDateTime(2000, 1, 1)
+    networks = {}
+    for row in synthetic_station_data(n, seed, network_codes):
+        net = networks.get(row["network"])
+        if net is None:
+            net = networks[row["network"]] = Network(code=row["network"], start_date=start)
+        sta = Station(code=row["station"], latitude=row["latitude"], longitude=row["longitude"],
+                      elevation=row["elevation"], start_date=start)
+        for cha in channels:
+            sta.channels.append(Channel(code=cha, location_code="", latitude=row["latitude"],
+                                        longitude=row["longitude"], elevation=row["elevation"],
+                                        depth=0.0, start_date=start, sample_rate=sampling_rate))
+        net.stations.append(sta)
+    return Inventory(networks=list(networks.values()), source="quakesee synthetic")
+
+
+def synthetic_stream(n_traces, npts=3000, seed=0, sampling_rate=100.0, starttime="2024-01-01T00:00:00"):
+    """n_traces trace int32 (3 kanal per stasiun), sinyal sinus + derau"""
+    from obspy import Stream, Trace, UTCDateTime
+
+    rng = np.random.default_rng(seed + 2)
+    n_sta = (n_traces + 2) // 3
+    codes = station_codes(n_sta)
+    t = np.arange(npts) / sampling_rate
+    traces = []
+    for i in range(n_traces):
+        data = 2000 * np.sin(2 * np.pi * rng.uniform(0.5, 5) * t) + rng.normal(0, 300, npts)
+        tr = Trace(data=data.astype(np.int32))
+        tr.stats.update(dict(network="XA", station=codes[i // 3], location="",
+                             channel="HH" + "ZNE"[i % 3], sampling_rate=sampling_rate,
+                             starttime=UTCDateTime(starttime)))
+        traces.append(tr)
+    return Stream(traces)
+
+
+def synthetic_lazy_stream(n_traces, npts=3000, seed=0):
+    from quakesee_web.mseed_index import LazyStream
+
+    buffer = io.BytesIO()
+    synthetic_stream(n_traces, npts, seed).write(buffer, format="MSEED", encoding="STEIM2", reclen=4096)
+    return LazyStream.from_bytes(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--stations", type=int, default=10000)
+    parser.add_argument("--traces", type=int, default=1000)
+    parser.add_argument("--npts", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    synthetic_catalog(args.events, args.seed).to_csv(os.path.join(args.out, f"events_{args.events}.csv"), index=False)
+    pd.DataFrame(synthetic_station_data(args.stations, args.seed)).to_csv(
+        os.path.join(args.out, f"stations_{args.stations}.csv"), index=False)
+    synthetic_inventory(args.stations, args.seed).write(
+        os.path.join(args.out, f"stations_{args.stations}.xml"), format="STATIONXML")
+    synthetic_stream(args.traces, args.npts, args.seed).write(
+        os.path.join(args.out, f"traces_{args.traces}.mseed"), format="MSEED", encoding="STEIM2", reclen=4096)
+    print(f"fixtures written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
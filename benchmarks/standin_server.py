@@ -0,0 +1,289 @@
+"""
+Server HTTP lokal pengganti IRIS FDSN dan ISC untuk benchmark offline.
+
+Melayani respons sintetis (deterministik) untuk:
+    /cgi-bin/web-db-run          ISC CATCSV
+    /fdsnws/event/1/query        format=text atau QuakeML
+    /fdsnws/station/1/query      StationXML (level=response menyertakan respons PAZ)
+    /fdsnws/dataselect/1/query   miniSEED (GET dan POST bulk)
+    /fdsnws/availability/1/query selalu 404 (tidak ada pemangkasan)
+
+Latensi tiap permintaan dan jumlah event/stasiun dapat diatur. Jalankan
+mandiri untuk mencoba aplikasi tanpa internet:
+
+    python benchmarks/standin_server.py --port 8088 --latency 0.2
+    QUAKESEE_FDSN_URL=http://localhost:8088 QUAKESEE_ISC_URL=http://localhost:8088/cgi-bin/web-db-run quakesee
+"""
+import argparse
+import io
+import threading
+import time
+import zlib
+from fnmatch import fnmatch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from obspy import Stream, Trace, UTCDateTime
+from obspy.core.event import Catalog, Event, Magnitude, Origin
+from obspy.core.inventory import Channel, Inventory, Network, Response, Site, Station
+from obspy.geodetics import locations2degrees
+
+
+class StandinConfig:
+    def __init__(self, latency=0.0, events_per_day=20, stations=200, channels=("HHZ", "HHN", "HHE"),
+                 sampling_rate=100.0, network="XX", seed=0):
+        self.latency = latency
+        self.events_per_day = events_per_day
+        self.stations = stations
+        self.channels = channels
+        self.sampling_rate = sampling_rate
+        self.network = network
+        self.seed = seed
+
+
+def _rng(*keys):
+    return np.random.default_rng(zlib.crc32(repr(keys).encode()))
+
+
+def synthetic_events(config, start, end, min_mag=0.0):
+    """Event sintetis untuk rentang [start, end) yang sama di setiap pemanggilan"""
+    start, end = UTCDateTime(start), UTCDateTime(end)
+    rows = []
+    day = UTCDateTime(start.date)
+    while day < end:
+        rng = _rng(config.seed, "events", day.date.isoformat())
+        n = config.events_per_day
+        offsets = np.sort(rng.uniform(0, 86400, n))
+        lats = rng.uniform(-60, 60, n)
+        lons = rng.uniform(-180, 180, n)
+        depths = rng.exponential(30, n)
+        mags = np.round(3.0 + rng.exponential(0.8, n), 1)
+        for i in range(n):
+            t = day + float(offsets[i])
+            if start <= t < end and mags[i] >= min_mag:
+                rows.append((f"{day.strftime('%Y%m%d')}{i:05d}", t, lats[i], lons[i], depths[i], mags[i]))
+        day += 86400
+    return rows
+
+
+def station_list(config, latitude=0.0, longitude=0.0, maxradius=180.0, minradius=0.0):
+    """Stasiun tetap pada grid global; dipilih menurut radius dari titik query"""
+    rng = _rng(config.seed, "stations")
+    lats = rng.uniform(-70, 70, config.stations)
+    lons = rng.uniform(-180, 180, config.stations)
+    dist = locations2degrees(latitude, longitude, lats, lons)
+    keep = np.nonzero((dist >= minradius) & (dist <= maxradius))[0]
+    return [(f"S{i:04d}", float(lats[i]), float(lons[i])) for i in keep]
+
+
+def _response():
+    return Response.from_paz(zeros=[0j, 0j], poles=[-0.037 + 0.037j, -0.037 - 0.037j, -251.3 + 0j],
+                             stage_gain=1500.0, input_units="M/S", output_units="COUNTS",
+                             normalization_frequency=1.0, pz_transfer_function_type="LAPLACE (RADIANS/SECOND)",
+                             normalization_factor=251.3)
+
+
+def synthetic_inventory(config, stations, channel="*", level="response"):
+    response = _response() if level == "response" else None
+    patterns = [c.strip() for c in channel.split(",")]
+    start = UTCDateTime(2000, 1, 1)
+    net = Network(code=config.network, start_date=start)
+    for code, lat, lon in stations:
+        sta = Station(code=code, latitude=lat, longitude=lon, elevation=100.0, start_date=start,
+                      site=Site(name=code))
+        if level in ("channel", "response"):
+            for cha in config.channels:
+                if any(fnmatch(cha, p) for p in patterns):
+                    sta.channels.append(Channel(code=cha, location_code="", latitude=lat, longitude=lon,
+                                                elevation=100.0, depth=0.0, start_date=start,
+                                                sample_rate=config.sampling_rate, response=response))
+        net.stations.append(sta)
+    return Inventory(networks=[net], source="quakesee standin")
+
+
+def synthetic_traces(config, net, sta, loc, cha, t1, t2):
+    """Trace sintetis (gelombang + derau) untuk satu permintaan dataselect"""
+    traces = []
+    t1, t2 = UTCDateTime(t1), UTCDateTime(t2)
+    npts = int((t2 - t1) * config.sampling_rate)
+    if npts <= 0:
+        return traces
+    codes = [c for c in config.channels if any(fnmatch(c, p) for p in cha.split(","))]
+    stations = [s for s in (f"S{i:04d}" for i in range(config.stations))
+                if any(fnmatch(s, p) for p in sta.split(","))]
+    if not any(fnmatch(config.network, p) for p in net.split(",")):
+        return traces
+    for station in stations:
+        for code in codes:
+            rng = _rng(config.seed, station, code)
+            t = np.arange(npts) / config.sampling_rate
+            data = 2000 * np.sin(2 * np.pi * 1.5 * t + rng.uniform(0, 6.28)) + rng.normal(0, 300, npts)
+            tr = Trace(data=data.astype(np.int32))
+            tr.stats.update(dict(network=config.network, station=station, location="",
+                                 channel=code, sampling_rate=config.sampling_rate, starttime=t1))
+            traces.append(tr)
+    return traces
+
+
+def isc_catcsv(config, params):
+    start = UTCDateTime(int(params["start_year"]), int(params["start_month"]), int(params["start_day"]))
+    end = UTCDateTime(int(params["end_year"]), int(params["end_month"]), int(params["end_day"])) + 86399
+    min_mag = float(params.get("min_mag") or 0)
+    lines = ["<pre>", "----EVENT-----", "DATA_TYPE EVENT_CATALOGUE",
+             "EVENTID,TYPE,AUTHOR   ,DATE      ,TIME       ,LAT     ,LON      ,DEPTH,DEPFIX,AUTHOR   ,TYPE  ,MAG"]
+    for event_id, t, lat, lon, depth, mag in synthetic_events(config, start, end, min_mag):
+        lines.append(f"{event_id},ke,ISC      ,{t.strftime('%Y-%m-%d')},{t.strftime('%H:%M:%S.%f')[:11]},"
+                     f"{lat:8.4f},{lon:9.4f},{depth:5.1f},      ,ISC      ,mb    ,{mag:3.1f}")
+    lines += ["", "STOP", "</pre>"]
+    return "\n".join(lines).encode()
+
+
+def fdsn_event(config, params):
+    rows = synthetic_events(config, params["starttime"], params["endtime"], float(params.get("minmagnitude", 0)))
+    if params.get("limit"):
+        rows = rows[:int(params["limit"])]
+    if not rows:
+        return None, None
+    if params.get("format") == "text":
+        lines = ["#EventID|Time|Latitude|Longitude|Depth/km|Author|Catalog|Contributor|ContributorID"
+                 "|MagType|Magnitude|MagAuthor|EventLocationName"]
+        for event_id, t, lat, lon, depth, mag in rows:
+            lines.append(f"{event_id}|{t.isoformat()}|{lat:.4f}|{lon:.4f}|{depth:.1f}|ISC|ISC|ISC|{event_id}"
+                         f"|mb|{mag:.1f}|ISC|SYNTHETIC")
+        return "\n".join(lines).encode(), "text/plain"
+    catalog = Catalog()
+    for event_id, t, lat, lon, depth, mag in rows:
+        ev = Event()
+        ev.origins.append(Origin(time=t, latitude=lat, longitude=lon, depth=depth * 1000))
+        ev.magnitudes.append(Magnitude(mag=mag, magnitude_type="mb"))
+        catalog.events.append(ev)
+    buffer = io.BytesIO()
+    catalog.write(buffer, format="QUAKEML")
+    return buffer.getvalue(), "application/xml"
+
+
+def fdsn_station(config, params, cache={}):
+    key = (params.get("latitude"), params.get("longitude"), params.get("minradius"), params.get("maxradius"),
+           params.get("channel", "*"), params.get("level", "station"), params.get("station", "*"))
+    if key not in cache:
+        stations = station_list(config, float(params.get("latitude", 0)), float(params.get("longitude", 0)),
+                                float(params.get("maxradius", 180)), float(params.get("minradius", 0)))
+        sta_patterns = params.get("station", "*").split(",")
+        stations = [s for s in stations if any(fnmatch(s[0], p) for p in sta_patterns)]
+        if not stations:
+            return None
+        buffer = io.BytesIO()
+        synthetic_inventory(config, stations, params.get("channel", "*"),
+                            params.get("level", "station")).write(buffer, format="STATIONXML")
+        cache[key] = buffer.getvalue()
+    return cache[key]
+
+
+def fdsn_dataselect(config, requests_list):
+    st = Stream()
+    for net, sta, loc, cha, t1, t2 in requests_list:
+        st.traces.extend(synthetic_traces(config, net, sta, loc, cha, t1, t2))
+    if not st:
+        return None
+    buffer = io.BytesIO()
+    st.write(buffer, format="MSEED", reclen=4096, encoding="STEIM2")
+    return buffer.getvalue()
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    config = StandinConfig()
+    bytes_sent = 0
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _params(self):
+        query = parse_qs(urlparse(self.path).query)
+        return {k: v[-1] for k, v in query.items()}
+
+    def _send(self, body, content_type="application/octet-stream"):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if body is None:
+            self.send_response(204)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with StandinHandler._lock:
+            StandinHandler.bytes_sent += len(body)
+            StandinHandler.requests_served += 1
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        params = self._params()
+        if path.startswith("/cgi-bin/web-db-run"):
+            self._send(isc_catcsv(self.config, params), "text/html")
+        elif path == "/fdsnws/event/1/query":
+            body, content_type = fdsn_event(self.config, params)
+            self._send(body, content_type)
+        elif path == "/fdsnws/station/1/query":
+            self._send(fdsn_station(self.config, params), "application/xml")
+        elif path == "/fdsnws/dataselect/1/query":
+            req = (params.get("network", params.get("net", "*")), params.get("station", params.get("sta", "*")),
+                   params.get("location", params.get("loc", "*")), params.get("channel", params.get("cha", "*")),
+                   params.get("starttime", params.get("start")), params.get("endtime", params.get("end")))
+            self._send(fdsn_dataselect(self.config, [req]), "application/vnd.fdsn.mseed")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if path == "/fdsnws/dataselect/1/query":
+            reqs = [line.split() for line in body.splitlines() if line.strip() and "=" not in line]
+            self._send(fdsn_dataselect(self.config, [r for r in reqs if len(r) == 6]), "application/vnd.fdsn.mseed")
+        elif path == "/fdsnws/availability/1/query":
+            self.send_error(404)
+        else:
+            self.send_error(404)
+
+
+def start_server(config=None, port=0, address="127.0.0.1"):
+    """Menjalankan server di thread latar belakang; mengembalikan (server, base_url)"""
+    if config is not None:
+        StandinHandler.config = config
+    server = ThreadingHTTPServer((address, port), StandinHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{address}:{server.server_address[1]}"
+
+
+def reset_counters():
+    with StandinHandler._lock:
+        StandinHandler.bytes_sent = 0
+        StandinHandler.requests_served = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay per request in seconds")
+    parser.add_argument("--events-per-day", type=int, default=20)
+    parser.add_argument("--stations", type=int, default=200)
+    args = parser.parse_args()
+
+    config = StandinConfig(latency=args.latency, events_per_day=args.events_per_day, stations=args.stations)
+    server, url = start_server(config, args.port, args.address)
+    print(f"stand-in FDSN/ISC server at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
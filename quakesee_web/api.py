@@ -0,0 +1,542 @@
+"""
+REST API tanpa UI di server Tornado yang sama dengan aplikasi Panel.
+
+    GET  /api/events     katalog IRIS (fdsnws-event), per halaman waktu
+    GET  /api/isc        katalog ISC (CATCSV) per jendela tanggal
+    GET  /api/stations   pencarian stasiun radius di sekitar titik
+    GET  /api/waveforms  waveform stasiun di sekitar event, atau satu NSLC
+    POST /api/waveforms  waveform untuk baris bulk FDSN (NET STA LOC CHA START END)
+    GET  /api/jobs       status antrean pekerjaan server
+
+Tabel dikirim sebagai format=csv (default), json (NDJSON) atau arrow (IPC
+stream, perlu pyarrow); waveform sebagai miniSEED. Respons dikirim chunked
+segera setelah halaman/stasiun siap. Mesin pengambilan, cache bersama,
+thread pool dan antrean pekerjaan sama dengan yang dipakai sesi UI; setiap
+permintaan API dijadwalkan sebagai pekerjaan BULK milik alamat klien.
+
+Mesin (obspy, pandas, fetcher) baru diimpor saat permintaan pertama sehingga
+mendaftarkan api_patterns tidak memperlambat startup server.
+"""
+import asyncio
+import importlib.util
+import io
+import json
+
+from tornado.iostream import StreamClosedError
+from tornado.web import HTTPError, RequestHandler
+
+from quakesee_web.background import BackgroundTask
+from quakesee_web.geometry import GEOMETRY_COLUMNS
+from quakesee_web.jobs import BULK, JobCancelled, get_job_queue, upstream
+from quakesee_web.metrics import span
+
+TABLE_FORMATS = ("csv", "json", "arrow")
+STATION_COLUMNS = ["network", "station", "latitude", "longitude", "elevation"]
+# Baris per chunk saat mengirim tabel yang sudah ada di cache
+CHUNK_ROWS = 10000
+# Chunk yang boleh menunggu dikirim sebelum produsen ditahan
+QUEUE_CHUNKS = 4
+
+_DONE = object()
+
+
+class TableEncoder:
+    """Mengubah DataFrame berurutan menjadi chunk byte satu format"""
+
+    content_types = {
+        "csv": "text/csv; charset=utf-8",
+        "json": "application/x-ndjson",
+        "arrow": "application/vnd.apache.arrow.stream",
+    }
+
+    def __init__(self, fmt, columns=None):
+        if fmt == "arrow":
+            if importlib.util.find_spec("pyarrow") is None:
+                raise HTTPError(501, "format=arrow requires pyarrow (pip install pyarrow)")
+        self.fmt = fmt
+        self.columns = columns
+        self.content_type = self.content_types[fmt]
+        self._started = False
+        self._sink = self._writer = self._schema = None
+
+    def encode(self, df):
+        if not len(df):
+            return b""
+        if self.columns is None:
+            self.columns = list(df.columns)
+        df = df[self.columns]
+        first = not self._started
+        self._started = True
+        if self.fmt == "csv":
+            return df.to_csv(index=False, header=first).encode()
+        if self.fmt == "json":
+            return df.to_json(orient="records", lines=True, date_format="iso").encode() + b"\n"
+        return self._arrow(df)
+
+    def close(self):
+        """Sisa stream; tabel kosong tetap membawa header/skema"""
+        if self.fmt == "csv" and not self._started and self.columns:
+            return (",".join(self.columns) + "\n").encode()
+        if self.fmt == "arrow":
+            if self._writer is None:
+                import pandas as pd
+
+                self._arrow(pd.DataFrame({col: pd.Series(dtype="object") for col in self.columns or []}))
+            self._writer.close()
+            return self._take()
+        return b""
+
+    def _arrow(self, df):
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self._sink = io.BytesIO()
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        return self._take()
+
+    def _take(self):
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+
+class _ApiHandler(RequestHandler):
+    job_name = "api"
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json")
+        message = self._reason
+        if "exc_info" in kwargs:
+            error = kwargs["exc_info"][1]
+            if isinstance(error, HTTPError):
+                message = error.log_message or message
+            else:
+                message = f"{type(error).__name__}: {error}"
+        self.finish(json.dumps(dict(error=message, status=status_code)))
+
+    def arg(self, name, convert=str, default=None, required=False):
+        value = self.get_argument(name, None)
+        if value is None or value == "":
+            if required:
+                raise HTTPError(400, f"missing parameter '{name}'")
+            return default
+        try:
+            return convert(value)
+        except Exception:
+            raise HTTPError(400, f"invalid value for '{name}': {value!r}")
+
+    def flag(self, name, default=False):
+        return self.arg(name, lambda v: v.lower() in ("1", "true", "yes", "on"), default)
+
+    def table_encoder(self, columns=None):
+        fmt = self.arg("format", default="csv")
+        if fmt not in TABLE_FORMATS:
+            raise HTTPError(400, f"format must be one of {', '.join(TABLE_FORMATS)}")
+        return TableEncoder(fmt, columns)
+
+    async def pump(self, produce):
+        """
+        Menjalankan produce(task, emit) di thread pool bersama; setiap chunk
+        byte yang di-emit langsung ditulis dan di-flush (transfer chunked).
+        Antrean terbatas menahan produsen jika klien lambat. Klien yang
+        memutus koneksi membatalkan task.
+        """
+        job = get_job_queue().submit(self.job_name, owner=f"api:{self.request.remote_ip}", priority=BULK)
+        try:
+            await get_job_queue().wait_async(job, closed=self.request.connection.stream.closed)
+            await self._pump(produce)
+        except JobCancelled:
+            pass
+        finally:
+            get_job_queue().finish(job)
+
+    async def _pump(self, produce):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        task = BackgroundTask()
+
+        def emit(chunk):
+            if chunk and not task.cancelled:
+                asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+
+        def run():
+            try:
+                produce(task, emit)
+                result = _DONE
+            except Exception as e:
+                result = e
+            asyncio.run_coroutine_threadsafe(queue.put(result), loop).result()
+
+        task.submit(run)
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, HTTPError):
+                raise item
+            if isinstance(item, Exception):
+                # Kegagalan layanan hulu (FDSN/ISC) atau pemrosesan
+                raise HTTPError(502, f"{type(item).__name__}: {item}") from item
+            if task.cancelled:
+                continue
+            try:
+                self.write(item)
+                await self.flush()
+            except StreamClosedError:
+                task.cancel()
+
+    async def send_table(self, encoder, produce_frames):
+        """produce_frames(task, emit_frame) mengirim DataFrame berurutan"""
+        self.set_header("Content-Type", encoder.content_type)
+
+        def produce(task, emit):
+            produce_frames(task, lambda df: emit(encoder.encode(df)))
+            emit(encoder.close())
+
+        await self.pump(produce)
+
+
+def _parse_time(value):
+    from obspy import UTCDateTime
+
+    return UTCDateTime(value)
+
+
+def _emit_slices(df, emit_frame, task):
+    for i in range(0, len(df), CHUNK_ROWS):
+        if task.cancelled:
+            return
+        emit_frame(df.iloc[i:i + CHUNK_ROWS])
+
+
+class EventsHandler(_ApiHandler):
+    """
+    Katalog IRIS: start, end, minmag (5.0), limit, page_days (30), detail
+    (QuakeML penuh). Halaman dikirim sesuai urutan selesai, tidak diurutkan.
+    """
+    job_name = "api_events"
+
+    async def get(self):
+        start = self.arg("start", _parse_time, required=True)
+        end = self.arg("end", _parse_time, required=True)
+        min_mag = self.arg("minmag", float, 5.0)
+        limit = self.arg("limit", int)
+        page_days = self.arg("page_days", int, 30)
+        full_detail = self.flag("detail")
+        encoder = self.table_encoder()
+
+        def produce_frames(task, emit_frame):
+            from quakesee_web.event_fetcher import fetch_events_paged
+            from quakesee_web.services import IRIS_BASE_URL, event_client
+            from quakesee_web.shared_cache import events_key, events_ttl, get_shared_cache
+
+            key = events_key(IRIS_BASE_URL, full_detail, start, end, min_mag, limit)
+            cached = get_shared_cache().get(key)
+            if cached is not None:
+                _emit_slices(cached, emit_frame, task)
+                return
+            source = event_client() if full_detail else IRIS_BASE_URL
+            result = fetch_events_paged(source, start, end, min_mag, limit=limit, page_days=page_days,
+                                        on_page=lambda page, done, total: emit_frame(page), task=task)
+            if not task.cancelled:
+                get_shared_cache().put(key, result, ttl=events_ttl(end))
+
+        await self.send_table(encoder, produce_frames)
+
+
+class IscHandler(_ApiHandler):
+    """
+    Katalog ISC dalam kotak bot_lat/top_lat/left_lon/right_lon antara start
+    dan end (tanggal), per step_days. format=catcsv mengirim teks ISC asli.
+    """
+    job_name = "api_isc"
+
+    async def get(self):
+        from quakesee_web import isc_fetcher
+
+        date = lambda v: _parse_time(v).date  # noqa: E731
+        params = dict(
+            bot_lat=self.arg("bot_lat", float, -10.0),
+            top_lat=self.arg("top_lat", float, 6.0),
+            left_lon=self.arg("left_lon", float, 95.0),
+            right_lon=self.arg("right_lon", float, 141.0),
+            min_mag=self.arg("min_mag", float, 0.0),
+            max_mag=self.arg("max_mag", float, 10.0),
+            min_dep=self.arg("min_dep", float, 0.0),
+            max_dep=self.arg("max_dep", float, 700.0),
+        )
+        windows = isc_fetcher.date_windows(self.arg("start", date, required=True),
+                                           self.arg("end", date, required=True),
+                                           max(1, self.arg("step_days", int, 30)))
+
+        def texts(task):
+            for t0, t1 in windows:
+                if task.cancelled:
+                    return
+                text = isc_fetcher.fetch_window(params, t0, t1)
+                if text is not None:
+                    yield text
+
+        if self.get_argument("format", None) == "catcsv":
+            self.set_header("Content-Type", "text/plain; charset=utf-8")
+
+            def produce(task, emit):
+                for text in texts(task):
+                    emit(text.encode())
+
+            await self.pump(produce)
+            return
+
+        encoder = self.table_encoder(isc_fetcher.ISC_COLUMNS)
+
+        def produce_frames(task, emit_frame):
+            import pandas as pd
+
+            for text in texts(task):
+                with span("parse") as s:
+                    df = pd.DataFrame(isc_fetcher.parse_records(text.splitlines()), columns=isc_fetcher.ISC_COLUMNS)
+                    df["time"] = df["time"].astype(str)
+                    s.add(records=len(df))
+                emit_frame(df)
+
+        await self.send_table(encoder, produce_frames)
+
+
+def find_stations(client, query):
+    """get_stations melalui cache bersama (kunci sama dengan pencarian di UI)"""
+    from quakesee_web.inventory_index import select_within
+    from quakesee_web.shared_cache import covering_stations, get_shared_cache, station_key
+
+    key = station_key(query)
+    inventory = get_shared_cache().get(key)
+    if inventory is None:
+        superset = covering_stations(query)
+        if superset is not None:
+            inventory = select_within(superset, query['latitude'], query['longitude'],
+                                      query['minradius'], query['maxradius'])
+        else:
+            with upstream(), span("inventory_query") as s:
+                inventory = client.get_stations(**query)
+                s.add(records=sum(len(net) for net in inventory))
+        inventory = get_shared_cache().put(key, inventory)
+    return inventory
+
+
+def fetch_plan(client, plan, avail=False, merge=False):
+    """
+    Waveform untuk rencana (net, sta, loc, cha, t1, t2) sebagai satu
+    permintaan bulk, dibagi dengan sesi UI lewat cache bersama.
+    """
+    from obspy.clients.fdsn.header import FDSNNoDataException
+
+    from quakesee_web.availability import check_availability
+    from quakesee_web.merge_engine import DEFAULT_MERGE, merge_stream
+    from quakesee_web.mseed_index import WaveformSpool
+    from quakesee_web.shared_cache import get_shared_cache, waveform_key
+
+    key = waveform_key(-1, avail, merge, plan)
+    shared = get_shared_cache().get(key)
+    if shared is not None:
+        return shared[0]
+
+    if avail:
+        with span("availability_check") as s:
+            plan, pruned, _ = check_availability(plan)
+            s.add(records=len(plan) + pruned)
+
+    spool = WaveformSpool()
+    with span("waveform_fetch") as s:
+        bulk = [(net, sta, loc, cha.strip(), t1, t2)
+                for net, sta, loc, chans, t1, t2 in plan for cha in chans.split(",")]
+        if bulk:
+            try:
+                with upstream():
+                    st = client.get_waveforms_bulk(bulk)
+                spool.append(st)
+            except FDSNNoDataException:
+                pass
+        data = spool.finalize()
+        if data:
+            s.add(nbytes=len(data.index.buffer), records=len(data))
+
+    report = None
+    if merge and data:
+        with span("merge") as s:
+            data, report = merge_stream(data, **DEFAULT_MERGE)
+            s.add(records=len(report))
+    if data:
+        data, _ = get_shared_cache().put(key, (data, report))
+    return data
+
+
+class StationsHandler(_ApiHandler):
+    """
+    Stasiun dalam radius (derajat) dari latitude/longitude yang aktif antara
+    start dan end, dengan jarak dan azimuth dari titik tersebut (terdekat
+    lebih dulu). format=stationxml mengirim inventory lengkap.
+    """
+    job_name = "api_stations"
+
+    async def get(self):
+        query = dict(
+            network=self.arg("network", default="*"),
+            station=self.arg("station", default="*"),
+            channel=self.arg("channel", default="BH?,EH?,HH?"),
+            starttime=self.arg("start", _parse_time, required=True),
+            endtime=self.arg("end", _parse_time, required=True),
+            latitude=self.arg("latitude", float, required=True),
+            longitude=self.arg("longitude", float, required=True),
+            minradius=self.arg("minradius", float, 0.0),
+            maxradius=self.arg("maxradius", float, 5.0),
+            level=self.arg("level", default="response"),
+        )
+
+        if self.get_argument("format", None) == "stationxml":
+            self.set_header("Content-Type", "application/xml")
+
+            def produce(task, emit):
+                from quakesee_web.exporter import export_file
+                from quakesee_web.services import waveform_client
+
+                with export_file(find_stations(waveform_client(), query), "STATIONXML") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        emit(chunk)
+
+            await self.pump(produce)
+            return
+
+        columns = STATION_COLUMNS + GEOMETRY_COLUMNS
+        encoder = self.table_encoder(columns)
+
+        def produce_frames(task, emit_frame):
+            import pandas as pd
+
+            from quakesee_web.inventory_index import station_records
+            from quakesee_web.services import waveform_client
+
+            inventory = find_stations(waveform_client(), query)
+            origin = dict(latitude=query['latitude'], longitude=query['longitude'])
+            emit_frame(pd.DataFrame(station_records(inventory, origin=origin), columns=columns))
+
+        await self.send_table(encoder, produce_frames)
+
+
+def _parse_bulk(body):
+    """Baris bulk FDSN; baris key=value (mis. merge=true) menjadi opsi"""
+    from quakesee_web.shared_cache import time_key
+
+    plan, options = {}, {}
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "=" in line:
+            key, value = line.split("=", 1)
+            options[key.strip()] = value.strip()
+            continue
+        cols = line.split()
+        if len(cols) != 6:
+            raise HTTPError(400, f"bulk line must be 'NET STA LOC CHA START END': {line!r}")
+        net, sta, loc, cha, t1, t2 = cols
+        try:
+            t1, t2 = _parse_time(t1), _parse_time(t2)
+        except Exception:
+            raise HTTPError(400, f"invalid time in bulk line: {line!r}")
+        loc = "" if loc == "--" else loc
+        # Kanal dengan NSL dan jendela yang sama digabung seperti rencana UI
+        entry = plan.setdefault((net, sta, loc, time_key(t1), time_key(t2)), [net, sta, loc, [], t1, t2])
+        entry[3].append(cha)
+    return [(net, sta, loc, ",".join(chans), t1, t2) for net, sta, loc, chans, t1, t2 in plan.values()], options
+
+
+class WaveformsHandler(_ApiHandler):
+    """
+    GET dengan time/latitude/longitude: stasiun dalam minradius..maxradius
+    (cache sama dengan pencarian UI) lalu waveform start_offset..end_offset
+    detik di sekitar event. GET dengan network/station/start/end: satu
+    permintaan NSLC. POST: baris bulk FDSN. Opsi avail dan merge seperti UI.
+    """
+    job_name = "api_waveforms"
+
+    async def get(self):
+        channel = self.arg("channel", default="BH?,EH?,HH?")
+        avail = self.flag("avail")
+        merge = self.flag("merge")
+
+        if self.get_argument("time", None):
+            origin = self.arg("time", _parse_time)
+            starttime = origin + self.arg("start_offset", int, -300)
+            endtime = origin + self.arg("end_offset", int, 3600)
+            query = dict(network="*", station="*", channel=channel, starttime=starttime, endtime=endtime,
+                         latitude=self.arg("latitude", float, required=True),
+                         longitude=self.arg("longitude", float, required=True),
+                         minradius=self.arg("minradius", float, 0.0),
+                         maxradius=self.arg("maxradius", float, 5.0),
+                         level="response")
+
+            def make_plan(client):
+                inventory = find_stations(client, query)
+                plan = {}
+                for network in inventory:
+                    for station in network:
+                        plan.setdefault((network.code, station.code),
+                                        (network.code, station.code, "*", channel, starttime, endtime))
+                return list(plan.values())
+        else:
+            plan = [(self.arg("network", required=True), self.arg("station", required=True),
+                     self.arg("location", default="*"), channel,
+                     self.arg("start", _parse_time, required=True), self.arg("end", _parse_time, required=True))]
+            make_plan = lambda client: plan  # noqa: E731
+
+        await self.send_waveforms(make_plan, avail, merge)
+
+    async def post(self):
+        plan, options = _parse_bulk(self.request.body.decode("utf-8", "replace"))
+        if not plan:
+            raise HTTPError(400, "no bulk lines in request body")
+        on = lambda v: v.lower() in ("1", "true", "yes", "on")  # noqa: E731
+        await self.send_waveforms(lambda client: plan, on(options.get("avail", "false")),
+                                  on(options.get("merge", "false")))
+
+    async def send_waveforms(self, make_plan, avail, merge):
+        self.set_header("Content-Type", "application/vnd.fdsn.mseed")
+        self.set_header("Content-Disposition", 'attachment; filename="quakesee.mseed"')
+
+        def produce(task, emit):
+            from quakesee_web.exporter import mseed_chunks
+            from quakesee_web.services import waveform_client
+
+            client = waveform_client()
+            data = fetch_plan(client, make_plan(client), avail=avail, merge=merge)
+            if data is None:
+                return
+            with span("serialization") as s:
+                for chunk in mseed_chunks(data):
+                    if task.cancelled:
+                        break
+                    s.add(nbytes=len(chunk))
+                    emit(chunk)
+
+        await self.pump(produce)
+
+
+class JobsHandler(_ApiHandler):
+    """Jumlah pekerjaan berjalan/menunggu di proses server ini"""
+
+    def get(self):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(get_job_queue().stats()))
+
+
+def api_patterns(path="/api"):
+    """Pola Tornado untuk pn.serve(extra_patterns=...)"""
+    return [
+        (rf"{path}/events", EventsHandler),
+        (rf"{path}/isc", IscHandler),
+        (rf"{path}/stations", StationsHandler),
+        (rf"{path}/waveforms", WaveformsHandler),
+        (rf"{path}/jobs", JobsHandler),
+    ]
@@ -1,36 +1,74 @@
+import argparse
+import os
+
 import panel as pn
 import param
 # from wave_loader import WaveLoader
-from quakesee_web.wave_fetcher_web import WaveFetcher
 # from station_loader import StationLoader
-from quakesee_web.eqcat_fetcher_web import EQCatFetcher
-from quakesee_web.about_web import About
 from pathlib import Path
 
+from quakesee_web import jobs, profiling
+from quakesee_web.api import api_patterns
+from quakesee_web.metrics import metrics_patterns
+from quakesee_web.workers import set_max_workers
+
 # pn.extension('terminal', template='bootstrap', sizing_mode="stretch_width")
 pn.extension('terminal', 'plotly', 'tabulator', template='bootstrap', sizing_mode="stretch_width")
 
+# Halaman pembuka dan cadangan untuk nama halaman yang tidak dikenal:
+# ringan, tanpa modul berat (plotly, klien FDSN, obspy.io)
+START_PAGE = "About"
+
+
+def _wave_fetcher():
+    from quakesee_web.wave_fetcher_web import WaveFetcher
+    return WaveFetcher()
+
+
+def _eqcat_fetcher():
+    from quakesee_web.eqcat_fetcher_web import EQCatFetcher
+    return EQCatFetcher()
+
+
+def _about():
+    from quakesee_web.about_web import About
+    return About()
+
+
 class MainApp(param.Parameterized):
     current_view = param.ClassSelector(class_=pn.layout.Panel, constant=True)
     
     def __init__(self, **params):
         super().__init__(**params)
-        self.frames = self.create_frames()
+        self.frame_factories = self.create_frames()
+        self.frames = {}
         self.sidebar = self.create_sidebar()
-        self.main_area = pn.Column(self.frames["Fetcher & Loader"], sizing_mode="stretch_both")
+        # Fetcher & Loader (dan impor plotly/obspy-nya) baru dibangun saat pertama dibuka
+        self.main_area = pn.Column(self.get_frame(START_PAGE), sizing_mode="stretch_both")
         self.tree_visible = True
     
     def create_frames(self):
-        """Membuat semua frame yang diperlukan"""
+        """
+        Mendaftarkan pembuat frame. Frame (dan modul beratnya) baru dibangun
+        saat pertama kali dibuka lewat navigasi.
+        """
         return {
-            "Fetcher & Loader": WaveFetcher(),
-            "Catalog Bulk Fetcher": EQCatFetcher(),
-            # "HVSR": UnderConstruction("HVSR"),
-            # "SPAC": UnderConstruction("SPAC"),
-            # "MASW": UnderConstruction("MASW"),
-            "About": About(),
+            "Fetcher & Loader": _wave_fetcher,
+            "Catalog Bulk Fetcher": _eqcat_fetcher,
+            # "HVSR": lambda: UnderConstruction("HVSR"),
+            # "SPAC": lambda: UnderConstruction("SPAC"),
+            # "MASW": lambda: UnderConstruction("MASW"),
+            "About": _about,
             # Tambahkan frame lainnya sesuai kebutuhan
         }
+
+    def get_frame(self, page_name):
+        """Frame untuk page_name, dibangun sekali per sesi saat pertama diminta"""
+        if page_name not in self.frame_factories:
+            page_name = START_PAGE
+        if page_name not in self.frames:
+            self.frames[page_name] = self.frame_factories[page_name]()
+        return self.frames[page_name]
     
     def create_sidebar(self):
         """Membuat sidebar navigasi"""
@@ -88,7 +126,7 @@ class MainApp(param.Parameterized):
     def navigate_handler(self, event):
         """Menangani navigasi menu"""
         page_name = event.obj.name
-        self.main_area.objects = [self.frames.get(page_name, self.frames["About"])]
+        self.main_area.objects = [self.get_frame(page_name)]
     
     def toggle_sidebar(self, event):
         """Toggle visibility sidebar"""
@@ -136,16 +174,11 @@ class UnderConstruction(pn.Column):
                         alert_type="warning")
         ])
 
-def main():
-    # Hapus template global jika ada
-    pn.config.template = None
-
-    # Inisialisasi aplikasi
+def create_template():
+    """Membuat aplikasi dan template baru untuk setiap sesi"""
     app = MainApp()
 
-    MAX_SIZE_MB = 150
-
-    template = pn.template.BootstrapTemplate(
+    return pn.template.BootstrapTemplate(
         title="QuakeSee WebApp",
         header_background="#2c3e50",
         sidebar=[app.sidebar],  # Jika ingin menambahkan sidebar
@@ -154,15 +187,87 @@ def main():
         header=[pn.Row(pn.pane.Markdown(""))]  # Custom header
     )
 
-    # template.servable()
 
-    # Jalankan aplikasi dengan pengaturan ukuran WebSocket & Buffer
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="quakesee", description="Run the QuakeSee WebApp server.")
+    parser.add_argument("--port", type=int, default=0,
+                        help="port to listen on (default: 0, pick a free port)")
+    parser.add_argument("--address", default=None,
+                        help="address to listen on (default: all interfaces)")
+    parser.add_argument("--num-procs", type=int, default=1,
+                        help="number of server processes sharing the port (0 = one per core)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="process pool size per server process for heavy work "
+                             "(default: cores spread over the server processes)")
+    parser.add_argument("--threads", type=int, default=8,
+                        help="threads handling UI callbacks per server process, so sessions waiting "
+                             "in the job queue do not block others (at least 1)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="heavy jobs (downloads, exports, API requests) running at once per server "
+                             "process; others wait in a fair-share queue (default: QUAKESEE_JOBS or 4)")
+    parser.add_argument("--upstream", type=int, default=None,
+                        help="concurrent requests to FDSN/ISC services per server process "
+                             "(default: QUAKESEE_UPSTREAM or 8)")
+    parser.add_argument("--max-size-mb", type=int, default=150,
+                        help="websocket message and HTTP buffer limit in MB (default: 150)")
+    parser.add_argument("--allow-websocket-origin", action="append", default=None,
+                        help="public hostname[:port] allowed to connect (repeatable)")
+    parser.add_argument("--profile", action="store_true",
+                        help="record a cProfile profile for each heavy callback")
+    parser.add_argument("--profile-token", default=None,
+                        help="token required to download profiles from /profiles "
+                             "(default: QUAKESEE_PROFILE_TOKEN; without a token the endpoint is closed)")
+    parser.add_argument("--no-show", action="store_true",
+                        help="do not open a browser")
+    args = parser.parse_args(argv)
+    # Callback yang menunggu slot antrean di IOLoop akan menahan pekerjaan API
+    # yang memegang slot (produsennya butuh IOLoop): deadlock seluruh proses
+    if args.threads < 1:
+        parser.error("--threads must be at least 1 (UI callbacks wait for job slots off the event loop)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Hapus template global jika ada
+    pn.config.template = None
+
+    num_procs = args.num_procs
+    if num_procs == 0:
+        num_procs = os.cpu_count() or 1
+
+    # Pool proses dibuat malas di tiap proses server (setelah fork), jadi inti
+    # dibagi rata antar proses kecuali diatur eksplisit
+    if args.workers is not None:
+        set_max_workers(args.workers)
+    elif num_procs > 1:
+        set_max_workers(max(1, (os.cpu_count() or 1) // num_procs))
+
+    jobs.configure(slots=args.jobs, upstream=args.upstream)
+    # Callback UI di thread pool Panel (dibuat malas, aman sebelum fork)
+    pn.config.nthreads = args.threads
+
+    if args.profile:
+        profiling.enable(token=args.profile_token)
+
+    max_size = args.max_size_mb * 1024 * 1024
+
+    # Jalankan aplikasi dengan pengaturan ukuran WebSocket & Buffer;
+    # create_template dipanggil untuk setiap sesi baru
     pn.serve(
-        template, 
-        # port=5006, 
-        websocket_max_message_size=MAX_SIZE_MB*1024*1024,  # WebSocket buffer
-        http_server_kwargs={'max_buffer_size': MAX_SIZE_MB*1024*1024}  # Tornado buffer
+        create_template,
+        port=args.port,
+        address=args.address,
+        websocket_origin=args.allow_websocket_origin,
+        num_procs=num_procs,
+        show=not args.no_show and num_procs == 1,
+        title="QuakeSee WebApp",
+        # REST API /api, Prometheus /metrics dan unduhan profil /profiles (per proses)
+        extra_patterns=api_patterns() + metrics_patterns() + profiling.profile_patterns(),
+        websocket_max_message_size=max_size,  # WebSocket buffer
+        http_server_kwargs={'max_buffer_size': max_size}  # Tornado buffer
     )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
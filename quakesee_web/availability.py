@@ -0,0 +1,179 @@
+import logging
+
+import requests
+from obspy import UTCDateTime
+
+from quakesee_web.jobs import upstream
+from quakesee_web.metrics import REGISTRY
+from quakesee_web.mseed_index import LazyStream
+# fdsnws-availability (dapat diganti ke server lokal pengganti lewat QUAKESEE_FDSN_URL)
+from quakesee_web.services import AVAILABILITY_URL, FDSN_URL, FEDCATALOG_URL
+
+logger = logging.getLogger(__name__)
+
+
+def bulk_lines(requests_list):
+    """Baris bulk FDSN untuk daftar (net, sta, loc, cha, start, end)"""
+    lines = []
+    for net, sta, loc, chans, t1, t2 in requests_list:
+        for cha in chans.split(","):
+            lines.append(f"{net} {sta} {loc or '*'} {cha.strip()} "
+                         f"{UTCDateTime(t1).isoformat()} {UTCDateTime(t2).isoformat()}")
+    return lines
+
+
+def split_routes(text, service="DATASELECTSERVICE"):
+    """
+    Memecah respons fedcatalog format=request. Tiap pusat data diawali baris
+    DATACENTER=..., lalu baris <LAYANAN>=url dan baris bulk miliknya.
+    Mengembalikan dict akar url pusat data (sebelum /fdsnws) -> baris bulk
+    untuk pusat data yang menyediakan layanan tersebut.
+    """
+    routes = {}
+    root = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if "=" in line:
+            name, _, value = line.partition("=")
+            if name == "DATACENTER":
+                root = None
+            elif name == service:
+                root = value.split("/fdsnws")[0].rstrip("/")
+            continue
+        if root is not None:
+            routes.setdefault(root, []).append(line)
+    return routes
+
+
+def availability_routes(lines, timeout=60):
+    """
+    Layanan availability mengikuti routing waveform_client: dict url -> baris
+    bulk. Dengan federator, tiap pusat data ditanya di fdsnws miliknya sendiri
+    (pusat data yang sama yang nanti melayani dataselect).
+    """
+    if FDSN_URL:
+        return {AVAILABILITY_URL: lines}
+    with upstream():
+        response = requests.post(FEDCATALOG_URL, data="\n".join(["format=request"] + lines), timeout=timeout)
+    if response.status_code in (204, 404):
+        return {}
+    response.raise_for_status()
+    return {root + "/fdsnws/availability/1/query": body for root, body in split_routes(response.text).items()}
+
+
+def query_availability(requests_list, url=AVAILABILITY_URL, timeout=60, lines=None):
+    """
+    Meminta extent data untuk daftar (net, sta, loc, cha, start, end) (atau
+    baris bulk jadi) dalam satu POST. Mengembalikan dict (net, sta) -> [(start, end), ...] epoch.
+    """
+    header = ["format=text", "merge=samplerate,quality", "nodata=404"]
+    lines = bulk_lines(requests_list) if lines is None else lines
+
+    with upstream():
+        response = requests.post(url, data="\n".join(header + lines), timeout=timeout)
+    if response.status_code in (204, 404):
+        return {}
+    response.raise_for_status()
+    return parse_availability(response.text)
+
+
+def parse_availability(text):
+    extents = {}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        cols = line.split()
+        if len(cols) < 4:
+            continue
+        try:
+            start = UTCDateTime(cols[-2]).timestamp
+            end = UTCDateTime(cols[-1]).timestamp
+        except Exception:
+            continue
+        extents.setdefault((cols[0], cols[1]), []).append((start, end))
+    return extents
+
+
+def extents_from_stream(st):
+    """Extent data yang sudah ada di cache waveform (dari indeks jika LazyStream)"""
+    extents = {}
+    if st is None:
+        return extents
+    if isinstance(st, LazyStream):
+        spans = st.index.segments()
+    else:
+        spans = [(tr.id, tr.stats.starttime.timestamp, tr.stats.endtime.timestamp) for tr in st]
+    for seed_id, start, end in spans:
+        net, sta = seed_id.split(".")[:2]
+        extents.setdefault((net, sta), []).append((start, end))
+    return extents
+
+
+def prune_requests(requests_list, extents, covered=None):
+    """
+    Membuang permintaan yang pasti kosong. Hanya network yang dicakup layanan
+    availability (covered, default: network yang muncul di extents) yang boleh
+    dipangkas; network lain tetap diminta. Mengembalikan (dipertahankan, jumlah dipangkas).
+    """
+    covered = {net for net, _ in extents} if covered is None else covered
+    kept = []
+    pruned = 0
+    for req in requests_list:
+        net, sta, _, _, t1, t2 = req
+        if net not in covered:
+            kept.append(req)
+            continue
+        t1, t2 = UTCDateTime(t1).timestamp, UTCDateTime(t2).timestamp
+        if any(start <= t2 and end >= t1 for start, end in extents.get((net, sta), [])):
+            kept.append(req)
+        else:
+            pruned += 1
+    return kept, pruned
+
+
+def check_availability(requests_list, cached=None):
+    """
+    Pra-pemeriksaan sebelum get_waveforms, ke layanan availability dari
+    routing yang sama dengan waveform. Extent di cache waveform dihitung
+    sebagai data tersedia. Pusat data yang gagal menjawab tidak memangkas
+    apa pun (network-nya tetap diminta).
+
+    Mengembalikan (dipertahankan, jumlah dipangkas, jumlah query gagal);
+    query gagal (routing atau pusat data) juga tercatat sebagai error tahap
+    availability_check di /metrics, sehingga "tidak ada yang dipangkas"
+    dapat dibedakan dari "pemeriksaan gagal".
+    """
+    try:
+        routes = availability_routes(bulk_lines(requests_list))
+    except Exception as e:
+        _check_failed("routing", e)
+        return requests_list, 0, 1
+    extents = {}
+    # Network yang dijawab pusat datanya (termasuk "tidak ada data") boleh
+    # dipangkas; network di rute yang gagal tetap diminta
+    answered, unanswered = set(), set()
+    failed = 0
+    for url, lines in routes.items():
+        networks = {line.split()[0] for line in lines if line.strip()}
+        try:
+            found = query_availability(None, url=url, lines=lines)
+        except Exception as e:
+            _check_failed(url, e)
+            failed += 1
+            unanswered |= networks
+            continue
+        answered |= networks
+        for key, spans in found.items():
+            extents.setdefault(key, []).extend(spans)
+    covered = answered - unanswered
+    for key, spans in extents_from_stream(cached).items():
+        extents.setdefault(key, []).extend(spans)
+    kept, pruned = prune_requests(requests_list, extents, covered)
+    return kept, pruned, failed
+
+
+def _check_failed(where, error):
+    REGISTRY.error("availability_check")
+    logger.warning("availability check failed (%s): %s", where, error)
@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+import panel as pn
+
+# Executor bersama untuk pekerjaan I/O di luar IOLoop sesi
+_thread_pool = None
+
+
+def get_thread_pool(max_workers=16):
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quakesee")
+    return _thread_pool
+
+
+def in_thread_pool(func):
+    """
+    Membungkus callback UI menjadi coroutine yang menjalankan func di thread
+    pool bersama. Panel menjalankan coroutine di IOLoop, sehingga func boleh
+    menunggu slot antrean (JobQueue.job) tanpa menahan loop, juga saat
+    dijalankan lewat panel serve tanpa nthreads. Dokumen sesi ikut dibawa.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        context = contextvars.copy_context()
+        future = get_thread_pool().submit(context.run, func, *args, **kwargs)
+        return await asyncio.wrap_future(future)
+    return wrapper
+
+
+def current_document():
+    """Dokumen Bokeh sesi aktif (None jika dijalankan tanpa server)"""
+    return pn.state.curdoc if (pn.state.curdoc is not None and pn.state.curdoc.session_context) else None
+
+
+def on_ui_thread(doc, func, *args, **kwargs):
+    """Menjalankan func di IOLoop sesi (aman untuk mengubah widget dari thread lain)"""
+    if doc is None:
+        func(*args, **kwargs)
+    else:
+        doc.add_next_tick_callback(partial(func, *args, **kwargs))
+
+
+def call_later(doc, delay, func, *args, **kwargs):
+    """
+    Menjalankan func di IOLoop sesi setelah delay detik tanpa menahan thread.
+    Aman dari thread mana pun: pindah ke IOLoop dulu (hanya
+    add_next_tick_callback yang thread-safe) lalu timer dipasang di sana.
+    Tanpa dokumen (skrip/benchmark) memakai threading.Timer.
+    """
+    callback = partial(func, *args, **kwargs)
+    if doc is None:
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True
+        timer.start()
+    elif delay <= 0:
+        doc.add_next_tick_callback(callback)
+    else:
+        timeout = max(1, math.ceil(delay * 1000))
+        doc.add_next_tick_callback(lambda: doc.add_timeout_callback(callback, timeout))
+
+
+class BackgroundTask:
+    """Penanda pekerjaan latar belakang yang dapat dibatalkan"""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self.futures = []
+        # Waktu mulai (untuk durasi di status, juga saat dibatalkan)
+        self.started = time.time()
+        # Pekerjaan antrean (jobs.Job) milik task ini, jika ada
+        self.job = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait_cancelled(self, timeout):
+        """Menunggu maksimal timeout detik; True jika dibatalkan selama menunggu"""
+        return self._cancelled.wait(timeout)
+
+    def cancel(self):
+        self._cancelled.set()
+        for future in self.futures:
+            future.cancel()
+
+    def submit(self, func, *args, **kwargs):
+        future = get_thread_pool().submit(func, *args, **kwargs)
+        self.futures.append(future)
+        return future
@@ -0,0 +1,176 @@
+import csv
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from obspy import UTCDateTime
+
+from quakesee_web.geometry import event_arrays, pairs_within, spherical, stations_within
+from quakesee_web.inventory_index import InventoryIndex
+from quakesee_web.jobs import limited, upstream
+from quakesee_web.merge_engine import DEFAULT_MERGE, merge_stream
+
+# Rentang waktu maksimum event dalam satu query stasiun gabungan (detik)
+MAX_GROUP_SPAN = 30 * 86400
+
+
+def event_name(event):
+    """Nama folder/file per event berdasarkan waktu dan lokasi"""
+    t = UTCDateTime(event['time'])
+    return f"{t.strftime('%Y%m%dT%H%M%S')}_{event['latitude']:.2f}_{event['longitude']:.2f}"
+
+
+def plan_station_queries(events, min_radius, max_radius, start_offset, end_offset, max_span=MAX_GROUP_SPAN):
+    """
+    Mengelompokkan event yang berdekatan menjadi satu query get_stations.
+    Pengelompokan greedy menurut waktu: event paling awal yang belum
+    berkelompok menjadi pusat, lalu mengambil event lain yang belum
+    berkelompok dalam max_radius derajat dan max_span detik darinya.
+    Jangkauan tiap kelompok <= max_radius (maxradius query <= 2 * max_radius)
+    dan jendela waktunya <= max_span ditambah jendela satu event, sehingga
+    rantai event tidak melebarkan query. Mengembalikan daftar query,
+    masing-masing berisi parameter query dan indeks event yang dilayani.
+    """
+    lats, lons = event_arrays(events)
+    times = np.array([UTCDateTime(ev['time']).timestamp for ev in events], dtype=np.float64)
+
+    # Tetangga tiap event (jarak <= max_radius) dalam bentuk CSR
+    i, j = pairs_within(lats, lons, max_radius)
+    src, dst = np.concatenate([i, j]), np.concatenate([j, i])
+    order = np.argsort(src, kind="stable")
+    src, dst = src[order], dst[order]
+    bounds = np.searchsorted(src, np.arange(len(events) + 1))
+
+    grouped = np.zeros(len(events), dtype=bool)
+    queries = []
+    for center in np.argsort(times, kind="stable"):
+        if grouped[center]:
+            continue
+        # Semua event yang lebih awal sudah berkelompok, jadi tetangga tersisa tidak lebih awal
+        near = dst[bounds[center]:bounds[center + 1]]
+        near = near[~grouped[near] & (times[near] - times[center] <= max_span)]
+        members = np.sort(np.append(near, center))
+        grouped[members] = True
+        dist, _, _ = spherical(lats[center], lons[center], lats[members], lons[members])
+        queries.append(dict(
+            latitude=float(lats[center]),
+            longitude=float(lons[center]),
+            minradius=0.0 if len(members) > 1 else min_radius,
+            maxradius=float(min(180.0, dist.max() + max_radius)),
+            starttime=UTCDateTime(times[center]) + start_offset,
+            endtime=UTCDateTime(times[members].max()) + end_offset,
+            events=[int(k) for k in members],
+        ))
+    return queries
+
+
+def stations_for_event(inventory, event, min_radius, max_radius):
+    """Seleksi stasiun lokal (vektor) dari inventory bersama untuk satu event"""
+    return stations_within(inventory, event['latitude'], event['longitude'], min_radius, max_radius)
+
+
+def _fetch_event(client, event, station_keys, channels, start_offset, end_offset, merge):
+    """Waveform satu event; mengembalikan (stream, laporan gap/overlap per kanal)"""
+    t0 = UTCDateTime(event['time'])
+    bulk = [(net, sta, "*", cha, t0 + start_offset, t0 + end_offset)
+            for net, sta in station_keys for cha in channels]
+    if not bulk:
+        return None, []
+    with upstream():
+        st = client.get_waveforms_bulk(bulk)
+    if merge and len(st) > 0:
+        return merge_stream(st, **DEFAULT_MERGE)
+    return st, []
+
+
+def harvest_events(client, events, output_dir, channel="BH?,EH?,HH?", min_radius=0.0,
+                   max_radius=5.0, start_offset=-300, end_offset=3600, max_workers=4,
+                   merge=True, level="response", progress=None):
+    """
+    Mengunduh stasiun dan waveform untuk banyak event sekaligus.
+
+    Query stasiun digabung untuk event yang berdekatan dan inventory dipakai
+    ulang; permintaan waveform dijalankan oleh scheduler dengan jumlah
+    koneksi terbatas (max_workers). Hasil per event ditulis ke output_dir
+    segera setelah selesai, beserta ringkasan summary.csv.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    channels = [c.strip() for c in channel.split(",") if c.strip()]
+    queries = plan_station_queries(events, min_radius, max_radius, start_offset, end_offset)
+
+    summary_path = os.path.join(output_dir, "summary.csv")
+    with open(summary_path, "w", newline="") as f:
+        csv.writer(f).writerow(["event", "time", "latitude", "longitude", "magnitude",
+                                "stations", "waveforms", "gaps", "overlaps", "status"])
+
+    done = 0
+    total = len(events)
+
+    def write_summary(ev, n_sta, n_wave, status, report=()):
+        nonlocal done
+        with open(summary_path, "a", newline="") as f:
+            csv.writer(f).writerow([event_name(ev), ev['time'], ev['latitude'], ev['longitude'],
+                                    ev.get('magnitude', ''), n_sta, n_wave,
+                                    sum(row["gaps"] for row in report),
+                                    sum(row["overlaps"] for row in report), status])
+        done += 1
+        if progress is not None:
+            progress(done, total)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # 1. Query stasiun (satu per kelompok event)
+        inv_futures = {}
+        for q in queries:
+            kwargs = {k: v for k, v in q.items() if k != "events"}
+            inv_futures[pool.submit(limited, client.get_stations, network="*", station="*",
+                                    channel=channel, level=level, **kwargs)] = q
+
+        # 2. Permintaan waveform per event segera setelah inventory kelompoknya tiba
+        wave_futures = {}
+        for future in as_completed(inv_futures):
+            q = inv_futures[future]
+            try:
+                inventory = future.result()
+            except Exception as e:
+                for i in q['events']:
+                    write_summary(events[i], 0, 0, f"station query failed: {e}")
+                continue
+            index = InventoryIndex(inventory)
+            for i in q['events']:
+                keys = stations_for_event(inventory, events[i], min_radius, max_radius)
+                wave_futures[pool.submit(_fetch_event, client, events[i], keys, channels,
+                                         start_offset, end_offset, merge)] = (i, keys, index)
+
+        # 3. Tulis hasil per event secara bertahap
+        for future in as_completed(wave_futures):
+            i, keys, index = wave_futures[future]
+            ev = events[i]
+            name = event_name(ev)
+            report = []
+            try:
+                st, report = future.result()
+                n_wave = len(st) if st is not None else 0
+                if n_wave:
+                    st.write(os.path.join(output_dir, f"{name}.mseed"), format="MSEED")
+                    nslc = [tuple(tr.id.split(".")) for tr in st]
+                    inv = index.select(nslc)
+                else:
+                    inv = index.select_stations(keys)
+                if keys:
+                    inv.write(os.path.join(output_dir, f"{name}.xml"), format="STATIONXML")
+            except Exception as e:
+                write_summary(ev, len(keys), 0, f"failed: {e}", report)
+            else:
+                write_summary(ev, len(keys), n_wave, "ok", report)
+
+    return summary_path
+
+
+def zip_directory(path, fileobj):
+    """Mengemas folder hasil batch (tanpa kompresi ulang miniSEED)"""
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as zipf:
+        for name in sorted(os.listdir(path)):
+            zipf.write(os.path.join(path, name), arcname=name)
+    fileobj.seek(0)
+    return fileobj
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from quakesee_web.background import call_later, current_document
+
+# Toleransi timer IOLoop (detik): jadwal yang hampir jatuh tempo dianggap siap
+_SLACK = 0.005
+
+
+class Coalescer:
+    """
+    Lapisan pembaruan tampilan: perubahan param hanya menandai tampilan yang
+    perlu dirender ulang, lalu setiap tampilan dirender sekali pada tick
+    berikutnya berapapun jumlah perubahan di antaranya.
+
+    Tampilan mahal dapat di-debounce (delay): setiap tanda baru menggeser
+    jadwal render, tetapi tidak lebih dari max_wait sejak tanda pertama
+    sehingga data yang terus mengalir (mis. halaman katalog) tetap tampil.
+    Tanpa server Bokeh (skrip/benchmark) tampilan langsung dirender.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._doc = None
+        self._due = {}
+        # Waktu flush yang sudah terdaftar di IOLoop (monotonic)
+        self._timers = set()
+        self.renders = {}
+
+    def mark(self, view, delay=0.0, max_wait=1.0):
+        doc = current_document() or self._doc
+        if doc is None:
+            self._render(view)
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._doc = doc
+            first, _ = self._due.get(view, (now, None))
+            due = min(now + delay, first + max_wait)
+            self._due[view] = (first, due)
+            schedule = not any(t <= due for t in self._timers)
+            if schedule:
+                self._timers.add(due)
+        if schedule:
+            self._schedule(doc, due - now)
+
+    def flush(self, force=False):
+        """Merender tampilan yang sudah jatuh tempo (semua jika force)"""
+        now = time.monotonic()
+        with self._lock:
+            ready = [view for view, (_, due) in self._due.items() if force or due <= now + _SLACK]
+            for view in ready:
+                del self._due[view]
+            self._timers = {t for t in self._timers if t > now + _SLACK}
+            next_due = min((due for _, due in self._due.values()), default=None)
+            schedule = next_due is not None and self._doc is not None and not any(t <= next_due for t in self._timers)
+            if schedule:
+                self._timers.add(next_due)
+            doc = self._doc
+        for view in ready:
+            self._render(view)
+        if schedule:
+            self._schedule(doc, next_due - now)
+
+    def _schedule(self, doc, delay):
+        # mark bisa dipanggil dari thread pekerja: call_later pindah ke IOLoop
+        # dulu karena add_timeout_callback tidak thread-safe
+        call_later(doc, delay, self.flush)
+
+    def _render(self, view):
+        name = getattr(view, "__name__", repr(view))
+        self.renders[name] = self.renders.get(name, 0) + 1
+        view()
@@ -2,10 +2,8 @@ import panel as pn
 import param
 import pandas as pd
 import requests
-from datetime import datetime, timedelta
-from obspy import UTCDateTime
+from datetime import datetime
 from obspy.core.event import Catalog, Event, Origin, Magnitude, ResourceIdentifier
-import re
 from bokeh.plotting import figure
 from bokeh.models import ColumnDataSource, BoxEditTool, WMTSTileSource
 import pyproj
@@ -13,6 +11,13 @@ import io
 import zipfile
 import time
 
+from quakesee_web.background import in_thread_pool
+from quakesee_web.metrics import span
+from quakesee_web.profiling import profiled
+from quakesee_web import isc_fetcher
+from quakesee_web.jobs import BULK, get_job_queue, queue_message
+from quakesee_web.shared_cache import session_id
+
 class EQCatFetcher(pn.Column):
     def __init__(self, **params):
         super().__init__(**params)
@@ -40,6 +45,9 @@ class EQCatFetcherParam(param.Parameterized):
         self.transformer_to_mercator = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
         self.transformer_to_latlon = pyproj.Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
 
+        # Penanda sinkronisasi kotak <-> input (mencegah pantulan perubahan)
+        self._syncing = False
+
         # Sumber data untuk kotak
         self.source = ColumnDataSource(data=self.get_box_data())
 
@@ -74,7 +82,7 @@ class EQCatFetcherParam(param.Parameterized):
         self.progress_bar = pn.widgets.Progress(value=self.progress, sizing_mode="stretch_width")
 
         self.download_button = pn.widgets.FileDownload(
-            callback=lambda: self.download_catalog(),
+            callback=in_thread_pool(self.download_catalog),
             filename="earthquake_catalog.zip",
             button_type="primary",
             label="Download Catalog (.zip)"
@@ -82,9 +90,10 @@ class EQCatFetcherParam(param.Parameterized):
 
     def create_map(self):
         # Membuat peta dengan OpenStreetMap (cara lama)
+        box = self.source.data
         self.plot = figure(
-            x_range=(self.lon_to_mercator(self.left_lon), self.lon_to_mercator(self.right_lon)),
-            y_range=(self.lat_to_mercator(self.bot_lat), self.lat_to_mercator(self.top_lat)),
+            x_range=(box["left"][0], box["right"][0]),
+            y_range=(box["bottom"][0], box["top"][0]),
             title="Gambar Kotak untuk Memilih Area",
             tools="pan, wheel_zoom, reset",
             x_axis_type="mercator",
@@ -111,18 +120,9 @@ class EQCatFetcherParam(param.Parameterized):
         self.source.on_change("data", self.update_inputs)
 
     def get_box_data(self):
-        """Menghasilkan data kotak berdasarkan nilai input"""
-        return dict(
-            left=[self.lon_to_mercator(self.left_lon)],
-            right=[self.lon_to_mercator(self.right_lon)],
-            top=[self.lat_to_mercator(self.top_lat)],
-            bottom=[self.lat_to_mercator(self.bot_lat)],
-        )
-
-    def get_box_data(self):
-        """Menghasilkan data kotak berdasarkan nilai input"""
-        left, bottom = self.lon_to_mercator(self.left_lon), self.lat_to_mercator(self.bot_lat)
-        right, top = self.lon_to_mercator(self.right_lon), self.lat_to_mercator(self.top_lat)
+        """Menghasilkan data kotak berdasarkan nilai input (satu transformasi untuk dua sudut)"""
+        (left, right), (bottom, top) = self.transformer_to_mercator.transform(
+            [self.left_lon, self.right_lon], [self.bot_lat, self.top_lat])
         return dict(left=[left], right=[right], top=[top], bottom=[bottom])
 
     def lon_to_mercator(self, lon):
@@ -146,16 +146,35 @@ class EQCatFetcherParam(param.Parameterized):
         return max(min(lat, 90), -90)  # Jaga agar tetap dalam rentang valid
     
     def update_box(self, *events):
-        """Memperbarui kotak saat input berubah"""
-        self.source.data = self.get_box_data()
+        """Memperbarui kotak saat input berubah (sekali untuk satu batch perubahan)"""
+        if self._syncing:
+            return
+        data = self.get_box_data()
+        if data == dict(self.source.data):
+            return
+        self._syncing = True
+        try:
+            self.source.data = data
+        finally:
+            self._syncing = False
 
     def update_inputs(self, attr, old, new):
         """Memperbarui input saat kotak diubah"""
-        if len(new["left"]) > 0:
-            self.left_lon = self.mercator_to_lon(new["left"][0])
-            self.right_lon = self.mercator_to_lon(new["right"][0])
-            self.bot_lat = self.mercator_to_lat(new["bottom"][0])
-            self.top_lat = self.mercator_to_lat(new["top"][0])
+        if self._syncing or len(new["left"]) == 0:
+            return
+        # Dua sudut dalam satu transformasi, empat param dalam satu batch
+        (left, right), (bottom, top) = self.transformer_to_latlon.transform(
+            [new["left"][0], new["right"][0]], [new["bottom"][0], new["top"][0]])
+        self._syncing = True
+        try:
+            self.param.update(
+                left_lon=left,
+                right_lon=right,
+                bot_lat=max(min(bottom, 90), -90),
+                top_lat=max(min(top, 90), -90),
+            )
+        finally:
+            self._syncing = False
 
     def create_layout(self):
 
@@ -196,108 +215,28 @@ class EQCatFetcherParam(param.Parameterized):
         )
     
     def convert_to_dict(self, lines):
-        catalog = []
-        start = False
-        for line in lines:
-            if "DATA_TYPE EVENT_CATALOGUE" in line:
-                start = True
-                continue
-            if start and line.strip() == "":
-                break
-            if start:
-                # Parsing setiap baris data
-                columns = re.split(r',\s*', line.strip())
-                if len(columns) < 8:
-                    continue  # Abaikan baris yang tidak sesuai format
-                
-                event_id = columns[0].strip()
-
-                if event_id == "EVENTID": continue
-                
-                try:
-                    # Pastikan data waktu memiliki format yang valid
-                    event_date = columns[3].strip()  # Hapus spasi
-                    event_time = columns[4].strip()  # Hapus spasi
-                    datetime_str = f"{event_date}T{event_time}"  # Gabungkan tanggal dan waktu
-                    event_time = UTCDateTime(datetime_str)  # Konversi ke UTCDateTime
-                except Exception as e:
-                    print(f"Error parsing time for event {event_id}: {e}")
-                    continue  # Abaikan jika format tidak valid
-                
-                latitude = float(columns[5])
-                longitude = float(columns[6])
-                depth = float(columns[7]) if columns[7] else None
-                magnitude_value = float(columns[11])
-                magnitude_type = columns[10].strip()
-
-                catalog.append({
-                    "time": event_time,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "depth": depth,
-                    "magnitude": magnitude_value,
-                    "magnitude_type": magnitude_type
-                })
-        return catalog
+        return isc_fetcher.parse_records(lines)
     
     def convert_to_xml(self, catalog, lines):
-        start = False
-        for line in lines:
-            if "DATA_TYPE EVENT_CATALOGUE" in line:
-                start = True
-                continue
-            if start and line.strip() == "":
-                break
-            if start:
-                # Parsing setiap baris data
-                columns = re.split(r',\s*', line.strip())
-                if len(columns) < 8:
-                    continue  # Abaikan baris yang tidak sesuai format
-                
-                event_id = columns[0].strip()
-
-                if event_id == "EVENTID": continue
-                
-                try:
-                    # Pastikan data waktu memiliki format yang valid
-                    event_date = columns[3].strip()  # Hapus spasi
-                    event_time = columns[4].strip()  # Hapus spasi
-                    datetime_str = f"{event_date}T{event_time}"  # Gabungkan tanggal dan waktu
-                    event_time = UTCDateTime(datetime_str)  # Konversi ke UTCDateTime
-                except Exception as e:
-                    print(f"Error parsing time for event {event_id}: {e}")
-                    continue  # Abaikan jika format tidak valid
-                
-                latitude = float(columns[5])
-                longitude = float(columns[6])
-                depth = float(columns[7]) if columns[7] else None
-                magnitude_value = float(columns[11])
-                magnitude_type = columns[10].strip()
-
-                # Buat objek ObsPy Event
-                event = Event(resource_id=ResourceIdentifier(event_id))
-                origin = Origin(time=event_time, latitude=latitude, longitude=longitude, depth=depth * 1000)
-                magnitude = Magnitude(mag=magnitude_value, magnitude_type=magnitude_type)
-                
-                event.origins.append(origin)
-                event.magnitudes.append(magnitude)
-                catalog.events.append(event)
+        for event_id, event_time, latitude, longitude, depth, magnitude_value, magnitude_type in isc_fetcher.parse_rows(lines):
+            # Buat objek ObsPy Event
+            event = Event(resource_id=ResourceIdentifier(event_id))
+            origin = Origin(time=event_time, latitude=latitude, longitude=longitude, depth=depth * 1000)
+            magnitude = Magnitude(mag=magnitude_value, magnitude_type=magnitude_type)
+            
+            event.origins.append(origin)
+            event.magnitudes.append(magnitude)
+            catalog.events.append(event)
 
     def build_url(self, params):
-        base_url = "http://www.isc.ac.uk/cgi-bin/web-db-run"
-        query = (
-            f"?request=COMPREHENSIVE&out_format=CATCSV&searchshape=RECT"
-            f"&bot_lat={params['bot_lat']}&top_lat={params['top_lat']}"
-            f"&left_lon={params['left_lon']}&right_lon={params['right_lon']}"
-            f"&start_year={params['start_date'].year}&start_month={params['start_date'].month}&start_day={params['start_date'].day}"
-            f"&start_time=00%3A00%3A00"
-            f"&end_year={params['end_date'].year}&end_month={params['end_date'].month}&end_day={params['end_date'].day}"
-            f"&end_time=23%3A59%3A59"
-            f"&min_dep={params['min_dep']}&max_dep={params['max_dep']}"
-            f"&min_mag={params['min_mag']}&max_mag={params['max_mag']}"
-        )
-        return base_url + query
+        return isc_fetcher.build_url(params)
     
+    def _show_queue_position(self, position):
+        self.status = queue_message(position)
+        self.status_pane.object = self.status
+
+    @profiled("download_catalog", sizes=lambda self: dict(step_days=self.step_days.value,
+                                                         days=(self.end_date.value - self.start_date.value).days))
     def download_catalog(self):
         beginning = time.time()
 
@@ -322,76 +261,78 @@ class EQCatFetcherParam(param.Parameterized):
 
         current_date = params["start_date"]
         end_date = params["end_date"]
-        step = timedelta(days=params["step_days"])
-        total_steps = (end_date - current_date).days // params["step_days"] + 1
+        windows = isc_fetcher.date_windows(current_date, end_date, params["step_days"])
+        total_steps = len(windows)
         current_step = 0
 
-        # Buat buffer untuk menyimpan file ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            if self.ef_var.value:
-                csv_dict = []
-                csv_name = f"{current_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}.events"
-
-            if self.rec_var.value:
-                catalog = Catalog()
-                xml_name = f"{current_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}.xml"
-
-            while current_date < end_date:
-                next_date = min(current_date + step, end_date)
-                file_name = f"{current_date.strftime('%Y-%m-%d')}_to_{next_date.strftime('%Y-%m-%d')}.txt"
-
-                params["start_date"], params["end_date"] = current_date, next_date
-                url = self.build_url(params)
-
-                try:
-                    response = requests.get(url)
-                    response.raise_for_status()
-                    text = response.text
-                    idx = text.find("----EVENT-----")
-                    if idx != -1:
-                        # Simpan file ke dalam ZIP
-                        zip_file.writestr(file_name, text)
-                        self.status = f"Downloaded: {file_name}"
+        # Penarikan bulk lewat antrean server bersama (posisi antrean tampil di status)
+        with get_job_queue().job("catalog_bulk", owner=session_id(), priority=BULK,
+                                 on_wait=self._show_queue_position):
+            # Buat buffer untuk menyimpan file ZIP
+            zip_buffer = io.BytesIO()
+            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                if self.ef_var.value:
+                    csv_dict = []
+                    csv_name = f"{current_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}.events"
+
+                if self.rec_var.value:
+                    catalog = Catalog()
+                    xml_name = f"{current_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}.xml"
+
+                for current_date, next_date in windows:
+                    file_name = f"{current_date.strftime('%Y-%m-%d')}_to_{next_date.strftime('%Y-%m-%d')}.txt"
+
+                    try:
+                        text = isc_fetcher.fetch_window(params, current_date, next_date)
+                        if text is not None:
+                            # Simpan file ke dalam ZIP
+                            zip_file.writestr(file_name, text)
+                            self.status = f"Downloaded: {file_name}"
+                            self.status_pane.object = self.status
+
+                            with span("parse") as s:
+                                if self.ef_var.value:
+                                    textlines = text.splitlines()
+                                    n_before = len(csv_dict)
+                                    csv_dict += self.convert_to_dict(textlines)
+                                    s.add(records=len(csv_dict) - n_before)
+
+                                if self.rec_var.value:
+                                    textlines = text.splitlines()
+                                    self.convert_to_xml(catalog, textlines)
+
+                        else:
+                            self.status = f"{file_name} doesn't have at least one event."
+                            self.status_pane.object = self.status
+
+                    except requests.exceptions.RequestException as e:
+                        self.status = f"Failed to download: {file_name}. Error: {e}"
                         self.status_pane.object = self.status
 
-                        if self.ef_var.value:
-                            textlines = text.splitlines()
-                            csv_dict += self.convert_to_dict(textlines)
+                    current_step += 1
 
-                        if self.rec_var.value:
-                            textlines = text.splitlines()
-                            self.convert_to_xml(catalog, textlines)
+                    # Update progress
+                    self.progress = int((current_step / total_steps) * 100)
+                    self.progress_bar.value = self.progress
 
-                    else:
-                        self.status = f"{file_name} doesn't have at least one event."
-                        self.status_pane.object = self.status
-
-                except requests.exceptions.RequestException as e:
-                    self.status = f"Failed to download: {file_name}. Error: {e}"
+                if self.ef_var.value:
+                    with span("serialization") as s:
+                        df = pd.DataFrame(csv_dict)
+                        csv_buffer = io.StringIO()
+                        df.to_csv(csv_buffer, index=False, encoding="utf-8")
+                        zip_file.writestr(csv_name, csv_buffer.getvalue())
+                        s.add(nbytes=csv_buffer.tell(), records=len(df))
+                    self.status = f"Data successfully saved to {csv_name}"
                     self.status_pane.object = self.status
 
-                current_date = next_date + timedelta(days=1)
-                current_step += 1
-
-                # Update progress
-                self.progress = int((current_step / total_steps) * 100)
-                self.progress_bar.value = self.progress
-
-            if self.ef_var.value:
-                df = pd.DataFrame(csv_dict)
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False, encoding="utf-8")
-                zip_file.writestr(csv_name, csv_buffer.getvalue())
-                self.status = f"Data successfully saved to {csv_name}"
-                self.status_pane.object = self.status
-
-            if self.rec_var.value:
-                xml_buffer = io.StringIO()
-                catalog.write(xml_buffer, format="QUAKEML")
-                zip_file.writestr(xml_name, xml_buffer.getvalue())
-                self.status = f"Data successfully saved to {xml_name}"
-                self.status_pane.object = self.status
+                if self.rec_var.value:
+                    with span("serialization") as s:
+                        xml_buffer = io.StringIO()
+                        catalog.write(xml_buffer, format="QUAKEML")
+                        zip_file.writestr(xml_name, xml_buffer.getvalue())
+                        s.add(nbytes=xml_buffer.tell(), records=len(catalog))
+                    self.status = f"Data successfully saved to {xml_name}"
+                    self.status_pane.object = self.status
 
         # Siapkan FileDownload
         zip_buffer.seek(0)
@@ -0,0 +1,184 @@
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from obspy import UTCDateTime
+from obspy.clients.fdsn.header import FDSNNoDataException
+
+from quakesee_web.jobs import upstream
+from quakesee_web.metrics import span
+
+# Kolom yang dipakai tabel/peta (urutan sama dengan earthquake_data)
+EVENT_COLUMNS = ["time", "latitude", "longitude", "depth", "magnitude", "magnitude_type"]
+# Kolom tambahan dari QuakeML penuh (origin terpilih): jumlah origin/magnitudo/
+# pick/arrival, ketidakpastian lokasi, kualitas dan jenis event
+DETAIL_COLUMNS = ["event_id", "origins", "magnitudes", "picks", "arrivals", "time_uncertainty",
+                  "latitude_uncertainty", "longitude_uncertainty", "depth_uncertainty", "horizontal_uncertainty",
+                  "standard_error", "azimuthal_gap", "used_phase_count", "used_station_count",
+                  "evaluation_mode", "event_type", "region"]
+
+
+def empty_events():
+    return pd.DataFrame({col: pd.Series(dtype="float64" if col not in ("time", "magnitude_type") else "object")
+                         for col in EVENT_COLUMNS})
+
+
+def _uncertainty(errors, scale=1.0):
+    value = getattr(errors, "uncertainty", None) if errors is not None else None
+    return None if value is None else value * scale
+
+
+def catalog_to_records(catalog):
+    """Kolom tabel/peta ditambah DETAIL_COLUMNS dari obspy Catalog (origin/magnitudo terpilih)"""
+    records = []
+    for ev in catalog:
+        origin = ev.preferred_origin() or (ev.origins[0] if ev.origins else None)
+        magnitude = ev.preferred_magnitude() or (ev.magnitudes[0] if ev.magnitudes else None)
+        if origin is None:
+            continue
+        quality = origin.quality
+        horizontal = origin.origin_uncertainty
+        records.append({
+            "time": str(origin.time),
+            "latitude": origin.latitude,
+            "longitude": origin.longitude,
+            "depth": origin.depth / 1000 if origin.depth is not None else None,
+            "magnitude": magnitude.mag if magnitude is not None else None,
+            "magnitude_type": magnitude.magnitude_type if magnitude is not None else None,
+            "event_id": ev.resource_id.id.split("=")[-1].split("/")[-1],
+            "origins": len(ev.origins),
+            "magnitudes": len(ev.magnitudes),
+            "picks": len(ev.picks),
+            "arrivals": len(origin.arrivals),
+            "time_uncertainty": _uncertainty(origin.time_errors),
+            "latitude_uncertainty": _uncertainty(origin.latitude_errors),
+            "longitude_uncertainty": _uncertainty(origin.longitude_errors),
+            "depth_uncertainty": _uncertainty(origin.depth_errors, 1 / 1000),
+            "horizontal_uncertainty": (horizontal.horizontal_uncertainty / 1000
+                                       if horizontal is not None and horizontal.horizontal_uncertainty is not None
+                                       else None),
+            "standard_error": quality.standard_error if quality is not None else None,
+            "azimuthal_gap": quality.azimuthal_gap if quality is not None else None,
+            "used_phase_count": quality.used_phase_count if quality is not None else None,
+            "used_station_count": quality.used_station_count if quality is not None else None,
+            "evaluation_mode": origin.evaluation_mode,
+            "event_type": ev.event_type,
+            "region": ev.event_descriptions[0].text if ev.event_descriptions else None,
+        })
+    return records
+
+
+def parse_event_text(text):
+    """
+    Parsing keluaran fdsnws-event format=text langsung ke DataFrame kolom.
+    #EventID|Time|Latitude|Longitude|Depth/km|Author|Catalog|Contributor|
+    ContributorID|MagType|Magnitude|MagAuthor|EventLocationName
+    """
+    if not text.strip():
+        return empty_events()
+    df = pd.read_csv(io.StringIO(text), sep="|", dtype={"MagType": "object"})
+    df.columns = [c.strip().lstrip("#").strip() for c in df.columns]
+    times = pd.to_datetime(df["Time"], utc=True, format="ISO8601")
+    out = pd.DataFrame({
+        "time": times.dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "latitude": pd.to_numeric(df["Latitude"], errors="coerce"),
+        "longitude": pd.to_numeric(df["Longitude"], errors="coerce"),
+        "depth": pd.to_numeric(df["Depth/km"], errors="coerce"),
+        "magnitude": pd.to_numeric(df["Magnitude"], errors="coerce"),
+        "magnitude_type": df["MagType"],
+    })
+    out["event_id"] = df["EventID"].astype(str)
+    return out
+
+
+def time_pages(start, end, page_days):
+    """Membagi rentang waktu menjadi halaman [t0, t1] sepanjang page_days"""
+    start, end = UTCDateTime(start), UTCDateTime(end)
+    step = max(1, page_days) * 86400
+    pages = []
+    t0 = start
+    while t0 < end:
+        t1 = min(t0 + step, end)
+        pages.append((t0, t1))
+        t0 = t1
+    return pages
+
+
+def fetch_page_text(base_url, t0, t1, min_mag, limit=None, timeout=120):
+    """Satu halaman dari fdsnws-event dengan format=text (tanpa QuakeML)"""
+    params = dict(starttime=UTCDateTime(t0).isoformat(), endtime=UTCDateTime(t1).isoformat(),
+                  minmagnitude=min_mag, format="text", nodata=404)
+    if limit:
+        params["limit"] = limit
+    with upstream(), span("http_fetch") as s:
+        response = requests.get(base_url.rstrip("/") + "/fdsnws/event/1/query", params=params, timeout=timeout)
+        s.add(nbytes=len(response.content))
+    if response.status_code in (204, 404):
+        return empty_events()
+    response.raise_for_status()
+    with span("parse") as s:
+        df = parse_event_text(response.text)
+        s.add(records=len(df))
+    return df
+
+
+def fetch_page_quakeml(client, t0, t1, min_mag, limit=None):
+    """
+    Satu halaman QuakeML penuh (semua origin dan arrival) dengan kolom
+    DETAIL_COLUMNS; hanya jika detail penuh dibutuhkan.
+    """
+    try:
+        # Unduh dan parsing QuakeML terjadi di dalam obspy, dicatat sebagai satu tahap
+        with upstream(), span("http_fetch") as s:
+            catalog = client.get_events(starttime=t0, endtime=t1, minmagnitude=min_mag, limit=limit,
+                                        includeallorigins=True, includearrivals=True)
+            s.add(records=len(catalog))
+    except FDSNNoDataException:
+        return empty_events().reindex(columns=EVENT_COLUMNS + DETAIL_COLUMNS)
+    return pd.DataFrame(catalog_to_records(catalog), columns=EVENT_COLUMNS + DETAIL_COLUMNS)
+
+
+def fetch_page(source, t0, t1, min_mag, limit=None, last=True):
+    if isinstance(source, str):
+        df = fetch_page_text(source, t0, t1, min_mag, limit)
+    else:
+        df = fetch_page_quakeml(source, t0, t1, min_mag, limit)
+    if not last and len(df):
+        # Batas halaman inklusif di FDSN, event tepat di t1 milik halaman berikutnya
+        df = df[pd.to_datetime(df["time"], utc=True) < pd.Timestamp(UTCDateTime(t1).datetime, tz="UTC")]
+    return df
+
+
+def fetch_events_paged(source, start, end, min_mag, limit=None, page_days=30,
+                       max_workers=4, on_page=None, task=None):
+    """
+    Mengambil event per halaman waktu secara paralel. source adalah base URL
+    FDSN (jalur cepat format=text) atau obspy Client (QuakeML penuh).
+    on_page(df, done, total) dipanggil setiap halaman selesai; task.cancelled
+    menghentikan halaman sisa. Dengan limit, satu permintaan saja.
+    """
+    pages = [(UTCDateTime(start), UTCDateTime(end))] if limit else time_pages(start, end, page_days)
+    frames = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch_page, source, t0, t1, min_mag, limit, i == len(pages) - 1)
+                   for i, (t0, t1) in enumerate(pages)]
+        if task is not None:
+            task.futures.extend(futures)
+        for future in as_completed(futures):
+            if task is not None and task.cancelled:
+                for f in futures:
+                    f.cancel()
+                break
+            if future.cancelled():
+                continue
+            page = future.result()
+            frames.append(page)
+            done += 1
+            if on_page is not None:
+                on_page(page, done, len(pages))
+
+    if not frames:
+        return empty_events()
+    return pd.concat(frames, ignore_index=True).sort_values("time", ignore_index=True)
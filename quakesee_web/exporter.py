@@ -0,0 +1,112 @@
+import io
+import tempfile
+import zipfile
+
+from obspy import Stream
+
+from quakesee_web.metrics import span
+from quakesee_web.mseed_index import LazyStream, decode_payload, station_payloads
+from quakesee_web.workers import imap_unordered
+
+# Pilihan kompresi ZIP (0 = simpan tanpa kompresi, paling cepat)
+ZIP_LEVELS = {
+    "Store (fastest)": 0,
+    "Fast (1)": 1,
+    "Default (6)": 6,
+    "Best (9)": 9,
+}
+
+# Ekspor di atas ukuran ini ditulis ke disk, bukan ke memori
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+
+def new_spool():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+def sac_filename(tr):
+    """Nama file berdasarkan network, station, channel, timestamp"""
+    return f"{tr.stats.network}_{tr.stats.station}_{tr.stats.channel}_{tr.stats.starttime.strftime('%Y%m%d_%H%M%S')}.sac"
+
+
+def _encode_sac(payload, merge_kwargs):
+    files = []
+    for tr in decode_payload(payload, merge_kwargs):
+        sac_buffer = io.BytesIO()
+        tr.write(sac_buffer, format="SAC")
+        files.append((sac_filename(tr), sac_buffer.getvalue()))
+    return files
+
+
+def _encode_format(payload, merge_kwargs, fmt):
+    st = decode_payload(payload, merge_kwargs)
+    buffer = io.BytesIO()
+    st.write(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def write_sac_zip(st, compresslevel=6, parallel=True, fileobj=None):
+    """
+    Encode setiap trace ke SAC di pool worker dan tulis entri ZIP segera
+    setelah stasiun selesai. compresslevel=0 menyimpan tanpa kompresi.
+    """
+    fileobj = new_spool() if fileobj is None else fileobj
+    if compresslevel:
+        zip_args = dict(compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+    else:
+        zip_args = dict(compression=zipfile.ZIP_STORED)
+
+    with span("serialization") as s:
+        with zipfile.ZipFile(fileobj, "w", **zip_args) as zipf:
+            if st is not None:
+                jobs = ((payload, merge_kwargs) for _, payload, merge_kwargs in station_payloads(st))
+                for _, files in imap_unordered(_encode_sac, jobs, parallel=parallel):
+                    for filename, data in files:
+                        zipf.writestr(filename, data)
+                    s.add(records=len(files))
+        s.add(nbytes=fileobj.tell())
+
+    fileobj.seek(0)
+    return fileobj
+
+
+def mseed_chunks(st, parallel=True):
+    """
+    Byte miniSEED per stasiun, dihasilkan segera setelah stasiun selesai
+    (record miniSEED dapat digabung langsung, mis. untuk respons chunked).
+    LazyStream tanpa merge disalin mentah tanpa decode.
+    """
+    if isinstance(st, LazyStream) and st.merge_kwargs is None:
+        for station in st.stations():
+            yield st.raw(station=station)
+        return
+    jobs = ((payload, merge_kwargs, "MSEED") for _, payload, merge_kwargs in station_payloads(st))
+    for _, data in imap_unordered(_encode_format, jobs, parallel=parallel):
+        yield data
+
+
+def export_file(obj, fmt, parallel=True, fileobj=None):
+    """
+    Menulis Stream/LazyStream/Inventory ke satu file dengan format obspy.
+    MSEED dari LazyStream disalin mentah; waveform lain di-encode per stasiun
+    di pool worker (record miniSEED dapat digabung langsung).
+    """
+    fileobj = new_spool() if fileobj is None else fileobj
+    fmt = fmt.upper()
+
+    with span("serialization") as s:
+        if obj is None:
+            pass
+        elif isinstance(obj, LazyStream) and fmt == "MSEED" and obj.merge_kwargs is None:
+            obj.write(fileobj, format="MSEED")
+        elif isinstance(obj, (Stream, LazyStream)) and fmt == "MSEED":
+            for data in mseed_chunks(obj, parallel=parallel):
+                fileobj.write(data)
+        elif isinstance(obj, LazyStream):
+            obj.to_stream().write(fileobj, format=fmt)
+        else:
+            obj.write(fileobj, format=fmt)
+        s.add(nbytes=fileobj.tell())
+
+    fileobj.seek(0)
+    return fileobj
@@ -0,0 +1,132 @@
+import numpy as np
+
+# Jari-jari bumi rata-rata (km), sama dengan obspy.geodetics
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360.0
+# Kolom tambahan tabel stasiun relatif terhadap event
+GEOMETRY_COLUMNS = ["distance", "distance_km", "azimuth", "back_azimuth"]
+# Baris matriks jarak event x event yang dihitung sekaligus
+BLOCK_ROWS = 2048
+
+_geod = None
+
+
+def station_arrays(inventory):
+    """Kunci (network, station), lintang dan bujur semua stasiun inventory"""
+    keys, lats, lons = [], [], []
+    for net in inventory:
+        for sta in net:
+            keys.append((net.code, sta.code))
+            lats.append(sta.latitude)
+            lons.append(sta.longitude)
+    return keys, np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64)
+
+
+def event_arrays(events):
+    """Lintang dan bujur daftar event (dict dengan latitude/longitude)"""
+    lats = np.array([ev['latitude'] for ev in events], dtype=np.float64)
+    lons = np.array([ev['longitude'] for ev in events], dtype=np.float64)
+    return lats, lons
+
+
+def spherical(lat1, lon1, lat2, lon2, dtype=np.float64):
+    """
+    Jarak episentral (derajat), azimuth titik 1 -> 2 dan back-azimuth
+    (azimuth dari titik 2 ke titik 1) pada bola, untuk array yang dapat
+    di-broadcast. Untuk semua pasangan event x stasiun berikan event
+    berbentuk (E, 1) dan stasiun (S,). dtype=np.float32 menghemat memori
+    untuk matriks besar (ketelitian ~0.001 derajat).
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=dtype)) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    sin1, cos1 = np.sin(lat1), np.cos(lat1)
+    sin2, cos2 = np.sin(lat2), np.cos(lat2)
+    sin_dlon, cos_dlon = np.sin(dlon), np.cos(dlon)
+
+    # Haversine: stabil untuk jarak kecil
+    h = np.sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * np.sin(dlon / 2) ** 2
+    dist = np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0, 1))))
+    az = np.degrees(np.arctan2(sin_dlon * cos2, cos1 * sin2 - sin1 * cos2 * cos_dlon)) % 360
+    baz = np.degrees(np.arctan2(-sin_dlon * cos1, cos2 * sin1 - sin2 * cos1 * cos_dlon)) % 360
+    return dist, az, baz
+
+
+def ellipsoidal(lat1, lon1, lat2, lon2):
+    """
+    Jarak (km), azimuth dan back-azimuth pada elipsoid WGS84 dengan satu
+    panggilan batch pyproj Geod.inv (lebih teliti, lebih lambat dari spherical).
+    """
+    global _geod
+    if _geod is None:
+        from pyproj import Geod
+
+        _geod = Geod(ellps="WGS84")
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (lat1, lon1, lat2, lon2)))
+    az, baz, meters = _geod.inv(lon1.ravel(), lat1.ravel(), lon2.ravel(), lat2.ravel())
+    shape = lat1.shape
+    return (np.asarray(meters).reshape(shape) / 1000.0, np.asarray(az).reshape(shape) % 360,
+            np.asarray(baz).reshape(shape) % 360)
+
+
+def event_station_geometry(ev_lats, ev_lons, sta_lats, sta_lons, method="spherical", dtype=np.float64):
+    """
+    Geometri semua pasangan event x stasiun dalam satu panggilan vektor.
+    Mengembalikan dict array (E, S): distance (derajat), distance_km,
+    azimuth (event -> stasiun) dan back_azimuth (stasiun -> event).
+    Hanya metode terpilih yang dihitung; dengan method="wgs84" distance
+    adalah jarak geodesik km dibagi KM_PER_DEGREE.
+    """
+    ev_lats = np.atleast_1d(np.asarray(ev_lats, dtype=np.float64))[:, None]
+    ev_lons = np.atleast_1d(np.asarray(ev_lons, dtype=np.float64))[:, None]
+    if method == "wgs84":
+        km, az, baz = ellipsoidal(ev_lats, ev_lons, sta_lats, sta_lons)
+        dist = km / KM_PER_DEGREE
+    else:
+        dist, az, baz = spherical(ev_lats, ev_lons, sta_lats, sta_lons, dtype=dtype)
+        km = dist * KM_PER_DEGREE
+    return dict(distance=dist, distance_km=km, azimuth=az, back_azimuth=baz)
+
+
+def pairs_within(lats, lons, radius, dtype=np.float32):
+    """
+    Pasangan indeks (i, j), i < j, dengan jarak <= radius derajat. Matriks
+    jarak dihitung per blok BLOCK_ROWS baris sehingga memori tetap terbatas.
+    """
+    found_i, found_j = [], []
+    for start in range(0, len(lats), BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, len(lats))
+        dist, _, _ = spherical(lats[start:stop, None], lons[start:stop, None], lats, lons, dtype=dtype)
+        i, j = np.nonzero(dist <= radius)
+        i += start
+        keep = i < j
+        found_i.append(i[keep])
+        found_j.append(j[keep])
+    if not found_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(found_i), np.concatenate(found_j)
+
+
+def stations_within(inventory, latitude, longitude, min_radius, max_radius):
+    """Kunci (network, station) dalam min_radius..max_radius derajat dari titik"""
+    keys, lats, lons = station_arrays(inventory)
+    if not keys:
+        return []
+    dist, _, _ = spherical(latitude, longitude, lats, lons)
+    mask = (dist >= min_radius) & (dist <= max_radius)
+    return sorted({keys[i] for i in np.nonzero(mask)[0]})
+
+
+def covers(cached, query):
+    """
+    True jika query get_stations (dict) merupakan subset query lain yang
+    hasilnya sudah ada: parameter selain lokasi/radius sama dan cincin
+    minradius..maxradius query berada di dalam cincin cached.
+    """
+    rest = ("latitude", "longitude", "minradius", "maxradius")
+    if cached.keys() != query.keys() or any(cached[k] != query[k] for k in query if k not in rest):
+        return False
+    offset, _, _ = spherical(cached['latitude'], cached['longitude'], query['latitude'], query['longitude'])
+    offset = float(offset)
+    if offset + query['maxradius'] > cached['maxradius']:
+        return False
+    return cached['minradius'] <= 0 or query['minradius'] - offset >= cached['minradius']
@@ -0,0 +1,138 @@
+import copy
+
+import numpy as np
+from obspy.core.inventory import Inventory
+
+from quakesee_web.geometry import event_station_geometry, station_arrays, stations_within
+
+
+class InventoryIndex:
+    """
+    Tampilan terindeks dari Inventory dengan kunci (network, station, location, channel).
+
+    Stasiun tanpa informasi kanal (mis. hasil konversi dari .csv) diindeks
+    dengan kunci (network, station, None, None). Satu kunci dapat menunjuk
+    beberapa epoch.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.channels = {}
+        self.stations = {}
+
+        for i, net in enumerate(inventory):
+            for j, sta in enumerate(net):
+                self.stations.setdefault((net.code, sta.code), []).append((i, j))
+                if not sta.channels:
+                    self.channels.setdefault((net.code, sta.code, None, None), []).append((i, j, None))
+                for k, cha in enumerate(sta.channels):
+                    self.channels.setdefault((net.code, sta.code, cha.location_code, cha.code), []).append((i, j, k))
+
+    def __len__(self):
+        return len(self.channels)
+
+    def __contains__(self, key):
+        return key in self.channels
+
+    def station_keys(self):
+        return set(self.stations)
+
+    def get_channel(self, key, time=None):
+        """Kanal untuk kunci NSLC yang epoch-nya mencakup time (atau epoch pertama)"""
+        channels = [self.inventory.networks[i].stations[j].channels[k]
+                    for i, j, k in self.channels.get(key, []) if k is not None]
+        for cha in channels:
+            if time is None or ((cha.start_date is None or cha.start_date <= time) and
+                                (cha.end_date is None or time <= cha.end_date)):
+                return cha
+        return None
+
+    def select(self, nslc_keys):
+        """
+        Memilih kanal yang ada pada nslc_keys dalam satu kali lintasan dan
+        membangun Inventory baru (salinan dangkal, tanpa deepcopy).
+        """
+        keys = set(nslc_keys)
+        wanted_stations = {(net, sta) for net, sta, _, _ in keys}
+
+        picked = {}
+        for key, positions in self.channels.items():
+            if key[2] is None:
+                if key[:2] in wanted_stations:
+                    for i, j, _ in positions:
+                        picked.setdefault((i, j), [])
+            elif key in keys:
+                for i, j, k in positions:
+                    picked.setdefault((i, j), []).append(k)
+
+        return self._build(picked)
+
+    def select_stations(self, station_keys):
+        """Memilih stasiun berdasarkan pasangan (network, station), semua kanal ikut"""
+        picked = {}
+        for key in set(station_keys) & self.stations.keys():
+            for i, j in self.stations[key]:
+                picked[(i, j)] = None
+        return self._build(picked)
+
+    def _build(self, picked):
+        networks = []
+        by_network = {}
+        for (i, j), chans in sorted(picked.items()):
+            by_network.setdefault(i, []).append((j, chans))
+
+        for i, items in by_network.items():
+            net = copy.copy(self.inventory.networks[i])
+            stations = []
+            for j, chans in items:
+                sta = copy.copy(self.inventory.networks[i].stations[j])
+                if chans is not None:
+                    sta.channels = [sta.channels[k] for k in sorted(chans)]
+                stations.append(sta)
+            net.stations = stations
+            networks.append(net)
+
+        return Inventory(
+            networks=networks,
+            source=self.inventory.source,
+            sender=self.inventory.sender,
+            created=self.inventory.created,
+            module=self.inventory.module,
+            module_uri=self.inventory.module_uri,
+        )
+
+
+def prune_inventory(inventory, nslc_keys):
+    """Membuang stasiun/kanal yang tidak punya waveform (kunci NSLC dari stream)"""
+    return InventoryIndex(inventory).select(nslc_keys)
+
+
+def select_within(inventory, latitude, longitude, min_radius, max_radius):
+    """Seleksi stasiun lokal dalam cincin radius (derajat), pengganti query get_stations"""
+    keys = stations_within(inventory, latitude, longitude, min_radius, max_radius)
+    return InventoryIndex(inventory).select_stations(keys)
+
+
+def station_records(inventory, origin=None):
+    """
+    Baris tabel stasiun (network, station, latitude, longitude, elevation).
+    Dengan origin (dict event) ditambah distance (derajat), distance_km,
+    azimuth dan back_azimuth, diurutkan dari stasiun terdekat.
+    """
+    records = [{
+        'network': net.code,
+        'station': sta.code,
+        'latitude': sta.latitude,
+        'longitude': sta.longitude,
+        'elevation': sta.elevation
+    } for net in inventory for sta in net]
+    if origin is None or not records:
+        return records
+
+    _, lats, lons = station_arrays(inventory)
+    geom = event_station_geometry(origin['latitude'], origin['longitude'], lats, lons)
+    columns = {name: np.round(values[0], 3) for name, values in geom.items()}
+    for i, rec in enumerate(records):
+        for name, values in columns.items():
+            rec[name] = float(values[i])
+    return [records[i] for i in np.argsort(columns['distance'], kind='stable')]
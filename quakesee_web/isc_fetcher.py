@@ -0,0 +1,105 @@
+import re
+from datetime import timedelta
+
+import requests
+from obspy import UTCDateTime
+
+from quakesee_web.jobs import upstream
+from quakesee_web.metrics import span
+from quakesee_web.services import ISC_URL
+
+# Kolom hasil parsing CATCSV (sama dengan berkas .events)
+ISC_COLUMNS = ["time", "latitude", "longitude", "depth", "magnitude", "magnitude_type"]
+
+
+def build_url(params, base_url=ISC_URL):
+    """URL ISC bulletin (CATCSV, kotak lintang/bujur) untuk satu rentang tanggal"""
+    query = (
+        f"?request=COMPREHENSIVE&out_format=CATCSV&searchshape=RECT"
+        f"&bot_lat={params['bot_lat']}&top_lat={params['top_lat']}"
+        f"&left_lon={params['left_lon']}&right_lon={params['right_lon']}"
+        f"&start_year={params['start_date'].year}&start_month={params['start_date'].month}&start_day={params['start_date'].day}"
+        f"&start_time=00%3A00%3A00"
+        f"&end_year={params['end_date'].year}&end_month={params['end_date'].month}&end_day={params['end_date'].day}"
+        f"&end_time=23%3A59%3A59"
+        f"&min_dep={params['min_dep']}&max_dep={params['max_dep']}"
+        f"&min_mag={params['min_mag']}&max_mag={params['max_mag']}"
+    )
+    return base_url + query
+
+
+def date_windows(start_date, end_date, step_days):
+    """
+    Rentang tanggal per permintaan. Tanggal akhir ikut terambil (sampai
+    23:59:59), jadi jendela berikutnya dimulai sehari setelahnya.
+    """
+    windows = []
+    current_date = start_date
+    step = timedelta(days=step_days)
+    while current_date < end_date:
+        next_date = min(current_date + step, end_date)
+        windows.append((current_date, next_date))
+        current_date = next_date + timedelta(days=1)
+    return windows
+
+
+def parse_rows(lines):
+    """
+    Baris event dari teks CATCSV sebagai tuple
+    (event_id, time, latitude, longitude, depth, magnitude, magnitude_type)
+    """
+    start = False
+    for line in lines:
+        if "DATA_TYPE EVENT_CATALOGUE" in line:
+            start = True
+            continue
+        if start and line.strip() == "":
+            break
+        if start:
+            # Parsing setiap baris data
+            columns = re.split(r',\s*', line.strip())
+            if len(columns) < 8:
+                continue  # Abaikan baris yang tidak sesuai format
+
+            event_id = columns[0].strip()
+
+            if event_id == "EVENTID": continue
+
+            try:
+                # Pastikan data waktu memiliki format yang valid
+                event_date = columns[3].strip()  # Hapus spasi
+                event_time = columns[4].strip()  # Hapus spasi
+                datetime_str = f"{event_date}T{event_time}"  # Gabungkan tanggal dan waktu
+                event_time = UTCDateTime(datetime_str)  # Konversi ke UTCDateTime
+            except Exception as e:
+                print(f"Error parsing time for event {event_id}: {e}")
+                continue  # Abaikan jika format tidak valid
+
+            latitude = float(columns[5])
+            longitude = float(columns[6])
+            depth = float(columns[7]) if columns[7] else None
+            magnitude_value = float(columns[11])
+            magnitude_type = columns[10].strip()
+
+            yield event_id, event_time, latitude, longitude, depth, magnitude_value, magnitude_type
+
+
+def parse_records(lines):
+    """Baris event sebagai dict kolom ISC_COLUMNS"""
+    return [dict(zip(ISC_COLUMNS, row[1:])) for row in parse_rows(lines)]
+
+
+def fetch_window(params, start_date, end_date, timeout=None):
+    """
+    Teks CATCSV untuk satu jendela tanggal, None jika jendela tanpa event.
+    Kesalahan HTTP diteruskan sebagai requests.exceptions.RequestException.
+    """
+    params = dict(params, start_date=start_date, end_date=end_date)
+    with upstream(), span("http_fetch") as s:
+        response = requests.get(build_url(params), timeout=timeout)
+        s.add(nbytes=len(response.content))
+    response.raise_for_status()
+    text = response.text
+    if text.find("----EVENT-----") == -1:
+        return None
+    return text
@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from quakesee_web.metrics import span
+
+# Prioritas pekerjaan (angka kecil didahulukan)
+INTERACTIVE = 0
+BULK = 1
+# Pekerjaan spekulatif (prefetch), paling akhir dan dengan jatah slot sendiri
+PREFETCH = 2
+
+# Pekerjaan berat yang berjalan bersamaan per proses server, dan slot yang
+# hanya boleh dipakai pekerjaan interaktif
+JOB_SLOTS = int(os.environ.get("QUAKESEE_JOBS", "4"))
+RESERVED_SLOTS = int(os.environ.get("QUAKESEE_JOBS_RESERVED", "1"))
+# Prefetch berjalan bersamaan, di luar JOB_SLOTS (tidak mengambil slot pekerjaan nyata)
+PREFETCH_SLOTS = int(os.environ.get("QUAKESEE_JOBS_PREFETCH", "1"))
+# Batas permintaan HTTP bersamaan ke layanan hulu (FDSN/federator/ISC)
+UPSTREAM_LIMIT = int(os.environ.get("QUAKESEE_UPSTREAM", "8"))
+
+
+class JobCancelled(Exception):
+    """Pekerjaan dibatalkan saat masih menunggu di antrean"""
+
+
+class Job:
+    __slots__ = ("name", "owner", "priority", "seq", "granted", "on_grant", "submitted", "started")
+
+    def __init__(self, name, owner, priority, seq, on_grant=None):
+        self.name = name
+        self.owner = owner
+        self.priority = priority
+        self.seq = seq
+        self.granted = threading.Event()
+        self.on_grant = on_grant
+        self.submitted = time.time()
+        self.started = None
+
+
+class JobQueue:
+    """
+    Antrean pekerjaan berat bersama semua sesi dan klien API di satu proses.
+
+    Slot kosong diberikan menurut prioritas, lalu pemilik (sesi/klien) dengan
+    pekerjaan berjalan paling sedikit (fair share), lalu urutan datang.
+    Pekerjaan BULK tidak memakai slot cadangan sehingga pekerjaan interaktif
+    selalu cepat mendapat giliran. Prefetch memakai jatah prefetch_slots
+    sendiri sehingga tidak pernah menahan slot pekerjaan lain.
+    """
+
+    def __init__(self, slots=JOB_SLOTS, reserved=RESERVED_SLOTS, prefetch_slots=PREFETCH_SLOTS):
+        self.slots = max(1, slots)
+        self.bulk_slots = max(1, self.slots - max(0, reserved))
+        self.prefetch_slots = max(1, prefetch_slots)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._running = []
+
+    def submit(self, name, owner=None, priority=INTERACTIVE, on_grant=None):
+        """
+        Mendaftarkan pekerjaan. on_grant(job) dipanggil (di thread yang
+        membebaskan slot) saat slot diberikan, untuk pemanggil yang tidak
+        ingin menahan thread selama menunggu.
+        """
+        job = Job(name, owner or "local", priority, next(self._seq), on_grant)
+        with self._lock:
+            self._waiting.append(job)
+            granted = self._dispatch()
+        self._notify(granted)
+        return job
+
+    def finish(self, job):
+        """Melepas slot (atau keluar dari antrean jika belum berjalan)"""
+        with self._lock:
+            if job in self._running:
+                self._running.remove(job)
+            elif job in self._waiting:
+                self._waiting.remove(job)
+            granted = self._dispatch()
+        self._notify(granted)
+
+    def withdraw(self, job):
+        """Keluar dari antrean jika belum mendapat slot; False jika sudah berjalan"""
+        with self._lock:
+            if job not in self._waiting:
+                return False
+            self._waiting.remove(job)
+            granted = self._dispatch()
+        self._notify(granted)
+        return True
+
+    def position(self, job):
+        """Posisi 1-based di antrean (0 jika sudah berjalan)"""
+        with self._lock:
+            if job.granted.is_set():
+                return 0
+            order = self._order()
+            return order.index(job) + 1 if job in order else 0
+
+    def stats(self):
+        with self._lock:
+            return dict(slots=self.slots, bulk_slots=self.bulk_slots, prefetch_slots=self.prefetch_slots,
+                        running=len(self._running),
+                        waiting=len(self._waiting), owners=len({job.owner for job in self._running + self._waiting}),
+                        upstream_limit=UPSTREAM_LIMIT)
+
+    def _order(self):
+        running = {}
+        for job in self._running:
+            running[job.owner] = running.get(job.owner, 0) + 1
+        return sorted(self._waiting, key=lambda job: (job.priority, running.get(job.owner, 0), job.seq))
+
+    def _dispatch(self):
+        """Memberi slot kosong; mengembalikan pekerjaan yang baru mendapat slot"""
+        granted = []
+        while self._waiting:
+            prefetch_running = sum(job.priority == PREFETCH for job in self._running)
+            general_running = len(self._running) - prefetch_running
+            bulk_running = sum(job.priority == BULK for job in self._running)
+            for job in self._order():
+                if job.priority == PREFETCH:
+                    if prefetch_running < self.prefetch_slots:
+                        break
+                elif general_running < self.slots and (job.priority < BULK or bulk_running < self.bulk_slots):
+                    break
+            else:
+                return granted
+            self._waiting.remove(job)
+            self._running.append(job)
+            job.started = time.time()
+            job.granted.set()
+            granted.append(job)
+        return granted
+
+    @staticmethod
+    def _notify(granted):
+        # Di luar lock: callback boleh memanggil finish/submit
+        for job in granted:
+            if job.on_grant is not None:
+                job.on_grant(job)
+
+    @contextmanager
+    def job(self, name, owner=None, priority=INTERACTIVE, on_wait=None, task=None, poll=0.25):
+        """
+        Menjalankan blok setelah mendapat slot. on_wait(posisi) dipanggil
+        setiap posisi antrean berubah; task.cancelled menghentikan penantian.
+        Penantian menahan thread pemanggil: callback UI dijalankan lewat
+        background.in_thread_pool sehingga tidak pernah menunggu di IOLoop.
+        """
+        job = self.submit(name, owner, priority)
+        try:
+            with span("queue_wait"):
+                last = None
+                while not job.granted.wait(poll if last is not None else 0):
+                    if task is not None and task.cancelled:
+                        raise JobCancelled(name)
+                    position = self.position(job)
+                    if on_wait is not None and position and position != last:
+                        on_wait(position)
+                    last = position
+            yield job
+        finally:
+            self.finish(job)
+
+    async def wait_async(self, job, closed=None, poll=0.1):
+        """Menunggu slot tanpa menahan IOLoop; closed() True membatalkan"""
+        with span("queue_wait"):
+            while not job.granted.is_set():
+                if closed is not None and closed():
+                    raise JobCancelled(job.name)
+                await asyncio.sleep(poll)
+
+
+_queue = None
+_upstream = threading.BoundedSemaphore(max(1, UPSTREAM_LIMIT))
+
+
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
+
+
+def configure(slots=None, upstream=None):
+    """Mengatur ulang batas dari opsi server (sebelum ada pekerjaan berjalan)"""
+    global _queue, _upstream, UPSTREAM_LIMIT
+    if slots is not None:
+        _queue = JobQueue(slots)
+    if upstream is not None:
+        UPSTREAM_LIMIT = max(1, int(upstream))
+        _upstream = threading.BoundedSemaphore(UPSTREAM_LIMIT)
+
+
+@contextmanager
+def upstream():
+    """Satu permintaan ke layanan hulu, dibatasi UPSTREAM_LIMIT per proses"""
+    semaphore = _upstream
+    with span("upstream_wait"):
+        semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def limited(func, *args, **kwargs):
+    """Memanggil func di bawah batas upstream (untuk pool.submit)"""
+    with upstream():
+        return func(*args, **kwargs)
+
+
+def queue_message(position):
+    return f"queued: position {position} (server busy) . . ."
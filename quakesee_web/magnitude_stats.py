@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+# Lebar bin magnitudo (resolusi katalog umumnya 0.1)
+MAG_BIN = 0.1
+# Koreksi Mc metode kurvatur maksimum (Woessner & Wiemer, 2005)
+MAXC_CORRECTION = 0.2
+# Minimal event di atas Mc agar b-value dilaporkan
+MIN_EVENTS_B = 50
+# Jumlah bin waktu maksimum untuk laju event dan densitas
+MAX_TIME_BINS = 400
+DENSITY_TIME_BINS = 200
+
+# Lebar bin waktu yang dicoba berurutan (label, detik)
+_TIME_STEPS = [("hour", 3600), ("day", 86400), ("week", 7 * 86400), ("month", 30 * 86400),
+               ("quarter", 91 * 86400), ("year", 365 * 86400)]
+
+
+# Format waktu katalog dari event_fetcher / UTCDateTime: 2000-01-01T00:00:00.000000Z
+_ISO_SEPARATORS = {4: b"-", 7: b"-", 10: b"T", 13: b":", 16: b":", 19: b".", 26: b"Z"}
+
+
+def _parse_iso_fixed(times):
+    """
+    Parsing vektor untuk string waktu lebar tetap (27 karakter) langsung dari
+    byte digitnya, beberapa kali lebih cepat dari pd.to_datetime. None jika
+    ada string berformat lain (pemanggil memakai jalur pandas).
+    """
+    try:
+        raw = np.array(times, dtype="S27")
+    except (TypeError, ValueError, UnicodeEncodeError):
+        return None
+    if raw.dtype.itemsize != 27 or not (np.char.str_len(raw) == 27).all():
+        return None
+    chars = raw.view(np.uint8).reshape(-1, 27)
+    for pos, sep in _ISO_SEPARATORS.items():
+        if not (chars[:, pos] == sep[0]).all():
+            return None
+    digits = chars.astype(np.int64) - 48
+
+    def number(start, stop):
+        value = np.zeros(len(digits), dtype=np.int64)
+        for pos in range(start, stop):
+            value = value * 10 + digits[:, pos]
+        return value
+
+    months = (number(0, 4) - 1970) * 12 + number(5, 7) - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + number(8, 10) - 1
+    seconds = days * 86400 + number(11, 13) * 3600 + number(14, 16) * 60 + number(17, 19)
+    return (seconds * 10**9 + number(20, 26) * 1000).astype("datetime64[ns]")
+
+
+def catalog_arrays(records):
+    """
+    Kolom waktu (datetime64[ns], UTC) dan magnitudo (float64) dari daftar
+    record event. Event tanpa waktu atau magnitudo dibuang.
+    """
+    if isinstance(records, pd.DataFrame):
+        times, mags = records["time"], records["magnitude"]
+    else:
+        times = [rec.get("time") for rec in records]
+        mags = [rec.get("magnitude") for rec in records]
+    parsed = _parse_iso_fixed(times)
+    if parsed is None:
+        parsed = pd.to_datetime(pd.Series(times, dtype="object"), utc=True, format="ISO8601", errors="coerce")
+        parsed = parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    times = parsed
+    mags = pd.to_numeric(pd.Series(mags, dtype="object"), errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnat(times) & np.isfinite(mags)
+    return times[valid], mags[valid]
+
+
+def time_bins(times, max_bins=MAX_TIME_BINS):
+    """Lebar bin waktu terkecil dari _TIME_STEPS yang menghasilkan <= max_bins bin"""
+    span = (times.max() - times.min()) / np.timedelta64(1, "s") if len(times) else 0
+    for label, step in _TIME_STEPS:
+        if span / step <= max_bins:
+            return label, step
+    label, step = _TIME_STEPS[-1]
+    return label, step * int(np.ceil(span / step / max_bins))
+
+
+def event_rate(times, max_bins=MAX_TIME_BINS):
+    """Jumlah event per bin waktu: (label, tepi kiri bin, jumlah)"""
+    label, step = time_bins(times, max_bins)
+    ns = times.astype(np.int64)
+    step_ns = step * 10**9
+    t0 = ns.min() // step_ns * step_ns
+    counts = np.bincount((ns - t0) // step_ns)
+    edges = (t0 + np.arange(len(counts), dtype=np.int64) * step_ns).astype("datetime64[ns]")
+    return label, edges, counts
+
+
+def frequency_magnitude(mags, dm=MAG_BIN):
+    """
+    Distribusi frekuensi-magnitudo: pusat bin, jumlah per bin (non-kumulatif)
+    dan jumlah kumulatif N(>= M).
+    """
+    index = np.round(mags / dm).astype(np.int64)
+    lo = index.min()
+    counts = np.bincount(index - lo)
+    centers = np.round((lo + np.arange(len(counts))) * dm, 6)
+    cumulative = np.cumsum(counts[::-1])[::-1]
+    return centers, counts, cumulative
+
+
+def mc_maxc(centers, counts, correction=MAXC_CORRECTION):
+    """Magnitudo kelengkapan (Mc) metode kurvatur maksimum"""
+    return float(np.round(centers[np.argmax(counts)] + correction, 6))
+
+
+def b_value(mags, mc, dm=MAG_BIN):
+    """
+    b-value maximum likelihood (Aki, 1965, koreksi bin Utsu) untuk event
+    M >= Mc beserta ketidakpastian Shi & Bolt (1982) dan a-value.
+    Mengembalikan (None, None, None, n) jika event terlalu sedikit.
+    """
+    above = mags[mags >= mc - dm / 2 - 1e-9]
+    n = len(above)
+    mean = above.mean() if n else np.nan
+    if n < MIN_EVENTS_B or mean <= mc - dm / 2:
+        return None, None, None, n
+    b = np.log10(np.e) / (mean - (mc - dm / 2))
+    sigma = 2.3 * b**2 * np.sqrt(((above - mean) ** 2).sum() / (n * (n - 1)))
+    a = np.log10(n) + b * mc
+    return float(b), float(sigma), float(a), n
+
+
+def magnitude_density(times, mags, dm=MAG_BIN, max_bins=DENSITY_TIME_BINS):
+    """Histogram 2D waktu x magnitudo: (tepi waktu, pusat magnitudo, jumlah[mag, waktu])"""
+    label, step = time_bins(times, max_bins)
+    ns = times.astype(np.int64)
+    step_ns = step * 10**9
+    t0 = ns.min() // step_ns * step_ns
+    ti = (ns - t0) // step_ns
+    mi = np.round(mags / dm).astype(np.int64)
+    lo = mi.min()
+    shape = (mi.max() - lo + 1, ti.max() + 1)
+    counts = np.bincount((mi - lo) * shape[1] + ti, minlength=shape[0] * shape[1]).reshape(shape)
+    edges = (t0 + np.arange(shape[1], dtype=np.int64) * step_ns).astype("datetime64[ns]")
+    centers = np.round((lo + np.arange(shape[0])) * dm, 6)
+    return edges, centers, counts
+
+
+def catalog_stats(records, dm=MAG_BIN):
+    """
+    Semua agregat untuk tampilan analitik katalog. Hasilnya kecil (ratusan
+    bin) sehingga gambar dapat dibangun ulang tanpa menyentuh katalog.
+    """
+    times, mags = catalog_arrays(records)
+    if len(times) == 0:
+        return None
+    rate_label, rate_edges, rate_counts = event_rate(times)
+    centers, counts, cumulative = frequency_magnitude(mags, dm)
+    mc = mc_maxc(centers, counts)
+    b, b_err, a, n_above = b_value(mags, mc, dm)
+    density_edges, density_mags, density = magnitude_density(times, mags, dm)
+    return dict(
+        events=len(times), start=times.min(), end=times.max(), dm=dm,
+        rate_label=rate_label, rate_edges=rate_edges, rate_counts=rate_counts,
+        mag_centers=centers, mag_counts=counts, mag_cumulative=cumulative,
+        mc=mc, b=b, b_err=b_err, a=a, n_above_mc=n_above,
+        density_edges=density_edges, density_mags=density_mags, density=density,
+    )
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+import numpy as np
+from obspy import Stream, Trace
+
+from quakesee_web.workers import imap_unordered
+
+# Parameter merge yang dipakai tombol "+ Merge the same traces"
+DEFAULT_MERGE = dict(method=1, interpolation_samples=-1, fill_value='interpolate')
+
+
+def group_by_id(traces):
+    """Mengelompokkan trace per NSLC (urutan kemunculan dipertahankan)"""
+    groups = OrderedDict()
+    for tr in traces:
+        groups.setdefault(tr.id, []).append(tr)
+    return groups
+
+
+def channel_report(seed_id, spans, sampling_rate):
+    """
+    Statistik gap/overlap satu kanal dari daftar (start, end) epoch.
+    Dihitung sebelum merge sehingga mencerminkan data asli.
+    """
+    spans = sorted(spans)
+    delta = 1.0 / sampling_rate if sampling_rate else 0.0
+    gaps = overlaps = 0
+    gap_s = overlap_s = 0.0
+    last_end = spans[0][1]
+    for start, end in spans[1:]:
+        diff = start - last_end - delta
+        if diff > 0.5 * delta:
+            gaps += 1
+            gap_s += diff
+        elif diff < -0.5 * delta:
+            overlaps += 1
+            overlap_s += min(-diff, end - start + delta)
+        last_end = max(last_end, end)
+    return {
+        "id": seed_id,
+        "segments": len(spans),
+        "gaps": gaps,
+        "gap_s": round(gap_s, 6),
+        "overlaps": overlaps,
+        "overlap_s": round(overlap_s, 6),
+        "starttime": spans[0][0],
+        "endtime": last_end,
+    }
+
+
+def _is_contiguous(traces):
+    for lt, rt in zip(traces[:-1], traces[1:]):
+        if rt.stats.sampling_rate != lt.stats.sampling_rate or rt.stats.calib != lt.stats.calib:
+            return False
+        if rt.data.dtype != lt.data.dtype:
+            return False
+        if int(round((rt.stats.starttime - lt.stats.endtime) * lt.stats.sampling_rate)) != 1:
+            return False
+    return True
+
+
+def merge_group(traces, merge_kwargs):
+    """
+    Merge satu kanal. Segmen yang bersambung digabung dengan satu
+    np.concatenate; gap/overlap diserahkan ke obspy merge.
+    """
+    if len(traces) == 1:
+        return traces
+    traces = sorted(traces, key=lambda tr: tr.stats.starttime)
+    if _is_contiguous(traces):
+        # Trace baru: trace masukan (mis. milik stream di cache) tidak diubah
+        stats = traces[0].stats.copy()
+        return [Trace(np.concatenate([tr.data for tr in traces]), header=stats)]
+    return Stream(traces).merge(**merge_kwargs).traces
+
+
+def merge_traces(traces, merge_kwargs=None):
+    """Merge serial untuk satu pilihan kecil (mis. satu stasiun)"""
+    merge_kwargs = DEFAULT_MERGE if merge_kwargs is None else merge_kwargs
+    st = Stream()
+    for group in group_by_id(traces).values():
+        st.traces.extend(merge_group(group, merge_kwargs))
+    return st
+
+
+def merge_stream(st, parallel=True, **merge_kwargs):
+    """
+    Merge seluruh stream per NSLC. Kanal yang butuh interpolasi dikerjakan
+    paralel di pool proses; sisanya di proses ini tanpa salinan tambahan.
+    LazyStream (hasil unduhan) di-merge per stasiun di pool lalu di-spool ulang.
+    Stream masukan tidak diubah (bisa milik SharedCache yang dibagi antar sesi).
+
+    Mengembalikan (stream hasil merge, laporan gap/overlap per kanal).
+    """
+    merge_kwargs = merge_kwargs or DEFAULT_MERGE
+
+    if hasattr(st, "gap_report"):
+        # LazyStream: laporan dari indeks header (data asli sebelum merge)
+        report = st.gap_report()
+        if merge_kwargs.get("fill_value") is None:
+            # Hasil bermask tidak bisa ditulis ke miniSEED: merge ditunda sampai decode
+            return st.copy().merge(**merge_kwargs), report
+        from quakesee_web.mseed_index import merge_spooled
+        return merge_spooled(st, merge_kwargs, parallel=parallel), report
+
+    groups = group_by_id(st)
+    report = []
+    merged = OrderedDict()
+    heavy = []
+    for seed_id, traces in groups.items():
+        spans = [(tr.stats.starttime.timestamp, tr.stats.endtime.timestamp) for tr in traces]
+        report.append(channel_report(seed_id, spans, traces[0].stats.sampling_rate))
+        if len(traces) > 1 and not _is_contiguous(sorted(traces, key=lambda tr: tr.stats.starttime)):
+            heavy.append((seed_id, traces))
+            merged[seed_id] = None
+        else:
+            merged[seed_id] = merge_group(traces, merge_kwargs)
+
+    jobs = [(traces, merge_kwargs) for _, traces in heavy]
+    ids = {id(traces): seed_id for seed_id, traces in heavy}
+    for (traces, _), result in imap_unordered(merge_group, jobs, parallel=parallel):
+        merged[ids[id(traces)]] = result
+
+    return Stream([tr for traces in merged.values() for tr in traces]), report
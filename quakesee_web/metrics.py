@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from tornado.web import RequestHandler
+
+# Batas bucket histogram durasi (detik), mengikuti gaya Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Tahapan yang dicatat (nama bebas, daftar ini sebagai acuan)
+STAGES = ("http_fetch", "parse", "inventory_query", "availability_check", "waveform_fetch",
+          "merge", "filter", "processing", "plot_build", "serialization", "queue_wait", "upstream_wait",
+          "catalog_stats", "prefetch")
+
+
+class Histogram:
+    """Histogram kumulatif sederhana dengan bucket tetap"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Menyimpan histogram durasi dan penghitung byte/record per tahap"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.errors = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name, stage, value=1):
+        with self._lock:
+            key = (name, stage)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def error(self, stage):
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.errors.clear()
+
+    def render(self):
+        """Format teks eksposisi Prometheus"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP quakesee_stage_seconds Duration of QuakeSee processing stages.")
+            lines.append("# TYPE quakesee_stage_seconds histogram")
+            for stage in sorted(self.histograms):
+                hist = self.histograms[stage]
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f'quakesee_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'quakesee_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'quakesee_stage_seconds_sum{{stage="{stage}"}} {hist.sum:.6f}')
+                lines.append(f'quakesee_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            for name in ("bytes", "records"):
+                lines.append(f"# HELP quakesee_stage_{name}_total {name.capitalize()} handled per stage.")
+                lines.append(f"# TYPE quakesee_stage_{name}_total counter")
+                for (counter, stage), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'quakesee_stage_{name}_total{{stage="{stage}"}} {value}')
+
+            lines.append("# HELP quakesee_stage_errors_total Stages that raised an exception.")
+            lines.append("# TYPE quakesee_stage_errors_total counter")
+            for stage, value in sorted(self.errors.items()):
+                lines.append(f'quakesee_stage_errors_total{{stage="{stage}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Span:
+    """Satu pengukuran tahap; add() mencatat byte/record yang diproses"""
+
+    __slots__ = ("stage", "start", "duration")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def add(self, nbytes=0, records=0):
+        if nbytes:
+            REGISTRY.inc("bytes", self.stage, int(nbytes))
+        if records:
+            REGISTRY.inc("records", self.stage, int(records))
+
+
+@contextmanager
+def span(stage):
+    """
+    Mengukur durasi blok kode sebagai tahap bernama:
+
+        with span("http_fetch") as s:
+            response = requests.get(url)
+            s.add(nbytes=len(response.content))
+    """
+    s = Span(stage)
+    try:
+        yield s
+    except BaseException:
+        REGISTRY.error(stage)
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        REGISTRY.observe(stage, s.duration)
+
+
+def timed(stage):
+    """Dekorator: seluruh pemanggilan fungsi dicatat sebagai satu span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(RequestHandler):
+    """Endpoint /metrics untuk Prometheus (per proses server)"""
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(REGISTRY.render())
+
+
+def metrics_patterns(path="/metrics"):
+    """Pola Tornado untuk pn.serve(extra_patterns=...)"""
+    return [(path, MetricsHandler)]
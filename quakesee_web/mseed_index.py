@@ -0,0 +1,494 @@
+import calendar
+import io
+import mmap
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from fnmatch import fnmatch
+
+import numpy as np
+from obspy import Stream, UTCDateTime
+from obspy import read as obread
+
+from quakesee_web.merge_engine import channel_report, merge_traces
+from quakesee_web.workers import imap_unordered
+
+# Ukuran record yang dicoba jika Blockette 1000 tidak ada
+_RECLENS = [2 ** i for i in range(8, 17)]
+_QUALITY = (b"D", b"R", b"Q", b"M")
+_YEAR_EPOCH = {}
+
+
+def _btime_to_epoch(buf, offset, endian):
+    year, day, hour, minute, sec, _, frac = struct.unpack_from(endian + "HHBBBBH", buf, offset)
+    base = _YEAR_EPOCH.get(year)
+    if base is None:
+        base = _YEAR_EPOCH[year] = calendar.timegm((year, 1, 1, 0, 0, 0))
+    return base + (day - 1) * 86400 + hour * 3600 + minute * 60 + sec + frac * 1e-4
+
+
+def _detect_endian(buf, offset):
+    """Menentukan byte order dari tahun pada BTIME"""
+    for endian in (">", "<"):
+        year, day = struct.unpack_from(endian + "HH", buf, offset + 20)
+        if 1900 <= year <= 2100 and 1 <= day <= 366:
+            return endian
+    return None
+
+
+def _sampling_rate(factor, multiplier):
+    if factor == 0 or multiplier == 0:
+        return 0.0
+    if factor > 0 and multiplier > 0:
+        return float(factor * multiplier)
+    if factor > 0 and multiplier < 0:
+        return -float(factor) / multiplier
+    if factor < 0 and multiplier > 0:
+        return -float(multiplier) / factor
+    return 1.0 / (factor * multiplier)
+
+
+class MSeedIndex:
+    """
+    Indeks record miniSEED yang dibangun hanya dari header (tanpa decode sampel).
+
+    Setiap record disimpan sebagai satu baris pada array kolom: id NSLC,
+    waktu awal/akhir (epoch) dan posisi byte di dalam buffer.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.ids = []
+        self._id_lookup = {}
+
+        codes, offsets, lengths, starts, ends, rates = [], [], [], [], [], []
+        view = memoryview(buffer)
+        size = len(view)
+        offset = 0
+
+        while offset + 48 <= size:
+            reclen = self._scan_record(view, offset, codes, offsets, lengths, starts, ends, rates)
+            offset += reclen
+
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.starttimes = np.asarray(starts, dtype=np.float64)
+        self.endtimes = np.asarray(ends, dtype=np.float64)
+        self.sampling_rates = np.asarray(rates, dtype=np.float64)
+
+    @classmethod
+    def from_file(cls, path):
+        """Membuka file miniSEED dengan mmap sehingga hanya header yang dibaca"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def _scan_record(self, view, offset, codes, offsets, lengths, starts, ends, rates):
+        quality = view[offset + 6:offset + 7].tobytes()
+        endian = _detect_endian(view, offset)
+        if quality not in _QUALITY or endian is None:
+            # Bukan record data (mis. padding), lompat ke kandidat header berikutnya
+            return self._next_reclen(view, offset)
+
+        header = view[offset:offset + 48].tobytes()
+        station = header[8:13].decode("ascii", "replace").strip()
+        location = header[13:15].decode("ascii", "replace").strip()
+        channel = header[15:18].decode("ascii", "replace").strip()
+        network = header[18:20].decode("ascii", "replace").strip()
+
+        start = _btime_to_epoch(view, offset + 20, endian)
+        (npts, factor, multiplier, activity, _, _, nblk,
+         correction, _, first_blk) = struct.unpack_from(endian + "HhhBBBBiHH", view, offset + 30)
+
+        rate = _sampling_rate(factor, multiplier)
+        reclen = None
+
+        # Telusuri blockette untuk panjang record (1000) dan sampling rate presisi (100)
+        blk = first_blk
+        for _ in range(nblk):
+            if blk < 48 or offset + blk + 4 > len(view):
+                break
+            blk_type, next_blk = struct.unpack_from(endian + "HH", view, offset + blk)
+            if blk_type == 1000:
+                reclen = 2 ** view[offset + blk + 6]
+            elif blk_type == 100:
+                rate = struct.unpack_from(endian + "f", view, offset + blk + 4)[0]
+            if next_blk == 0:
+                break
+            blk = next_blk
+
+        if reclen is None:
+            reclen = self._next_reclen(view, offset)
+
+        if correction and not (activity & 0x02):
+            start += correction * 1e-4
+        end = start + (npts - 1) / rate if (rate > 0 and npts > 0) else start
+
+        seed_id = f"{network}.{station}.{location}.{channel}"
+        code = self._id_lookup.get(seed_id)
+        if code is None:
+            code = len(self.ids)
+            self._id_lookup[seed_id] = code
+            self.ids.append(seed_id)
+
+        codes.append(code)
+        offsets.append(offset)
+        lengths.append(min(reclen, len(view) - offset))
+        starts.append(start)
+        ends.append(end)
+        rates.append(rate)
+        return reclen
+
+    @staticmethod
+    def _next_reclen(view, offset):
+        for reclen in _RECLENS:
+            nxt = offset + reclen
+            if nxt + 48 > len(view):
+                return len(view) - offset
+            if view[nxt + 6:nxt + 7].tobytes() in _QUALITY and _detect_endian(view, nxt):
+                return reclen
+        return _RECLENS[-1]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def nbytes(self):
+        """Ukuran indeks di memori (tanpa buffer data)"""
+        return sum(a.nbytes for a in (self.codes, self.offsets, self.lengths,
+                                      self.starttimes, self.endtimes, self.sampling_rates))
+
+    def match(self, network=None, station=None, location=None, channel=None,
+              starttime=None, endtime=None):
+        """Mengembalikan posisi record (per id, urutan file) yang cocok dengan filter"""
+        patterns = [network, station, location, channel]
+        wanted = []
+        for code, seed_id in enumerate(self.ids):
+            parts = seed_id.split(".")
+            if all(p is None or fnmatch(part.upper(), p.upper()) for part, p in zip(parts, patterns)):
+                wanted.append(code)
+        return self.rows(wanted, starttime, endtime)
+
+    def rows(self, codes, starttime=None, endtime=None):
+        """Posisi record untuk kode id (indeks self.ids) yang sudah diketahui"""
+        mask = np.isin(self.codes, codes)
+        if starttime is not None:
+            mask &= self.endtimes >= UTCDateTime(starttime).timestamp
+        if endtime is not None:
+            mask &= self.starttimes <= UTCDateTime(endtime).timestamp
+
+        rows = np.nonzero(mask)[0]
+        # Urutan file dipertahankan dalam tiap id: decode memecah trace persis
+        # seperti obspy membaca file aslinya (penting jika ada overlap)
+        order = np.lexsort((self.offsets[rows], self.codes[rows]))
+        return rows[order]
+
+    def segments(self):
+        """
+        Menghitung segmen kontinu per id dari header (tanpa decode). Record
+        tiap id ditelusuri sesuai urutan file, seperti pembaca miniSEED obspy
+        yang hanya menyambung record ke segmen terakhir id tersebut.
+        """
+        result = []
+        if len(self) == 0:
+            return result
+        order = np.lexsort((self.offsets, self.codes))
+        codes = self.codes[order]
+        starts = self.starttimes[order]
+        ends = self.endtimes[order]
+        rates = self.sampling_rates[order]
+
+        delta = np.where(rates > 0, 1.0 / np.where(rates > 0, rates, 1.0), 0.0)
+        new_code = np.r_[True, codes[1:] != codes[:-1]]
+        # Segmen putus jika record berikut tidak tepat satu sampel setelahnya
+        # (gap/overlap) atau sampling rate berubah
+        gap = np.r_[True, (np.abs(starts[1:] - ends[:-1] - delta[:-1]) > 0.5 * delta[:-1])
+                    | (rates[1:] != rates[:-1])]
+        breaks = np.nonzero(new_code | gap)[0]
+        stops = np.r_[breaks[1:], len(codes)] - 1
+        for b, e in zip(breaks, stops):
+            result.append((self.ids[codes[b]], starts[b], ends[b:e + 1].max()))
+        return result
+
+    def read_records(self, rows):
+        """Menggabungkan byte record terpilih tanpa decode"""
+        view = memoryview(self.buffer)
+        return b"".join(view[o:o + n] for o, n in zip(self.offsets[rows], self.lengths[rows]))
+
+
+class LazyStream:
+    """
+    Pembungkus mirip obspy Stream di atas MSeedIndex.
+
+    Sampel hanya di-decode saat sebuah stasiun dipilih (plot, ekspor, proses);
+    hasil decode terakhir disimpan di cache LRU kecil. Objek ini dibagi antar
+    sesi lewat SharedCache, jadi cache dijaga lock (decode di luar lock).
+    """
+
+    def __init__(self, index, cache_size=4, _file=None):
+        self.index = index
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._merge_kwargs = None
+        self._file = _file
+        self._segments = None
+
+    @classmethod
+    def from_bytes(cls, data, **kwargs):
+        return cls(MSeedIndex(data), **kwargs)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(MSeedIndex.from_file(path), **kwargs)
+
+    def __len__(self):
+        if self._merge_kwargs is not None:
+            # Setelah merge setiap id menjadi satu trace
+            return len(self.index.ids)
+        if self._segments is None:
+            self._segments = self.index.segments()
+        return len(self._segments)
+
+    def __bool__(self):
+        return len(self.index) > 0
+
+    def __iter__(self):
+        for station in self.stations():
+            yield from self.select(station=station)
+
+    def __str__(self):
+        return f"LazyStream: {len(self)} trace(s) in {len(self.index)} record(s)"
+
+    def get_id_list(self):
+        return list(self.index.ids)
+
+    @property
+    def merge_kwargs(self):
+        return self._merge_kwargs
+
+    def raw(self, network=None, station=None, location=None, channel=None):
+        """Byte miniSEED mentah untuk pilihan tertentu (tanpa decode)"""
+        return self.index.read_records(self.index.match(network, station, location, channel))
+
+    def stations(self):
+        """Daftar kode stasiun unik langsung dari indeks"""
+        return sorted({seed_id.split(".")[1] for seed_id in self.index.ids})
+
+    def select(self, network=None, station=None, location=None, channel=None,
+               starttime=None, endtime=None):
+        """Decode record yang cocok menjadi obspy Stream"""
+        key = (network, station, location, channel,
+               None if starttime is None else UTCDateTime(starttime).timestamp,
+               None if endtime is None else UTCDateTime(endtime).timestamp)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is not None:
+            return cached.copy()
+
+        rows = self.index.match(network, station, location, channel, starttime, endtime)
+        if len(rows) == 0:
+            return Stream()
+        st = obread(io.BytesIO(self.index.read_records(rows)), format="MSEED")
+        if self._merge_kwargs is not None:
+            st = merge_traces(st, self._merge_kwargs)
+
+        with self._cache_lock:
+            self._cache[key] = st
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return st.copy()
+
+    def copy(self):
+        """LazyStream baru di atas indeks yang sama (record tidak disalin, cache terpisah)"""
+        other = LazyStream(self.index, cache_size=self.cache_size, _file=self._file)
+        other._merge_kwargs = self._merge_kwargs
+        return other
+
+    def merge(self, **kwargs):
+        """Merge ditunda dan diterapkan per pilihan (merge obspy bekerja per id)"""
+        self._merge_kwargs = kwargs
+        self._segments = None
+        self.clear_cache()
+        return self
+
+    def clear_cache(self):
+        """Membuang hasil decode yang disimpan (select berikutnya decode ulang)"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def id_starttimes(self):
+        """Waktu awal record pertama tiap id (untuk memilih epoch respons)"""
+        result = {}
+        for code, seed_id in enumerate(self.index.ids):
+            starts = self.index.starttimes[self.index.codes == code]
+            result[seed_id] = UTCDateTime(starts.min())
+        return result
+
+    def gap_report(self):
+        """
+        Statistik gap/overlap per kanal langsung dari indeks header. Segmen
+        adalah run record kontinu dalam urutan file, yaitu trace yang sama
+        dengan hasil baca obspy (bukan record satu per satu).
+        """
+        spans = OrderedDict()
+        for seed_id, start, end in self.index.segments():
+            spans.setdefault(seed_id, []).append((start, end))
+        rates = {}
+        for code, rate in zip(self.index.codes, self.index.sampling_rates):
+            rates.setdefault(int(code), rate)
+        return [channel_report(seed_id, seg, rates.get(self.index._id_lookup[seed_id], 0.0))
+                for seed_id, seg in spans.items()]
+
+    def to_stream(self):
+        """Decode seluruh data (hanya untuk operasi yang benar-benar membutuhkan semua sampel)"""
+        st = Stream()
+        for station in self.stations():
+            st += self.select(station=station)
+        return st
+
+    def write(self, filename, format="MSEED", **kwargs):
+        if format.upper() == "MSEED" and self._merge_kwargs is None and not kwargs:
+            # Salin record mentah tanpa decode/encode ulang
+            rows = self.index.match()
+            data = self.index.read_records(rows)
+            if hasattr(filename, "write"):
+                filename.write(data)
+            else:
+                with open(filename, "wb") as f:
+                    f.write(data)
+            return
+        self.to_stream().write(filename, format=format, **kwargs)
+
+
+def encode_stream(st):
+    """Encode Stream ke byte miniSEED (dtype yang tidak didukung diubah ke float64)"""
+    for tr in st:
+        if tr.data.dtype.kind not in ("i", "f"):
+            tr.data = tr.data.astype(np.float64)
+    buffer = io.BytesIO()
+    st.write(buffer, format="MSEED")
+    return buffer.getvalue()
+
+
+class WaveformSpool:
+    """
+    Menulis waveform hasil unduhan ke file miniSEED sementara segera setelah tiba,
+    lalu membukanya sebagai LazyStream sehingga sampel tidak ditahan di memori.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def append(self, st):
+        if st is None or len(st) == 0:
+            return
+        self._file.write(encode_stream(st))
+        self.count += len(st)
+
+    def append_raw(self, data, count=1):
+        """Menyalin byte miniSEED yang sudah jadi (tanpa decode/encode ulang)"""
+        if data:
+            self._file.write(data)
+            self.count += count
+
+    def __len__(self):
+        return self.count
+
+    def finalize(self, **kwargs):
+        self._file.flush()
+        if self._file.tell() == 0:
+            return None
+        buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return LazyStream(MSeedIndex(buffer), _file=self._file, **kwargs)
+
+
+def station_codes(st):
+    """Kode stasiun unik untuk Stream maupun LazyStream"""
+    if isinstance(st, LazyStream):
+        return st.stations()
+    return sorted(set(tr.stats.station for tr in st))
+
+
+def seed_ids(st):
+    """Id NSLC unik tanpa decode sampel"""
+    if isinstance(st, LazyStream):
+        return st.get_id_list()
+    return sorted(set(tr.id for tr in st))
+
+
+def sampling_rates(st):
+    """Sampling rate unik (> 0) tanpa decode sampel"""
+    if isinstance(st, LazyStream):
+        rates = st.index.sampling_rates
+        return sorted(set(rates[rates > 0].tolist()))
+    return sorted(set(tr.stats.sampling_rate for tr in st if tr.stats.sampling_rate > 0))
+
+
+def as_stream(st):
+    """Mengubah LazyStream menjadi obspy Stream penuh"""
+    if isinstance(st, LazyStream):
+        return st.to_stream()
+    return st
+
+
+def station_payloads(st):
+    """
+    Membagi waveform per stasiun untuk dikirim ke worker. LazyStream dikirim
+    sebagai byte miniSEED mentah sehingga decode juga dikerjakan di worker.
+    """
+    if isinstance(st, LazyStream):
+        merge_kwargs = st.merge_kwargs
+        for station in st.stations():
+            yield station, st.raw(station=station), merge_kwargs
+    else:
+        for station in station_codes(st):
+            yield station, st.select(station=station), None
+
+
+def decode_payload(payload, merge_kwargs):
+    """Kebalikan station_payloads (dipanggil di worker)"""
+    if isinstance(payload, bytes):
+        st = obread(io.BytesIO(payload), format="MSEED")
+        if merge_kwargs is not None:
+            st = merge_traces(st, merge_kwargs)
+        return st
+    return payload
+
+
+def _merge_payload(payload, merge_kwargs):
+    """Dijalankan di worker: decode satu stasiun, merge per NSLC, encode ulang"""
+    st = decode_payload(payload, merge_kwargs)
+    return encode_stream(st), len(st)
+
+
+def merge_spooled(st, merge_kwargs, parallel=True):
+    """
+    Merge LazyStream di pool proses, satu stasiun per tugas. Stasiun tanpa
+    gap/overlap disalin sebagai record mentah; sisanya di-decode, di-merge dan
+    di-encode ulang di worker. Hasilnya LazyStream baru tanpa merge tertunda.
+    """
+    segments = {}
+    for seed_id, _, _ in st.index.segments():
+        segments[seed_id] = segments.get(seed_id, 0) + 1
+    ids, split = {}, set()
+    for seed_id, count in segments.items():
+        station = seed_id.split(".")[1]
+        ids[station] = ids.get(station, 0) + 1
+        if count > 1:
+            split.add(station)
+
+    spool = WaveformSpool()
+    for station in st.stations():
+        if station not in split:
+            spool.append_raw(st.raw(station=station), ids[station])
+
+    jobs = ((st.raw(station=station), merge_kwargs) for station in sorted(split))
+    for _, (data, count) in imap_unordered(_merge_payload, jobs, parallel=parallel):
+        spool.append_raw(data, count)
+    return spool.finalize(cache_size=st.cache_size)
@@ -0,0 +1,181 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from obspy import Stream
+from obspy.signal.invsim import cosine_sac_taper, invert_spectrum
+from obspy.signal.util import _npts2nfft
+from scipy.signal import iirfilter, sosfilt, zpk2sos
+from scipy.signal.windows import hann
+
+from quakesee_web.inventory_index import InventoryIndex
+from quakesee_web.mseed_index import WaveformSpool, decode_payload, station_codes, station_payloads
+from quakesee_web.workers import imap_unordered
+
+# Parameter default pipeline (None berarti langkah dilewati)
+DEFAULT_PROCESSING = dict(
+    detrend="linear",
+    taper=0.05,
+    remove_response=None,
+    water_level=60.0,
+    pre_filt=None,
+    bandpass=None,
+    corners=4,
+    zerophase=True,
+)
+
+# Cache spektrum respons terbalik per proses; pool inline memanggilnya dari
+# beberapa thread UI sekaligus, jadi akses OrderedDict dijaga lock
+_RESPONSE_CACHE = OrderedDict()
+_RESPONSE_LOCK = threading.Lock()
+RESPONSE_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=256)
+def bandpass_sos(freqmin, freqmax, sampling_rate, corners):
+    """Koefisien SOS Butterworth (sama dengan obspy bandpass), dipakai ulang per df"""
+    fe = 0.5 * sampling_rate
+    low = freqmin / fe
+    high = freqmax / fe
+    if high - 1.0 > -1e-6:
+        # Frekuensi atas di atas Nyquist, jadi highpass
+        z, p, k = iirfilter(corners, low, btype='highpass', ftype='butter', output='zpk')
+    else:
+        z, p, k = iirfilter(corners, [low, high], btype='band', ftype='butter', output='zpk')
+    return zpk2sos(z, p, k)
+
+
+@lru_cache(maxsize=256)
+def taper_window(npts, max_percentage):
+    """Jendela taper Hann (sama dengan obspy taper), dipakai ulang per panjang trace"""
+    wlen = int(max_percentage * npts)
+    sides = hann(2 * wlen) if 2 * wlen == npts else hann(2 * wlen + 1)
+    return np.hstack((sides[:wlen], np.ones(npts - 2 * wlen), sides[len(sides) - wlen:]))
+
+
+def inverse_response(key, response, sampling_rate, npts, output, water_level, pre_filt):
+    """
+    Respons instrumen terbalik untuk (kanal, sampling rate, panjang) tertentu.
+    Hasil evaluasi disimpan sehingga trace lain dari kanal yang sama tidak
+    memanggil evalresp lagi.
+    """
+    nfft = _npts2nfft(npts)
+    cache_key = (key, sampling_rate, nfft, output, water_level, pre_filt)
+    with _RESPONSE_LOCK:
+        spectrum = _RESPONSE_CACHE.get(cache_key)
+        if spectrum is not None:
+            _RESPONSE_CACHE.move_to_end(cache_key)
+            return spectrum, nfft
+
+    freq_response, freqs = response.get_evalresp_response(
+        t_samp=1.0 / sampling_rate, nfft=nfft, output=output)
+    if water_level is not None:
+        invert_spectrum(freq_response, water_level)
+        spectrum = freq_response
+    else:
+        spectrum = np.zeros_like(freq_response)
+        nonzero = freq_response != 0
+        spectrum[nonzero] = 1.0 / freq_response[nonzero]
+    if pre_filt is not None:
+        spectrum = spectrum * cosine_sac_taper(freqs, flimit=pre_filt)
+
+    with _RESPONSE_LOCK:
+        _RESPONSE_CACHE[cache_key] = spectrum
+        while len(_RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+    return spectrum, nfft
+
+
+def process_trace(tr, params, response=None):
+    """Detrend -> taper -> remove response -> bandpass untuk satu trace"""
+    tr.data = tr.data.astype(np.float64)
+    if params.get("detrend"):
+        tr.detrend(type=params["detrend"])
+    if params.get("taper"):
+        tr.data *= taper_window(tr.stats.npts, params["taper"])
+
+    if params.get("remove_response") and response is not None:
+        key, resp = response
+        spectrum, nfft = inverse_response(
+            key, resp, tr.stats.sampling_rate, tr.stats.npts,
+            params["remove_response"], params.get("water_level"), params.get("pre_filt"))
+        # Sama dengan zero_mean pada obspy remove_response
+        data = np.fft.rfft(tr.data - tr.data.mean(), n=nfft)
+        data *= spectrum
+        data[-1] = abs(data[-1]) + 0.0j
+        tr.data = np.fft.irfft(data)[:tr.stats.npts]
+
+    if params.get("bandpass"):
+        freqmin, freqmax = params["bandpass"]
+        sos = bandpass_sos(freqmin, freqmax, tr.stats.sampling_rate, params.get("corners", 4))
+        data = sosfilt(sos, tr.data)
+        if params.get("zerophase", True):
+            data = sosfilt(sos, data[::-1])[::-1]
+        tr.data = np.ascontiguousarray(data)
+    return tr
+
+
+def process_batch(payload, merge_kwargs, responses, params):
+    """
+    Dijalankan di worker: decode satu stasiun lalu proses semua kanalnya.
+    Jika remove_response diminta, trace tanpa respons instrumen tidak ikut
+    dikembalikan (satuannya masih counts) dan id-nya dilaporkan.
+    """
+    st = decode_payload(payload, merge_kwargs)
+    out = Stream()
+    uncorrected = []
+    for tr in st:
+        response = responses.get(tr.id)
+        if params.get("remove_response") and response is None:
+            uncorrected.append(tr.id)
+            continue
+        out.append(process_trace(tr, params, response))
+    return out, uncorrected
+
+
+def _channel_responses(index, seed_ids, starttimes):
+    responses = {}
+    for seed_id in seed_ids:
+        cha = index.get_channel(tuple(seed_id.split(".")), starttimes.get(seed_id))
+        if cha is not None and cha.response is not None:
+            responses[seed_id] = ((seed_id, str(cha.start_date)), cha.response)
+    return responses
+
+
+def process_stream(st, inventory=None, params=None, parallel=True, progress=None, uncorrected=None):
+    """
+    Menjalankan pipeline untuk seluruh stream, dibatch per stasiun di pool
+    proses. Hasil ditulis ke spool sehingga kembali sebagai LazyStream.
+    Id trace yang dibuang karena tidak punya respons instrumen ditambahkan
+    ke list uncorrected bila diberikan.
+    """
+    params = dict(DEFAULT_PROCESSING, **(params or {}))
+    index = InventoryIndex(inventory) if (inventory is not None and params.get("remove_response")) else None
+
+    starttimes = {}
+    if index is not None:
+        starttimes = st.id_starttimes() if hasattr(st, "id_starttimes") else \
+            {tr.id: tr.stats.starttime for tr in st}
+
+    station_ids = {}
+    for seed_id in starttimes:
+        station_ids.setdefault(seed_id.split(".")[1], []).append(seed_id)
+
+    def jobs():
+        # Payload stasiun dibuat saat pool siap menerimanya
+        for station, payload, merge_kwargs in station_payloads(st):
+            responses = {}
+            if index is not None:
+                responses = _channel_responses(index, station_ids.get(station, []), starttimes)
+            yield payload, merge_kwargs, responses, params
+
+    total = len(station_codes(st))
+    spool = WaveformSpool()
+    for n, (_, (result, skipped)) in enumerate(imap_unordered(process_batch, jobs(), parallel=parallel), start=1):
+        spool.append(result)
+        if uncorrected is not None:
+            uncorrected.extend(skipped)
+        if progress is not None:
+            progress(n, total)
+    return spool.finalize()
@@ -0,0 +1,190 @@
+import cProfile
+import hmac
+import io
+import itertools
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from tornado.web import HTTPError, RequestHandler
+
+# Mode profiling opt-in: QUAKESEE_PROFILE=1 atau opsi server --profile
+_enabled = os.environ.get("QUAKESEE_PROFILE", "") not in ("", "0")
+# Token admin untuk mengunduh profil (tanpa token endpoint ditutup)
+_token = os.environ.get("QUAKESEE_PROFILE_TOKEN") or None
+
+_profiles = deque(maxlen=int(os.environ.get("QUAKESEE_PROFILE_KEEP", "50")))
+_lock = threading.Lock()
+_ids = itertools.count(1)
+# Hanya satu profil aktif per proses: callback bersarang atau thread lain
+# berjalan tanpa profil (Python < 3.12 tidak menolak profiler kedua, hook
+# profiler luar diambil alih diam-diam)
+_active = threading.Lock()
+
+
+def enable(on=True, token=None, keep=None):
+    global _enabled, _token, _profiles
+    _enabled = bool(on)
+    if token is not None:
+        _token = token
+    if keep is not None:
+        with _lock:
+            _profiles = deque(_profiles, maxlen=keep)
+
+
+def is_enabled():
+    return _enabled
+
+
+class ProfileRecord:
+    """Satu pemanggilan callback yang diprofil beserta ukuran masukannya"""
+
+    __slots__ = ("id", "name", "timestamp", "duration", "sizes", "error", "stats")
+
+    def __init__(self, name, timestamp, duration, sizes, error, stats):
+        self.id = next(_ids)
+        self.name = name
+        self.timestamp = timestamp
+        self.duration = duration
+        self.sizes = sizes
+        self.error = error
+        self.stats = stats
+
+    def summary(self):
+        return dict(id=self.id, name=self.name, timestamp=self.timestamp,
+                    duration=round(self.duration, 6), sizes=self.sizes, error=self.error)
+
+    def dump(self):
+        """Isi file .prof (format pstats, dapat dibuka dengan snakeviz/pstats)"""
+        return marshal.dumps(self.stats)
+
+    def top(self, limit=30, sort="cumulative"):
+        stats = pstats.Stats(self._as_profile(), stream=io.StringIO())
+        stats.sort_stats(sort).print_stats(limit)
+        return stats.stream.getvalue()
+
+    def _as_profile(self):
+        return _StatsHolder(self.stats)
+
+
+class _StatsHolder:
+    """Objek minimal yang diterima pstats.Stats (stats yang sudah jadi)"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def recent_profiles():
+    with _lock:
+        return list(_profiles)
+
+
+def get_profile(profile_id):
+    with _lock:
+        for record in _profiles:
+            if record.id == profile_id:
+                return record
+    return None
+
+
+def profiled(name, sizes=None):
+    """
+    Dekorator untuk callback berat. Saat profiling mati hanya ada satu
+    pengecekan flag; saat aktif setiap pemanggilan direkam dengan cProfile
+    bersama ukuran masukan dari sizes(*args, **kwargs).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            if not _active.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return _run_profiled(name, sizes, func, args, kwargs)
+            finally:
+                _active.release()
+        return wrapper
+    return decorator
+
+
+def _run_profiled(name, sizes, func, args, kwargs):
+    """Satu pemanggilan func yang direkam cProfile"""
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # Profiler di luar modul ini sedang aktif (Python >= 3.12)
+        return func(*args, **kwargs)
+
+    timestamp = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        prof.disable()
+        duration = time.perf_counter() - start
+        try:
+            input_sizes = sizes(*args, **kwargs) if sizes is not None else {}
+        except Exception:
+            input_sizes = {}
+        prof.create_stats()
+        with _lock:
+            _profiles.append(ProfileRecord(name, timestamp, duration, input_sizes, error, prof.stats))
+
+
+class _ProfileHandler(RequestHandler):
+
+    def prepare(self):
+        if _token is None:
+            raise HTTPError(403, "profile download disabled (no token configured)")
+        supplied = self.request.headers.get("Authorization", "")
+        supplied = supplied[7:] if supplied.startswith("Bearer ") else self.get_argument("token", "")
+        if not hmac.compare_digest(supplied.encode(), _token.encode()):
+            raise HTTPError(403)
+
+
+class ProfileListHandler(_ProfileHandler):
+    """Daftar profil terbaru (JSON)"""
+
+    def get(self):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps([record.summary() for record in recent_profiles()]))
+
+
+class ProfileDownloadHandler(_ProfileHandler):
+    """Satu profil: .prof (pstats) atau .txt (ringkasan fungsi teratas)"""
+
+    def get(self, profile_id, ext):
+        record = get_profile(int(profile_id))
+        if record is None:
+            raise HTTPError(404)
+        filename = f"quakesee_{record.name}_{record.id}.{ext}"
+        if ext == "txt":
+            self.set_header("Content-Type", "text/plain; charset=utf-8")
+            self.write(json.dumps(record.summary(), indent=2) + "\n\n" + record.top())
+        else:
+            self.set_header("Content-Type", "application/octet-stream")
+            self.set_header("Content-Disposition", f'attachment; filename="{filename}"')
+            self.write(record.dump())
+
+
+def profile_patterns(path="/profiles"):
+    """Pola Tornado untuk pn.serve(extra_patterns=...)"""
+    return [
+        (rf"{path}/?", ProfileListHandler),
+        (rf"{path}/(\d+)\.(prof|txt)", ProfileDownloadHandler),
+    ]
@@ -0,0 +1,164 @@
+from fnmatch import fnmatch
+
+import numpy as np
+from obspy import Stream, UTCDateTime
+
+from quakesee_web.mseed_index import LazyStream, decode_payload
+from quakesee_web.workers import default_workers, imap_unordered
+
+# Kolom layar per trace: sampel diringkas menjadi min/max per kolom
+SECTION_COLUMNS = 800
+# Stasiun per paket yang di-decode satu worker
+BATCH_STATIONS = 25
+
+
+def station_extents(st):
+    """Rentang waktu data (epoch) per (network, station) tanpa decode sampel"""
+    extents = {}
+    if isinstance(st, LazyStream):
+        segments = st.index.segments()
+        spans = ((seed_id.split(".")[:2], start, end) for seed_id, start, end in segments)
+    else:
+        spans = (([tr.stats.network, tr.stats.station], tr.stats.starttime.timestamp, tr.stats.endtime.timestamp)
+                 for tr in st)
+    for (net, sta), start, end in spans:
+        lo, hi = extents.get((net, sta), (start, end))
+        extents[(net, sta)] = (min(lo, start), max(hi, end))
+    return extents
+
+
+def envelope(data, starttime, delta, t0, t1, columns=SECTION_COLUMNS):
+    """
+    Ringkasan satu trace untuk jendela [t0, t1] (epoch): waktu dan amplitudo
+    yang dinormalisasi ke [-1, 1]. Jika sampel lebih banyak dari dua kali
+    kolom, setiap kolom diwakili min dan max-nya (bentuk gelombang tetap
+    utuh di layar); jika tidak, sampel dikirim apa adanya.
+    """
+    i0 = max(0, int(np.ceil((t0 - starttime) / delta - 1e-6)))
+    i1 = min(len(data), int(np.floor((t1 - starttime) / delta + 1e-6)) + 1)
+    if i1 <= i0:
+        return None
+    seg = data[i0:i1]
+    mean = seg.mean(dtype=np.float64)
+    first = starttime + i0 * delta
+
+    if len(seg) <= 2 * columns:
+        times = first + np.arange(len(seg)) * delta
+        values = seg - mean
+    else:
+        # Min/max dihitung pada data asli (tanpa salinan float), normalisasi
+        # cukup pada hasil ringkasan
+        width = (t1 - t0) / columns
+        edges = np.ceil((t0 + np.arange(columns + 1) * width - first) / delta - 1e-6).astype(np.int64)
+        edges = np.clip(edges, 0, len(seg))
+        starts = edges[:-1][edges[:-1] < edges[1:]]
+        centers = t0 + (np.nonzero(edges[:-1] < edges[1:])[0] + 0.5) * width
+        # Urutan min, max per kolom: garis vertikal penuh setiap kolom
+        times = np.repeat(centers, 2)
+        values = np.empty(len(times))
+        values[0::2] = np.minimum.reduceat(seg, starts)
+        values[1::2] = np.maximum.reduceat(seg, starts)
+        values -= mean
+
+    peak = np.abs(values).max()
+    if peak > 0:
+        values /= peak
+    return times, values
+
+
+def section_batch(payload, merge_kwargs, windows, columns):
+    """
+    Dijalankan di worker: decode satu paket stasiun lalu ringkas setiap trace.
+    windows: (network, station) -> (t0, t1, shift) epoch; waktu hasil relatif
+    terhadap shift (waktu asal + reduksi) dalam float32.
+    """
+    st = decode_payload(payload, merge_kwargs)
+    out = []
+    for tr in st:
+        window = windows.get((tr.stats.network, tr.stats.station))
+        if window is None or tr.stats.npts == 0:
+            continue
+        t0, t1, shift = window
+        result = envelope(tr.data, tr.stats.starttime.timestamp, tr.stats.delta, t0, t1, columns)
+        if result is None:
+            continue
+        times, values = result
+        out.append((tr.id, (times - shift).astype(np.float32), values.astype(np.float32)))
+    return out
+
+
+def _payloads(st, keys, channel, windows):
+    """Paket byte miniSEED (LazyStream) atau Stream per BATCH_STATIONS stasiun"""
+    codes = {}
+    if isinstance(st, LazyStream):
+        # Satu lintasan id untuk semua stasiun (bukan match per stasiun)
+        for code, seed_id in enumerate(st.index.ids):
+            net, sta, _, cha = seed_id.split(".")
+            if fnmatch(cha.upper(), channel.upper()):
+                codes.setdefault((net, sta), []).append(code)
+
+    for i in range(0, len(keys), BATCH_STATIONS):
+        batch = keys[i:i + BATCH_STATIONS]
+        if isinstance(st, LazyStream):
+            payload = b"".join(st.index.read_records(st.index.rows(codes.get(key, []), windows[key][0], windows[key][1]))
+                               for key in batch)
+            yield payload, st.merge_kwargs, {key: windows[key] for key in batch}
+        else:
+            sub = Stream()
+            for net, sta in batch:
+                sub += st.select(network=net, station=sta, channel=channel)
+            yield sub, None, {key: windows[key] for key in batch}
+
+
+def record_section(st, origin, distances, channel="??Z", reduction=None, time_range=None,
+                   distance_range=None, columns=SECTION_COLUMNS, gain=1.0, parallel=True):
+    """
+    Data record section: trace terurut jarak, waktu relatif terhadap origin
+    (dikurangi jarak_km / reduction jika reduction km/s diberikan) dan
+    amplitudo ternormalisasi di sekitar jarak masing-masing.
+
+    distances: (network, station) -> (derajat, km). time_range (detik
+    tereduksi) dan distance_range (derajat) membatasi jendela; hanya record
+    di dalam jendela yang di-decode sehingga zoom diringkas ulang dari data
+    asli. Semua trace digabung menjadi satu pasang array float32 dengan NaN
+    sebagai pemisah (satu payload biner untuk plot).
+    """
+    origin = UTCDateTime(origin).timestamp
+    extents = station_extents(st)
+    keys = [key for key in extents if key in distances]
+    if distance_range is not None:
+        keys = [key for key in keys if distance_range[0] <= distances[key][0] <= distance_range[1]]
+    keys.sort(key=lambda key: distances[key][0])
+    if not keys:
+        return None
+
+    shifts = {key: origin + (distances[key][1] / reduction if reduction else 0.0) for key in keys}
+    if time_range is None:
+        time_range = (min(extents[key][0] - shifts[key] for key in keys),
+                      max(extents[key][1] - shifts[key] for key in keys))
+    windows = {key: (shifts[key] + time_range[0], shifts[key] + time_range[1], shifts[key]) for key in keys}
+
+    traces = {}
+    jobs = ((payload, merge_kwargs, batch, columns)
+            for payload, merge_kwargs, batch in _payloads(st, keys, channel, windows))
+    use_pool = parallel and default_workers() > 1 and isinstance(st, LazyStream)
+    for _, result in imap_unordered(section_batch, jobs, parallel=use_pool):
+        for seed_id, times, values in result:
+            traces.setdefault(tuple(seed_id.split(".")[:2]), []).append((seed_id, times, values))
+
+    plotted = [key for key in keys if key in traces]
+    if not plotted:
+        return None
+    dist = np.array([distances[key][0] for key in plotted])
+    lo, hi = distance_range if distance_range is not None else (dist.min(), dist.max())
+    # Setengah tinggi trace = gain x jarak rata-rata antar trace di jendela
+    scale = gain * (hi - lo if hi > lo else 1.0) / len(plotted) * 0.5
+
+    xs, ys, labels = [], [], []
+    for key, d in zip(plotted, dist):
+        for seed_id, times, values in traces[key]:
+            xs += [times, np.array([np.nan], dtype=np.float32)]
+            ys += [(d + values * scale).astype(np.float32), np.array([np.nan], dtype=np.float32)]
+            labels.append((seed_id, float(d), float(distances[key][1])))
+    return dict(x=np.concatenate(xs), y=np.concatenate(ys), labels=labels, time_range=tuple(time_range),
+                distance_range=(float(lo), float(hi)), stations=len(plotted), scale=scale)
@@ -0,0 +1,26 @@
+import os
+
+from obspy.clients.fdsn import Client, RoutingClient
+
+# Alamat layanan data. QUAKESEE_FDSN_URL / QUAKESEE_ISC_URL dapat diarahkan ke
+# server pengganti (mis. server lokal untuk benchmark atau mirror internal).
+FDSN_URL = os.environ.get("QUAKESEE_FDSN_URL") or None
+IRIS_BASE_URL = FDSN_URL or "http://service.iris.edu"
+AVAILABILITY_URL = IRIS_BASE_URL.rstrip("/") + "/fdsnws/availability/1/query"
+# Routing federator IRIS: menentukan pusat data tiap NSLC untuk waveform_client
+FEDCATALOG_URL = "http://service.iris.edu/irisws/fedcatalog/1/query"
+ISC_URL = os.environ.get("QUAKESEE_ISC_URL") or "http://www.isc.ac.uk/cgi-bin/web-db-run"
+
+
+def event_client():
+    """Client obspy untuk event QuakeML"""
+    if FDSN_URL:
+        return Client(FDSN_URL, _discover_services=False)
+    return Client("IRIS")
+
+
+def waveform_client():
+    """Client untuk stasiun dan waveform (federator IRIS atau server pengganti)"""
+    if FDSN_URL:
+        return Client(FDSN_URL, _discover_services=False)
+    return RoutingClient("iris-federator")
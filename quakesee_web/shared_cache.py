@@ -0,0 +1,290 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from obspy import Stream, UTCDateTime
+from obspy.core.inventory import Inventory
+
+from quakesee_web.background import current_document
+from quakesee_web.geometry import covers
+from quakesee_web.mseed_index import LazyStream
+
+# Anggaran memori cache bersama (MB), dapat diubah lewat environment
+CACHE_BUDGET_MB = int(os.environ.get("QUAKESEE_CACHE_MB", "1024"))
+# Katalog dengan jendela yang berakhir dekat sekarang masih bisa bertambah:
+# disimpan paling lama RECENT_TTL detik
+RECENT_TTL = int(os.environ.get("QUAKESEE_CACHE_RECENT_TTL", "300"))
+RECENT_WINDOW = 86400
+
+# Perkiraan memori objek inventory obspy (byte, diukur dengan tracemalloc)
+_INVENTORY_BYTES = dict(station=2048, channel=2048, stage=512, coefficient=400)
+_COEFFICIENT_ATTRS = ("numerator", "denominator", "coefficients", "poles", "zeros")
+
+
+def inventory_size(inventory):
+    """Perkiraan ukuran Inventory dari jumlah stasiun, kanal, tahap respons dan koefisien"""
+    stations = channels = stages = coefficients = 0
+    for net in inventory:
+        for sta in net:
+            stations += 1
+            for cha in sta:
+                channels += 1
+                if cha.response is None:
+                    continue
+                for stage in cha.response.response_stages:
+                    stages += 1
+                    for attr in _COEFFICIENT_ATTRS:
+                        coefficients += len(getattr(stage, attr, None) or ())
+    return (stations * _INVENTORY_BYTES["station"] + channels * _INVENTORY_BYTES["channel"]
+            + stages * _INVENTORY_BYTES["stage"] + coefficients * _INVENTORY_BYTES["coefficient"])
+
+
+def sizeof(obj):
+    """Perkiraan ukuran objek di memori (byte)"""
+    if obj is None:
+        return 0
+    if isinstance(obj, LazyStream):
+        return len(obj.index.buffer) + obj.index.nbytes
+    if isinstance(obj, Stream):
+        return sum(tr.data.nbytes for tr in obj) + 1024 * len(obj)
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, Inventory):
+        return inventory_size(obj)
+    if isinstance(obj, tuple):
+        return sum(sizeof(item) for item in obj)
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "sessions", "expires")
+
+    def __init__(self, value, nbytes, expires=None):
+        self.value = value
+        self.nbytes = nbytes
+        self.sessions = set()
+        self.expires = expires
+
+    def expired(self, now):
+        return self.expires is not None and now >= self.expires
+
+
+class SharedCache:
+    """
+    Cache satu proses untuk katalog, inventory dan waveform yang dipakai
+    bersama oleh semua sesi (hanya-baca: konsumen tidak boleh mengubah objek).
+
+    Entri dievikisi LRU berdasarkan ukuran byte sampai total di bawah
+    anggaran. Entri yang masih dirujuk sesi aktif dievikisi paling akhir,
+    hanya jika entri lain tidak cukup; objek yang lebih besar dari anggaran
+    tidak disimpan. Entri dengan ttl kedaluwarsa dianggap tidak ada.
+    """
+
+    def __init__(self, budget_bytes=CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._by_session = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and not entry.expired(time.monotonic())
+
+    def get(self, key, session=None, default=None):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._attach(key, entry, session)
+            return entry.value
+
+    def find(self, match):
+        """Entri terbaru yang kuncinya memenuhi match(key): (key, value) atau (None, None)"""
+        with self._lock:
+            now = time.monotonic()
+            for key in reversed(self._entries):
+                if match(key) and not self._entries[key].expired(now):
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return key, self._entries[key].value
+        return None, None
+
+    def put(self, key, value, session=None, nbytes=None, ttl=None):
+        """
+        Menyimpan value dan mengembalikan objek kanonik: jika key sudah ada,
+        objek yang tersimpan yang dikembalikan sehingga sesi berbagi satu salinan.
+        ttl (detik) membatasi umur entri.
+        """
+        # Ukuran dihitung di luar lock (inventory/objek lain bisa lambat)
+        if nbytes is None and key not in self:
+            nbytes = sizeof(value)
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                if nbytes is None:
+                    nbytes = sizeof(value)
+                if nbytes > self.budget_bytes:
+                    return value  # lebih besar dari seluruh anggaran: tidak disimpan
+                expires = time.monotonic() + ttl if ttl is not None else None
+                entry = _Entry(value, nbytes, expires)
+                self._entries[key] = entry
+                self.nbytes += entry.nbytes
+            self._entries.move_to_end(key)
+            self._attach(key, entry, session)
+            self._evict()
+            return entry.value
+
+    def release(self, key, session):
+        """Sesi tidak lagi memakai entri key (mis. diganti hasil pencarian baru)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.sessions.discard(session)
+            keys = self._by_session.get(session)
+            if keys is not None:
+                keys.discard(key)
+            self._evict()
+
+    def release_session(self, session):
+        """Melepas semua rujukan milik sesi (dipanggil saat sesi ditutup)"""
+        with self._lock:
+            for key in self._by_session.pop(session, ()):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.sessions.discard(session)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_session.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(entries=len(self._entries), nbytes=self.nbytes, budget=self.budget_bytes,
+                        sessions=len(self._by_session), hits=self.hits, misses=self.misses)
+
+    def _attach(self, key, entry, session):
+        if session is None:
+            return
+        entry.sessions.add(session)
+        self._by_session.setdefault(session, set()).add(key)
+
+    def _live(self, key):
+        """Entri key yang belum kedaluwarsa (entri kedaluwarsa dibuang)"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expired(time.monotonic()):
+            self._drop(key)
+            return None
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry.nbytes
+        for session in entry.sessions:
+            keys = self._by_session.get(session)
+            if keys is not None:
+                keys.discard(key)
+
+    def _evict(self):
+        if self.nbytes <= self.budget_bytes:
+            return
+        # Yang tidak dirujuk sesi dulu, lalu (LRU) yang masih dirujuk: sesi
+        # tetap memegang objeknya, tetapi cache tidak melewati anggaran
+        for pinned in (False, True):
+            for key in list(self._entries):
+                if bool(self._entries[key].sessions) != pinned:
+                    continue
+                self._drop(key)
+                if self.nbytes <= self.budget_bytes:
+                    return
+
+
+_shared_cache = None
+_registered = set()
+
+
+def get_shared_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SharedCache()
+    return _shared_cache
+
+
+def session_id():
+    """
+    Id sesi Bokeh aktif (None tanpa server). Saat pertama dipanggil di sebuah
+    sesi, pelepasan rujukan cache didaftarkan untuk saat sesi ditutup.
+    """
+    doc = current_document()
+    if doc is None:
+        return None
+    sid = doc.session_context.id
+    if sid not in _registered:
+        _registered.add(sid)
+
+        def on_destroyed(session_context, sid=sid):
+            _registered.discard(sid)
+            get_shared_cache().release_session(sid)
+
+        doc.on_session_destroyed(on_destroyed)
+    return sid
+
+
+def time_key(t):
+    """UTCDateTime tidak hashable; kunci cache memakai epoch"""
+    return None if t is None else round(float(t.timestamp), 6)
+
+
+def events_key(service, full_detail, start, end, min_mag, limit):
+    """Kunci katalog dari layanan event service (URL dasar, dipakai bersama UI dan API)"""
+    return ("events", service, full_detail, time_key(start), time_key(end), min_mag, limit)
+
+
+def events_ttl(end):
+    """Umur cache katalog: terbatas jika jendela berakhir dalam RECENT_WINDOW dari sekarang"""
+    if end is None or UTCDateTime(end) >= UTCDateTime() - RECENT_WINDOW:
+        return RECENT_TTL
+    return None
+
+
+def station_key(query):
+    """Kunci inventory untuk dict parameter get_stations"""
+    return ("stations",) + tuple(time_key(v) if hasattr(v, "timestamp") else v for v in query.values())
+
+
+def covering_stations(query):
+    """
+    Inventory tersimpan dari query get_stations lain yang cincin radiusnya
+    mencakup query ini (stasiun dipilih lokal tanpa permintaan baru), atau None.
+    """
+    wanted = dict(zip(query, station_key(query)[1:]))
+
+    def match(key):
+        return (key[0] == "stations" and len(key) == len(wanted) + 1
+                and covers(dict(zip(wanted, key[1:])), wanted))
+
+    _, inventory = get_shared_cache().find(match)
+    return inventory
+
+
+def waveform_key(wave_limit, avail, merge, plan):
+    """Kunci waveform untuk rencana (net, sta, loc, cha, t1, t2) dan opsi unduhan"""
+    return ("waveforms", wave_limit, avail, merge,
+            tuple((net, sta, loc, cha, time_key(t1), time_key(t2)) for net, sta, loc, cha, t1, t2 in plan))
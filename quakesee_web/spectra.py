@@ -0,0 +1,186 @@
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from quakesee_web.mseed_index import decode_payload, station_codes, station_payloads
+from quakesee_web.workers import imap_unordered
+
+# Parameter bawaan: panjang jendela FFT (detik) dan tumpang tindih antar jendela
+SPECTRAL_WINDOW = 20.0
+SPECTRAL_OVERLAP = 0.5
+# Resolusi gambar spektrogram yang dikirim ke browser (kolom waktu x baris frekuensi)
+SPECTROGRAM_COLUMNS = 400
+SPECTROGRAM_ROWS = 128
+# Entri (trace, parameter) yang disimpan per sesi (~200 KB per spektrogram)
+CACHE_ENTRIES = 64
+# Grid frekuensi log untuk ringkasan PSD seluruh event
+SUMMARY_FREQS = 200
+
+
+def segment_length(sampling_rate, window=SPECTRAL_WINDOW):
+    """Panjang segmen FFT: pangkat dua terdekat di atas window x sampling_rate (min 16)"""
+    return int(2 ** max(4, int(np.ceil(np.log2(max(window * sampling_rate, 1))))))
+
+
+def _pool(values, size, axis):
+    """Rata-rata blok sepanjang axis sehingga panjangnya <= size"""
+    n = values.shape[axis]
+    if n <= size:
+        return values
+    factor = int(np.ceil(n / size))
+    pad = (-n) % factor
+    if pad:
+        # Blok terakhir yang tidak penuh dirata-rata dari sampel yang ada saja
+        widths = [(0, 0)] * values.ndim
+        widths[axis] = (0, pad)
+        values = np.pad(values, widths, constant_values=np.nan)
+    shape = list(values.shape)
+    shape[axis:axis + 1] = [shape[axis] // factor, factor]
+    return np.nanmean(values.reshape(shape), axis=axis + 1)
+
+
+def trace_key(seed_id, starttime, sampling_rate, npts, window, overlap):
+    """Kunci cache satu trace untuk satu set parameter spektral"""
+    return (seed_id, round(float(starttime), 6), float(sampling_rate), int(npts), float(window), float(overlap))
+
+
+def batch_spectra(traces, window=SPECTRAL_WINDOW, overlap=SPECTRAL_OVERLAP, spectrogram=True,
+                  columns=SPECTROGRAM_COLUMNS, rows=SPECTROGRAM_ROWS):
+    """
+    PSD (Welch, jendela Hann) dan spektrogram untuk banyak trace sekaligus.
+
+    traces: daftar (seed_id, starttime epoch, sampling_rate, data). Segmen dari
+    semua trace dengan panjang segmen yang sama ditumpuk lalu ditransformasi
+    dengan satu panggilan rfft. Mengembalikan dict kunci trace_key -> hasil
+    dengan freqs, psd_db, dan (jika spectrogram) times (detik dari awal
+    trace), spec_freqs dan spec_db yang sudah diringkas ke resolusi layar.
+    """
+    groups = {}
+    for seed_id, starttime, sampling_rate, data in traces:
+        nperseg = segment_length(sampling_rate, window)
+        if len(data) < nperseg:
+            continue
+        groups.setdefault((sampling_rate, nperseg), []).append((seed_id, starttime, data))
+
+    results = {}
+    for (sampling_rate, nperseg), members in groups.items():
+        step = max(1, int(nperseg * (1 - overlap)))
+        # Hann periodik (seperti scipy.signal.get_window("hann"))
+        taper = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+        # Skala densitas daya satu sisi (sama dengan scipy.signal.welch)
+        scale = 2.0 / (sampling_rate * (taper ** 2).sum())
+
+        frames, counts = [], []
+        for _, _, data in members:
+            view = sliding_window_view(np.asarray(data), nperseg)[::step]
+            frames.append(view)
+            counts.append(len(view))
+        stacked = np.concatenate(frames).astype(np.float64)
+        stacked -= stacked.mean(axis=1, keepdims=True)
+        stacked *= taper
+        power = np.abs(np.fft.rfft(stacked, axis=1)) ** 2 * scale
+        power[:, 0] /= 2
+        if nperseg % 2 == 0:
+            power[:, -1] /= 2
+        freqs = np.fft.rfftfreq(nperseg, 1.0 / sampling_rate)
+
+        offsets = np.r_[0, np.cumsum(counts)]
+        for (seed_id, starttime, data), lo, hi in zip(members, offsets[:-1], offsets[1:]):
+            block = power[lo:hi]
+            result = dict(freqs=freqs[1:], psd_db=(10 * np.log10(block.mean(axis=0)[1:] + 1e-30)).astype(np.float32))
+            if spectrogram:
+                pooled = _pool(_pool(block[:, 1:], rows, axis=1), columns, axis=0)
+                centers = (np.arange(len(block)) * step + nperseg / 2) / sampling_rate
+                result.update(
+                    times=_pool(centers, columns, axis=0),
+                    spec_freqs=_pool(freqs[1:], rows, axis=0),
+                    spec_db=(10 * np.log10(pooled.T + 1e-30)).astype(np.float32),
+                )
+            key = trace_key(seed_id, starttime, sampling_rate, len(data), window, overlap)
+            results[key] = result
+    return results
+
+
+def stream_traces(st):
+    """Masukan batch_spectra dari Stream obspy (trace kosong dilewati)"""
+    return [(tr.id, tr.stats.starttime.timestamp, tr.stats.sampling_rate, tr.data) for tr in st if tr.stats.npts]
+
+
+def psd_batch(payload, merge_kwargs, window, overlap):
+    """Dijalankan di worker: decode satu stasiun lalu PSD semua kanalnya"""
+    st = decode_payload(payload, merge_kwargs)
+    return batch_spectra(stream_traces(st), window, overlap, spectrogram=False)
+
+
+def stream_psd(st, window=SPECTRAL_WINDOW, overlap=SPECTRAL_OVERLAP, parallel=True, progress=None):
+    """PSD semua trace dalam stream, satu pekerjaan per stasiun di pool proses"""
+    jobs = ((payload, merge_kwargs, window, overlap) for _, payload, merge_kwargs in station_payloads(st))
+    total = len(station_codes(st))
+    results = {}
+    for n, (_, result) in enumerate(imap_unordered(psd_batch, jobs, parallel=parallel), start=1):
+        results.update(result)
+        if progress is not None:
+            progress(n, total)
+    return results
+
+
+def psd_summary(results, points=SUMMARY_FREQS):
+    """
+    Ringkasan PSD banyak trace per komponen (huruf terakhir kanal): median dan
+    persentil 10/90 pada grid frekuensi log bersama. Mengembalikan
+    komponen -> (freqs, p10, median, p90, jumlah trace).
+    """
+    by_component = {}
+    for key, result in results.items():
+        by_component.setdefault(key[0][-1], []).append(result)
+
+    summary = {}
+    for component, items in sorted(by_component.items()):
+        lo = min(item['freqs'][0] for item in items)
+        hi = max(item['freqs'][-1] for item in items)
+        grid = np.geomspace(lo, hi, points)
+        curves = np.vstack([np.interp(grid, item['freqs'], item['psd_db'], left=np.nan, right=np.nan)
+                            for item in items])
+        p10, median, p90 = np.nanpercentile(curves, [10, 50, 90], axis=0)
+        summary[component] = (grid, p10, median, p90, len(items))
+    return summary
+
+
+class SpectraCache:
+    """
+    Cache LRU hasil spektral per (trace, parameter) untuk satu stream sumber.
+    Cache dikosongkan otomatis jika stream sumber berganti (unduhan/proses baru).
+    """
+
+    def __init__(self, size=CACHE_ENTRIES):
+        self.size = size
+        self._source = None
+        self._entries = OrderedDict()
+
+    def bind(self, source):
+        if source is not self._source:
+            self._source = source
+            self._entries.clear()
+
+    def get(self, key):
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        return result
+
+    def update(self, results):
+        for key, result in results.items():
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def station(self, st, window=SPECTRAL_WINDOW, overlap=SPECTRAL_OVERLAP):
+        """Hasil untuk semua trace satu stasiun; hanya trace yang belum ada yang dihitung"""
+        keys = [trace_key(tr.id, tr.stats.starttime.timestamp, tr.stats.sampling_rate, tr.stats.npts, window, overlap)
+                for tr in st]
+        missing = [tr for tr, key in zip(st, keys) if self.get(key) is None]
+        if missing:
+            self.update(batch_spectra(stream_traces(missing), window, overlap))
+        return [(tr, self.get(key)) for tr, key in zip(st, keys)]
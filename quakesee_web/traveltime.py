@@ -0,0 +1,224 @@
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+from obspy import UTCDateTime
+
+from quakesee_web.background import get_thread_pool
+from quakesee_web.geometry import spherical, station_arrays
+from quakesee_web.jobs import BULK, get_job_queue
+from quakesee_web.workers import imap_unordered
+
+# Grid tabel: rapat untuk jarak regional, lebih renggang untuk teleseismik
+DISTANCES = np.r_[np.arange(0.0, 10.0, 0.25), np.arange(10.0, 180.5, 1.0)]
+DEPTHS = np.array([0.0, 10.0, 20.0, 35.0, 50.0, 75.0, 100.0, 150.0,
+                   200.0, 300.0, 400.0, 500.0, 600.0, 700.0])
+
+_tables = {}
+# Satu pembangunan tabel per proses: sesi pertama yang bersamaan menunggu hasilnya
+_tables_lock = threading.Lock()
+# Tabel yang sedang dibangun di latar belakang: model -> [kedalaman selesai, total]
+_building = {}
+
+logger = logging.getLogger(__name__)
+
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "quakesee")
+
+
+def _first_arrivals(model, depth, distances):
+    """Satu baris tabel (satu kedalaman): waktu P dan S pertama untuk semua jarak"""
+    from obspy.taup import TauPyModel
+
+    taup = TauPyModel(model=model)
+    tp = np.full(len(distances), np.nan)
+    ts = np.full(len(distances), np.nan)
+    for i, dist in enumerate(distances):
+        arrivals = taup.get_travel_times(source_depth_in_km=depth, distance_in_degree=dist,
+                                         phase_list=["ttp", "tts"])
+        for arr in arrivals:
+            if arr.name[0] in "Pp" and np.isnan(tp[i]):
+                tp[i] = arr.time
+            elif arr.name[0] in "Ss" and np.isnan(ts[i]):
+                ts[i] = arr.time
+    return tp, ts
+
+
+class TravelTimeTable:
+    """
+    Tabel waktu tempuh P/S pertama pada grid jarak x kedalaman dari model TauP.
+    Dibangun sekali (paralel per kedalaman), disimpan ke disk, lalu dipakai
+    dengan interpolasi bilinear tanpa panggilan TauP per stasiun.
+    """
+
+    def __init__(self, model="iasp91", distances=DISTANCES, depths=DEPTHS, tp=None, ts=None):
+        self.model = model
+        self.distances = np.asarray(distances, dtype=np.float64)
+        self.depths = np.asarray(depths, dtype=np.float64)
+        self.tp = tp
+        self.ts = ts
+
+    @property
+    def path(self):
+        return os.path.join(cache_dir(), f"traveltimes_{self.model}.npz")
+
+    @classmethod
+    def load(cls, model="iasp91"):
+        """Memuat tabel dari cache disk atau membangunnya jika belum ada (menahan pemanggil)"""
+        table = _tables.get(model)
+        if table is not None:
+            return table
+
+        with _tables_lock:
+            if model in _tables:
+                return _tables[model]
+            table = cls(model).read()
+            if table.tp is None:
+                table.build()
+                table.save()
+            _tables[model] = table
+        return table
+
+    @classmethod
+    def get(cls, model="iasp91"):
+        """
+        Tabel yang sudah siap (memori atau cache disk) tanpa menunggu. Jika belum
+        ada, tabel dibangun di latar belakang sebagai pekerjaan BULK dan None
+        dikembalikan; progresnya dapat dibaca lewat build_progress.
+        """
+        table = _tables.get(model)
+        if table is not None:
+            return table
+
+        with _tables_lock:
+            if model in _tables:
+                return _tables[model]
+            if model in _building:
+                return None
+            table = cls(model).read()
+            if table.tp is not None:
+                _tables[model] = table
+                return table
+            _building[model] = [0, len(table.depths)]
+        get_thread_pool().submit(_build_in_background, table)
+        return None
+
+    def read(self):
+        """Mengisi tp/ts dari cache disk jika grid-nya sama"""
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    if (np.array_equal(data["distances"], self.distances)
+                            and np.array_equal(data["depths"], self.depths)):
+                        self.tp, self.ts = data["tp"], data["ts"]
+            except Exception:
+                # File rusak/terpotong: dibangun ulang
+                self.tp = self.ts = None
+        return self
+
+    def build(self, progress=None):
+        self.tp = np.full((len(self.depths), len(self.distances)), np.nan)
+        self.ts = np.full((len(self.depths), len(self.distances)), np.nan)
+        jobs = [(self.model, depth, self.distances) for depth in self.depths]
+        for n, ((_, depth, _), (tp, ts)) in enumerate(imap_unordered(_first_arrivals, jobs), start=1):
+            row = int(np.nonzero(self.depths == depth)[0][0])
+            self.tp[row], self.ts[row] = tp, ts
+            if progress is not None:
+                progress(n, len(jobs))
+        return self
+
+    def save(self):
+        """Ditulis ke file sementara lalu os.replace: pembaca tidak pernah melihat file setengah jadi"""
+        os.makedirs(cache_dir(), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir(), prefix=f".traveltimes_{self.model}.", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, distances=self.distances, depths=self.depths, tp=self.tp, ts=self.ts)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def predict(self, distance, depth):
+        """Waktu tempuh P dan S (detik) untuk array jarak (derajat) pada satu kedalaman (km)"""
+        distance = np.asarray(distance, dtype=np.float64)
+        depth = float(np.clip(depth, self.depths[0], self.depths[-1]))
+        k = int(np.clip(np.searchsorted(self.depths, depth) - 1, 0, len(self.depths) - 2))
+        w = (depth - self.depths[k]) / (self.depths[k + 1] - self.depths[k])
+
+        result = []
+        for grid in (self.tp, self.ts):
+            row = (1 - w) * grid[k] + w * grid[k + 1]
+            valid = ~np.isnan(row)
+            values = np.interp(distance, self.distances[valid], row[valid])
+            # Di luar rentang jarak fase yang ada (mis. bayangan S) dianggap tidak ada
+            values[(distance < self.distances[valid][0]) | (distance > self.distances[valid][-1])] = np.nan
+            result.append(values)
+        return result[0], result[1]
+
+
+def _build_in_background(table):
+    """Membangun dan menyimpan tabel di thread pool, satu slot BULK di antrean server"""
+    def progress(n, total):
+        _building[table.model][0] = n
+
+    try:
+        with get_job_queue().job(f"traveltime_{table.model}", priority=BULK):
+            table.build(progress=progress)
+            table.save()
+        with _tables_lock:
+            _tables[table.model] = table
+    except Exception:
+        logger.exception("building the %s travel-time table failed", table.model)
+    finally:
+        with _tables_lock:
+            _building.pop(table.model, None)
+
+
+def build_progress(model="iasp91"):
+    """(kedalaman selesai, total) selama tabel dibangun di latar belakang, selain itu None"""
+    state = _building.get(model)
+    return None if state is None else tuple(state)
+
+
+def phase_windows(inventory, quake, before_p=60, after_s=120, model="iasp91"):
+    """
+    Jendela waktu per stasiun di sekitar tiba P/S terprediksi.
+    Mengembalikan dict (network, station) -> (starttime, endtime). Stasiun
+    tanpa prediksi P maupun S tidak dimasukkan (pemanggil memakai jendela tetap).
+    Selama tabel waktu tempuh belum siap dikembalikan None: semua stasiun
+    memakai jendela tetap sementara tabel dibangun di latar belakang.
+    """
+    keys, lats, lons = station_arrays(inventory)
+    if not keys:
+        return {}
+
+    table = TravelTimeTable.get(model)
+    if table is None:
+        return None
+
+    origin = UTCDateTime(quake['time'])
+    depth = quake.get('depth') or 0.0
+    dist, _, _ = spherical(quake['latitude'], quake['longitude'], lats, lons)
+    tp, ts = table.predict(dist, depth)
+
+    # Tanpa P maupun S (di luar tabel) tidak ada jendela fase
+    known = ~(np.isnan(tp) & np.isnan(ts))
+    # Tanpa S (zona bayangan) pakai perkiraan S ~ 1.8 x P
+    ts = np.where(np.isnan(ts), 1.8 * tp, ts)
+    tp = np.where(np.isnan(tp), 0.0, tp)
+
+    windows = {}
+    for key, p, s, ok in zip(keys, tp, ts, known):
+        if not ok:
+            continue
+        windows[key] = (origin + float(p) - before_p, origin + float(s) + after_s)
+    missing = len(keys) - len(windows)
+    if missing:
+        logger.info("phase_windows: %d of %d station(s) without P/S prediction use the fixed window",
+                    missing, len(keys))
+    return windows
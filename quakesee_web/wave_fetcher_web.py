@@ -4,19 +4,59 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 from obspy import UTCDateTime
-from obspy.clients.fdsn import Client
 from obspy.clients.fdsn.header import FDSNNoServiceException
 import datetime
-from obspy.clients.fdsn import RoutingClient
 import plotly.graph_objects as go
 import io
 from plotly.subplots import make_subplots
-from obspy import read as obread
-import matplotlib.dates as mdates
-import zipfile
 from obspy.core.inventory import read_inventory
 from obspy.core.inventory import Inventory, Network, Station
 import time
+import tempfile
+import threading
+import shutil
+from functools import partial
+from quakesee_web.mseed_index import LazyStream, WaveformSpool, sampling_rates, station_codes, seed_ids
+from quakesee_web.exporter import export_file, new_spool, write_sac_zip, ZIP_LEVELS
+from quakesee_web.merge_engine import merge_stream, DEFAULT_MERGE
+from quakesee_web.geometry import KM_PER_DEGREE, spherical, station_arrays
+from quakesee_web.inventory_index import prune_inventory, select_within, station_records
+from quakesee_web.batch_harvest import harvest_events, zip_directory
+from quakesee_web.traveltime import build_progress, phase_windows
+from quakesee_web.availability import check_availability
+from quakesee_web.background import BackgroundTask, call_later, current_document, in_thread_pool, on_ui_thread
+from quakesee_web.coalesce import Coalescer
+from quakesee_web.event_fetcher import fetch_events_paged, empty_events
+from quakesee_web.jobs import BULK, INTERACTIVE, PREFETCH, JobCancelled, get_job_queue, queue_message, upstream
+from quakesee_web.magnitude_stats import catalog_stats
+from quakesee_web.metrics import span, timed
+from quakesee_web.profiling import profiled
+from quakesee_web.record_section import record_section
+from quakesee_web.spectra import SPECTRAL_OVERLAP, SpectraCache, psd_summary, stream_psd
+from quakesee_web.services import IRIS_BASE_URL, event_client, waveform_client
+from quakesee_web.shared_cache import (covering_stations, events_key, events_ttl, get_shared_cache, session_id, station_key,
+                                       waveform_key)
+
+# Rencana waveform lebih dari ini (stasiun) dijadwalkan sebagai pekerjaan BULK
+WIDE_HARVEST = 50
+# Jeda render ulang peta/tabel setelah perubahan data terakhir (detik)
+MAP_DEBOUNCE = 0.25
+TABLE_DEBOUNCE = 0.1
+# Jeda ringkas ulang record section setelah zoom/pan terakhir (detik)
+SECTION_DEBOUNCE = 0.15
+# Jeda sebelum prefetch inventory (klik/ketikan beruntun cukup satu permintaan)
+PREFETCH_DELAY = 0.5
+
+
+def _data_sizes(self, *args, **kwargs):
+    """Ukuran data sesi saat callback dipanggil (untuk catatan profil)"""
+    return dict(events=len(self.earthquake_data), stations=len(self.station_data),
+                waveforms=len(self.waveform_data) if self.waveform_data is not None else 0)
+
+
+def _upload_sizes(event):
+    return dict(bytes=len(event.new) if event.new else 0)
+
 
 class WaveFetcher(pn.Column):
     def __init__(self, **params):
@@ -28,7 +68,8 @@ class WaveFetcher(pn.Column):
         self.extend(self.wave_fetcher.layout)
 
 class WaveFetcherParam(param.Parameterized):
-    earthquake_data = param.List(default=[])
+    # Katalog kolom (satu baris per event, terurut waktu) langsung dari fetcher
+    earthquake_data = param.DataFrame(default=empty_events())
     selected_quake = param.Dict(default={})
     station_data = param.List(default=[])
 
@@ -36,26 +77,42 @@ class WaveFetcherParam(param.Parameterized):
         super().__init__(**params)
 
         self.waveform_data = None
+        self.raw_waveform_data = None
+        self.waveform_cache = None
         self.inventory = None
+        self.fetch_task = None
+        # Prefetch inventory spekulatif: task, (kunci, future, penanda mulai)
+        self.prefetch_task = None
+        self._prefetch = None
+        # Kunci entri cache bersama yang sedang dipakai sesi ini, per jenis data
+        self._cache_keys = {}
+        # Render tampilan digabung per tick (peta di-debounce)
+        self.views = Coalescer()
+        # Versi katalog (naik setiap earthquake_data berubah) dan agregat analitiknya
+        self._catalog_version = 0
+        self._catalog_stats = (None, None)
+        self.param.watch(self._schedule_views, ['earthquake_data', 'station_data', 'selected_quake'])
 
         # UI Components
         self.create_util_widgets()
         self.create_menubar()
         self.create_controls()
         self.create_station_controls()
+        self.create_processing_controls()
         self.create_map()
         self.create_details_panel()
         self.create_table()
         self.create_station_table()
         self.create_tm_plot()
         self.create_seismogram_plot()
+        self.create_record_section()
         self._update_layout()
 
     def create_util_widgets(self):
         self.status = pn.pane.Markdown("", width=500)
 
         self.tm_button = pn.widgets.Button(
-            name='Time-Magnitude Plot',
+            name='Catalog Analytics',
             button_type='success',
             width=200
             )
@@ -82,18 +139,26 @@ class WaveFetcherParam(param.Parameterized):
             pn.Tabs(
                 ("Earthquake Parameters", self.control_panel),
                 ("Station + Seismogram Parameters", self.station_control_panel),
+                ("Processing", self.processing_panel),
             ),
             pn.pane.Markdown("## Data and Figures"),
             pn.Tabs(
                 ("Earthquake Data", self.table_pane),
                 ("Station Data", self.station_table_pane),
+                ("Merge Report", self.merge_table_pane),
                 ("Time Series", pn.Column(
                     self.tm_button,
                     self.tm_pane
                     )),
                 ("Seismograms", pn.Column(
-                    self.seis_plot_button,
-                    self.seis_pane
+                    pn.Row(self.seis_plot_button, self.spectra_check, self.spectra_window, self.psd_button),
+                    self.seis_pane,
+                    self.psd_pane
+                    )),
+                ("Record Section", pn.Column(
+                    pn.Row(self.section_component, self.section_reduction, self.section_gain),
+                    self.section_button,
+                    self.section_pane
                     )),
             ),
             sizing_mode='stretch_width'
@@ -109,16 +174,12 @@ class WaveFetcherParam(param.Parameterized):
             return io_buffer
         
         def seis_to_file(seis):
-            io_buffer = io.BytesIO()
-            seis.write(io_buffer, format="MSEED")
-            io_buffer.seek(0)
-            return io_buffer
+            with self._queued("export", BULK):
+                return export_file(seis, "MSEED")
         
         def st_to_file(st, fmt):
-            io_buffer = io.BytesIO()
-            st.write(io_buffer, format=fmt)
-            io_buffer.seek(0)
-            return io_buffer
+            with self._queued("export", BULK):
+                return export_file(st, fmt)
         
         def save_seisan_hyp(inv):
             io_buffer = io.BytesIO()
@@ -184,24 +245,20 @@ class WaveFetcherParam(param.Parameterized):
         
         # Fungsi untuk menyimpan data ke file SAC dan mengemasnya dalam ZIP
         def create_sac_zip(seis):
-            zip_buffer = io.BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for i, tr in enumerate(seis):
-                    sac_buffer = io.BytesIO()
-                    tr.write(sac_buffer, format="SAC")  # Simpan tiap trace ke buffer
-                    sac_buffer.seek(0)
-                    
-                    # Nama file berdasarkan network, station, channel, timestamp
-                    filename = f"{tr.stats.network}_{tr.stats.station}_{tr.stats.channel}_{tr.stats.starttime.strftime('%Y%m%d_%H%M%S')}.sac"
-                    zipf.writestr(filename, sac_buffer.getvalue())  # Tambahkan ke ZIP
-
-            zip_buffer.seek(0)
-            return zip_buffer
+            # Encode SAC paralel, entri ZIP ditulis segera setelah selesai
+            with self._queued("export", BULK):
+                return write_sac_zip(seis, compresslevel=self.zip_level.value)
+
+        self.zip_level = pn.widgets.Select(
+            name="ZIP Compression",
+            options=ZIP_LEVELS,
+            value=ZIP_LEVELS["Fast (1)"],
+            width=300,
+        )
 
         # Tombol download data event
         self.download_event_button = pn.widgets.FileDownload(
-            callback=lambda: df_to_csv(pd.DataFrame(self.earthquake_data)),
+            callback=lambda: df_to_csv(self.earthquake_data),
             filename="event_data.csv",
             button_type="primary",
             label="Download Event Data",
@@ -227,7 +284,7 @@ class WaveFetcherParam(param.Parameterized):
 
         # Tombol download data event
         self.download_station_xml_button = pn.widgets.FileDownload(
-            callback=lambda: st_to_file(self.inventory, "STATIONXML"),
+            callback=in_thread_pool(lambda: st_to_file(self.inventory, "STATIONXML")),
             filename="station_data.xml",
             button_type="primary",
             label="Download Station Data (.xml)",
@@ -235,7 +292,7 @@ class WaveFetcherParam(param.Parameterized):
         )
 
         self.download_station_txt_button = pn.widgets.FileDownload(
-            callback=lambda: st_to_file(self.inventory, "STATIONTXT"),
+            callback=in_thread_pool(lambda: st_to_file(self.inventory, "STATIONTXT")),
             filename="station_data.txt",
             button_type="primary",
             label="Download Station Data (.txt)",
@@ -243,7 +300,7 @@ class WaveFetcherParam(param.Parameterized):
         )
 
         self.download_station_pz_button = pn.widgets.FileDownload(
-            callback=lambda: st_to_file(self.inventory, "SACPZ"),
+            callback=in_thread_pool(lambda: st_to_file(self.inventory, "SACPZ")),
             filename="station_data.pz",
             button_type="primary",
             label="Download Station Data (.pz)",
@@ -251,7 +308,7 @@ class WaveFetcherParam(param.Parameterized):
         )
 
         self.download_station_kml_button = pn.widgets.FileDownload(
-            callback=lambda: st_to_file(self.inventory, "KML"),
+            callback=in_thread_pool(lambda: st_to_file(self.inventory, "KML")),
             filename="station_data.kml",
             button_type="primary",
             label="Download Station Data (.kml)",
@@ -260,7 +317,7 @@ class WaveFetcherParam(param.Parameterized):
 
         # Tombol download data event
         self.download_seis_button = pn.widgets.FileDownload(
-            callback=lambda: seis_to_file(self.waveform_data),
+            callback=in_thread_pool(lambda: seis_to_file(self.waveform_data)),
             filename="waveforms.mseed",
             button_type="primary",
             label="Download Waveform Data (.mseed)",
@@ -269,7 +326,7 @@ class WaveFetcherParam(param.Parameterized):
 
         # Widget Panel untuk download file
         self.download_seis_sac_button = pn.widgets.FileDownload(
-            callback=lambda: create_sac_zip(self.waveform_data),
+            callback=in_thread_pool(lambda: create_sac_zip(self.waveform_data)),
             filename="waveforms.zip",
             button_type="primary",
             label="Download SAC Data (.zip)",
@@ -282,11 +339,12 @@ class WaveFetcherParam(param.Parameterized):
         self.upload_mseed = pn.widgets.FileInput(accept=".mseed")
 
         # Fungsi untuk menangani file yang diunggah
+        @profiled("upload_event", sizes=_upload_sizes)
         def upload_event_callback(event):
             if self.upload_event.value:
                 file = io.BytesIO(self.upload_event.value)
                 self.event_data = pd.read_csv(file)
-                self.earthquake_data = self.event_data.to_dict(orient="records")
+                self.earthquake_data = self.event_data
 
         def convert_to_inventory(station_data):
             networks = {}
@@ -318,6 +376,7 @@ class WaveFetcherParam(param.Parameterized):
             return inventory
 
         # Fungsi untuk menangani file yang diunggah
+        @profiled("upload_station", sizes=_upload_sizes)
         def upload_station_callback(event):
             if self.upload_station.value:
                 file = io.BytesIO(self.upload_station.value)
@@ -326,6 +385,7 @@ class WaveFetcherParam(param.Parameterized):
                 self.inventory = convert_to_inventory(self.station_data)
 
         # Fungsi untuk menangani file yang diunggah
+        @profiled("upload_station_xml", sizes=_upload_sizes)
         def upload_station_xml_callback(event):
             if self.upload_station_xml.value:
                 file = io.BytesIO(self.upload_station_xml.value)
@@ -342,10 +402,12 @@ class WaveFetcherParam(param.Parameterized):
                         })
                 self.station_data = st_data
 
+        @profiled("upload_mseed", sizes=_upload_sizes)
         def upload_mseed_callback(event):
             if self.upload_mseed.value:
-                file = io.BytesIO(self.upload_mseed.value)
-                self.waveform_data = obread(file)
+                # Hanya header yang dibaca, sampel di-decode saat stasiun dipilih
+                self.waveform_data = LazyStream.from_bytes(self.upload_mseed.value)
+                self.raw_waveform_data = None
 
         # Pasang event handler
         self.upload_event.param.watch(upload_event_callback, 'value')
@@ -390,6 +452,7 @@ class WaveFetcherParam(param.Parameterized):
                 pn.Column(
                     self.download_seis_button,
                     self.download_seis_sac_button,
+                    self.zip_level,
                 ),
                 pn.Spacer(),
             )))
@@ -423,12 +486,29 @@ class WaveFetcherParam(param.Parameterized):
             value=100, 
             disabled=True)
         
+        self.quakeml_check = pn.widgets.Checkbox(
+            name="Full event detail (QuakeML, slower)", 
+            value=False)
+
+        # Panjang halaman waktu untuk pengambilan paralel
+        self.page_days = pn.widgets.IntInput(
+            name='Page Length (days)', 
+            value=30,
+            start=1)
+
         # Buttons
         self.fetch_button = pn.widgets.Button(
             name='Fetch Earthquake Data', 
             button_type='primary',
             width=200
             )
+
+        self.cancel_fetch_button = pn.widgets.Button(
+            name='Cancel', 
+            button_type='danger',
+            width=100,
+            disabled=True
+            )
         
         # Progress
         self.progress = pn.indicators.Progress(
@@ -438,6 +518,7 @@ class WaveFetcherParam(param.Parameterized):
         # Event Handlers
         self.limit_check.link(self.limit_input, value='disabled')
         self.fetch_button.on_click(self.fetch_earthquake_data)
+        self.cancel_fetch_button.on_click(self.cancel_fetch)
         
         # Control Panel Layout
         self.control_panel = pn.Card(
@@ -447,8 +528,11 @@ class WaveFetcherParam(param.Parameterized):
                 self.min_mag,
                 self.limit_check,
                 self.limit_input,
+                self.page_days,
+                self.quakeml_check,
                 pn.Row(
                         self.fetch_button,
+                        self.cancel_fetch_button,
                         pn.layout.Spacer(),
                         self.progress,
                     ),
@@ -486,6 +570,19 @@ class WaveFetcherParam(param.Parameterized):
             value="BH?,EH?,HH?"
         )
 
+        # Jendela berbasis fase (P/S) dari tabel waktu tempuh
+        self.phase_check = pn.widgets.Checkbox(
+            name="Phase-based windows (P/S arrivals)",
+            value=False)
+        self.before_p = pn.widgets.IntInput(
+            name='Start Before P (s)',
+            value=60
+        )
+        self.after_s = pn.widgets.IntInput(
+            name='End After S (s)',
+            value=300
+        )
+
         self.wave_limit = pn.widgets.IntInput(
             name='Total of Stations recorded', 
             value=-1
@@ -495,6 +592,14 @@ class WaveFetcherParam(param.Parameterized):
             name="Reset stations", 
             value=True)
 
+        self.prefetch_check = pn.widgets.Checkbox(
+            name="Prefetch stations when an event is selected",
+            value=True)
+
+        # Prefetch diulang jika parameter query stasiun berubah setelah event dipilih
+        for widget in (self.min_radius, self.max_radius, self.start_offset, self.end_offset, self.channel):
+            widget.param.watch(self.prefetch_inventory, 'value')
+
         # Seismogram
         self.seis_check = pn.widgets.Checkbox(
             name="+ Seismograms", 
@@ -504,6 +609,11 @@ class WaveFetcherParam(param.Parameterized):
             name="+ Merge the same traces", 
             value=True)
         
+        # Mati secara default: satu putaran routing + availability ekstra per pencarian
+        self.avail_check = pn.widgets.Checkbox(
+            name="+ Check data availability first",
+            value=False)
+
         self.statfilt_check = pn.widgets.Checkbox(
             name="+ Filter the stations", 
             value=True)
@@ -516,7 +626,24 @@ class WaveFetcherParam(param.Parameterized):
 
         self.search_button.disabled = True
 
-        self.search_button.on_click(self.search_stations)
+        self.search_button.on_click(in_thread_pool(self.search_stations))
+
+        # Mode batch: semua event yang dipilih di tabel sekaligus
+        self.batch_workers = pn.widgets.IntInput(
+            name='Batch concurrent requests',
+            value=4,
+            start=1,
+            end=16
+        )
+
+        self.batch_button = pn.widgets.FileDownload(
+            callback=in_thread_pool(self.batch_search),
+            filename="batch_waveforms.zip",
+            button_type="primary",
+            label="Batch Search Selected Events (.zip)",
+            width=300,
+            disabled=True,
+        )
         
         self.station_control_panel = pn.Card(
             pn.Column(
@@ -524,18 +651,30 @@ class WaveFetcherParam(param.Parameterized):
                 self.max_radius,
                 self.start_offset,
                 self.end_offset,
+                pn.Row(
+                    self.phase_check,
+                    self.before_p,
+                    self.after_s,
+                ),
                 self.channel,
                 self.wave_limit,
                 pn.pane.Markdown("**Description:**\n1. **-1** : all - parallel version.\n2. **0** : all - serial version.\n3. **\>0** : limit wave number - serial version.", width=500),
                 self.rest_check,
+                self.prefetch_check,
                 self.seis_check,
                 self.merge_check,
+                self.avail_check,
                 self.statfilt_check,
                 pn.Row(
                         self.search_button,
                         pn.layout.Spacer(),
                         self.progress,
                     ),
+                pn.pane.Markdown("**Batch:** select several rows in the Earthquake Data table (Ctrl/Shift + click).", width=500),
+                pn.Row(
+                        self.batch_workers,
+                        self.batch_button,
+                    ),
                 self.status,
                 sizing_mode='stretch_width'
             ),
@@ -545,6 +684,90 @@ class WaveFetcherParam(param.Parameterized):
 
         self.station_control_panel.collapsed = False
 
+    def create_processing_controls(self):
+        """Membuat kontrol untuk pipeline pemrosesan waveform"""
+        self.detrend_select = pn.widgets.Select(
+            name='Detrend',
+            options=['linear', 'demean', 'none'],
+            value='linear'
+        )
+        self.taper_input = pn.widgets.FloatInput(
+            name='Taper (fraction per side)',
+            value=0.05,
+            step=0.01
+        )
+        self.response_check = pn.widgets.Checkbox(
+            name="Remove instrument response",
+            value=False)
+        self.response_output = pn.widgets.Select(
+            name='Output',
+            options=['VEL', 'DISP', 'ACC'],
+            value='VEL'
+        )
+        self.water_level = pn.widgets.FloatInput(
+            name='Water Level (dB)',
+            value=60.0,
+            step=1.0
+        )
+        self.bandpass_check = pn.widgets.Checkbox(
+            name="Bandpass filter",
+            value=False)
+        self.freqmin = pn.widgets.FloatInput(
+            name='Freq Min (Hz)',
+            value=1.0,
+            step=0.1
+        )
+        self.freqmax = pn.widgets.FloatInput(
+            name='Freq Max (Hz)',
+            value=10.0,
+            step=0.1
+        )
+        self.corners = pn.widgets.IntInput(
+            name='Corners',
+            value=4
+        )
+        self.zerophase_check = pn.widgets.Checkbox(
+            name="Zero phase",
+            value=True)
+
+        self.process_button = pn.widgets.Button(
+            name='Process Waveforms!',
+            button_type='primary',
+            width=200
+        )
+        self.process_button.on_click(self.process_waveforms)
+
+        self.processing_panel = pn.Card(
+            pn.Row(
+                pn.Column(
+                    self.detrend_select,
+                    self.taper_input,
+                ),
+                pn.Column(
+                    self.response_check,
+                    self.response_output,
+                    self.water_level,
+                ),
+                pn.Column(
+                    self.bandpass_check,
+                    self.freqmin,
+                    self.freqmax,
+                    self.corners,
+                    self.zerophase_check,
+                ),
+            ),
+            pn.Row(
+                    self.process_button,
+                    pn.layout.Spacer(),
+                    self.progress,
+                ),
+            self.status,
+            title='Waveform Processing (detrend, taper, response, bandpass)',
+            styles={'background': '#f0f0f0'}
+        )
+
+        self.processing_panel.collapsed = False
+
     def create_map(self):
         self.map_fig = px.scatter_geo(projection='natural earth')
         self.map_fig.update_geos(showcountries=True)
@@ -614,10 +837,24 @@ class WaveFetcherParam(param.Parameterized):
             styles={'background': '#f0f0f0'}
         )
 
+        # Laporan gap/overlap per kanal dari proses merge
+        self.merge_table = pn.widgets.Tabulator(
+            pagination='local',
+            page_size=10,
+            sizing_mode='stretch_width',
+            disabled=True,
+        )
+        self.merge_table_pane = pn.Card(
+            self.merge_table,
+            title='Gaps and Overlaps per Channel',
+            styles={'background': '#f0f0f0'}
+        )
+
     def create_tm_plot(self):
         self.tm_pane = pn.Card(
-            pn.pane.Plotly(),
-            title='Magnitude vs Time',
+            pn.pane.Plotly(height=750, sizing_mode='stretch_width'),
+            pn.pane.Markdown(""),
+            title='Catalog Analytics',
             styles={'background': '#f0f0f0'}
         )
         self.tm_pane.visible = False
@@ -626,8 +863,22 @@ class WaveFetcherParam(param.Parameterized):
         self.seis_prev_button = pn.widgets.Button(name="Previous", button_type="primary", width=200)
         self.seis_next_button = pn.widgets.Button(name="Next", button_type="primary", width=200)
         
+        # Spektrogram + PSD tiap kanal di samping seismogram stasiun yang sama
+        self.spectra_check = pn.widgets.Checkbox(name="Spectrogram + PSD", value=True)
+        self.spectra_window = pn.widgets.FloatInput(
+            name='Spectral Window (s)', value=20.0, step=5.0, start=1.0, width=150)
+        self.psd_button = pn.widgets.Button(name='Event PSD', button_type='success', width=200)
+        self.psd_button.on_click(in_thread_pool(self.show_event_psd))
+        self.spectra = SpectraCache()
+        # PSD seluruh event terakhir: (stream sumber, window, hasil)
+        self._event_psd = None
+        self._seis_watchers = []
+
+        self.seis_plot = pn.pane.Plotly(sizing_mode='stretch_width')
+        self.spectra_plot = pn.pane.Plotly(sizing_mode='stretch_width')
+        self.spectra_plot.visible = self.spectra_check.value
         self.seis_pane = pn.Card(
-            pn.pane.Plotly(),
+            pn.Row(self.seis_plot, self.spectra_plot, sizing_mode='stretch_width'),
             pn.Row(
                 pn.layout.Spacer(), 
                 self.seis_prev_button, 
@@ -637,11 +888,58 @@ class WaveFetcherParam(param.Parameterized):
             styles={'background': '#f0f0f0'}
         )
         self.seis_pane.visible = False
+
+        self.psd_pane = pn.Card(
+            pn.pane.Plotly(height=500, sizing_mode='stretch_width'),
+            title='Event PSD',
+            styles={'background': '#f0f0f0'}
+        )
+        self.psd_pane.visible = False
     
-    @param.depends('earthquake_data', watch=True)
+    def create_record_section(self):
+        self.section_component = pn.widgets.Select(
+            name='Component', options=['Z', 'N', 'E', '1', '2'], value='Z', width=100)
+        self.section_reduction = pn.widgets.FloatInput(
+            name='Reduction Velocity (km/s, 0 = none)', value=0.0, step=0.5, start=0.0, width=250)
+        self.section_gain = pn.widgets.FloatSlider(
+            name='Gain', start=0.2, end=5.0, step=0.1, value=1.0, width=200)
+        self.section_button = pn.widgets.Button(
+            name='Plot Record Section', button_type='success', width=200)
+        self.section_button.on_click(self.show_record_section)
+
+        self.section_pane = pn.Card(
+            pn.pane.Plotly(height=800, sizing_mode='stretch_width'),
+            pn.pane.Markdown(""),
+            title='Record Section',
+            styles={'background': '#f0f0f0'}
+        )
+        self.section_pane.visible = False
+        # Jendela tampilan saat ini (None = seluruh data); zoom meringkas ulang dari data asli
+        self._section_view = dict(time_range=None, distance_range=None)
+        # uirevision plotly: dinaikkan saat plot ulang/reset eksplisit agar zoom lama dilupakan
+        self._section_revision = 0
+        self.section_pane[0].param.watch(self._section_zoom, 'relayout_data')
+
+    def _schedule_views(self, *events):
+        """Perubahan data hanya menandai tampilan; tiap tampilan dirender sekali per tick"""
+        changed = {event.name for event in events}
+        if changed & {'earthquake_data', 'station_data'}:
+            # Peta gempa + stasiun dibangun ulang sekali untuk kedua perubahan
+            self.views.mark(self.update_map, delay=MAP_DEBOUNCE)
+        if 'earthquake_data' in changed:
+            self._catalog_version += 1
+            self.views.mark(self.update_table, delay=TABLE_DEBOUNCE)
+            if self.tm_pane.visible:
+                self.views.mark(self.update_tm_plot, delay=MAP_DEBOUNCE)
+        if 'station_data' in changed:
+            self.views.mark(self.update_station_table, delay=TABLE_DEBOUNCE)
+        if 'selected_quake' in changed:
+            self.views.mark(self.update_details)
+
+    @profiled("update_map", sizes=_data_sizes)
     def update_map(self):
         if len(self.earthquake_data) > 0:
-            df = pd.DataFrame(self.earthquake_data)
+            df = self.earthquake_data
             self.map_fig = px.scatter_geo(
                 df,
                 lat='latitude',
@@ -680,24 +978,15 @@ class WaveFetcherParam(param.Parameterized):
 
         self.map_pane.object = self.map_fig
 
-    @param.depends('station_data', watch=True)
-    def update_station_map(self):
-        """Memperbarui peta dengan data gempa dan stasiun"""
-        self.update_map()
-        
-    @param.depends('earthquake_data', watch=True)
     def update_table(self):
         if len(self.earthquake_data) > 0:
-            df = pd.DataFrame(self.earthquake_data)
-            self.table.value = df
+            self.table.value = self.earthquake_data
 
-    @param.depends('station_data', watch=True)
     def update_station_table(self):
         if len(self.station_data) > 0:
             df = pd.DataFrame(self.station_data)
             self.station_table.value = df
 
-    @param.depends('selected_quake', watch=True)
     def update_details(self):
         """
         Memperbarui panel detail saat selected_quake berubah.
@@ -715,17 +1004,126 @@ class WaveFetcherParam(param.Parameterized):
         else:
             self.details.object = "No earthquake selected."
 
+    def _station_query(self, quake):
+        """Parameter get_stations untuk event dengan pengaturan radius/kanal saat ini"""
+        origin = UTCDateTime(quake['time'])
+        return dict(
+            network="*",
+            station="*",
+            channel=self.channel.value,
+            starttime=origin + self.start_offset.value,
+            endtime=origin + self.end_offset.value,
+            latitude=quake['latitude'],
+            longitude=quake['longitude'],
+            minradius=self.min_radius.value,
+            maxradius=self.max_radius.value,
+            level="response"
+        )
+
+    @param.depends('selected_quake', watch=True)
+    def prefetch_inventory(self, *events):
+        """
+        Prefetch spekulatif inventory untuk event terpilih dengan prioritas
+        terendah di antrean. Dibatalkan jika pilihan berubah; hasilnya masuk
+        cache bersama sehingga "Search!" biasanya mulai dari data hangat.
+        Jeda dan penantian slot tidak menahan thread: jeda lewat timer IOLoop,
+        thread pool baru dipakai setelah slot prefetch diberikan.
+        """
+        self._cancel_prefetch()
+        if not self.selected_quake or not self.prefetch_check.value:
+            return
+        if self.inventory is not None and not self.rest_check.value:
+            return  # pencarian memakai inventory sesi, bukan query baru
+
+        query = self._station_query(self.selected_quake)
+        key = station_key(query)
+        if key in get_shared_cache():
+            return
+
+        task = self.prefetch_task = BackgroundTask()
+        started = threading.Event()
+        done = threading.Event()
+        owner = session_id()
+        queue = get_job_queue()
+
+        def run(job):
+            try:
+                if task.cancelled or key in get_shared_cache():
+                    return
+                started.set()
+                with span("prefetch"):
+                    with upstream(), span("inventory_query") as s:
+                        inventory = waveform_client().get_stations(**query)
+                        s.add(records=sum(len(net) for net in inventory))
+                    get_shared_cache().put(key, inventory)
+            except Exception:
+                pass  # tercatat sebagai error tahap prefetch; "Search!" mengulang query seperti biasa
+            finally:
+                queue.finish(job)
+                done.set()
+
+        def release(job, future):
+            # Dibatalkan sebelum run mulai: finally di run tidak jalan, slot dikembalikan di sini
+            if future.cancelled():
+                queue.finish(job)
+                done.set()
+
+        def granted(job):
+            if task.cancelled:
+                queue.finish(job)
+                done.set()
+            else:
+                task.submit(run, job).add_done_callback(partial(release, job))
+
+        def enqueue():
+            if task.cancelled:
+                done.set()
+                return
+            task.job = queue.submit("prefetch", owner=owner, priority=PREFETCH, on_grant=granted)
+
+        call_later(current_document(), PREFETCH_DELAY, enqueue)
+        self._prefetch = (key, task, started, done)
+
+    def _cancel_prefetch(self):
+        """Membatalkan prefetch; yang masih antre langsung keluar dari antrean"""
+        task = self.prefetch_task
+        self.prefetch_task = None
+        if task is None:
+            return
+        task.cancel()
+        if task.job is not None:
+            get_job_queue().withdraw(task.job)
+
+    def _await_prefetch(self, key):
+        """
+        Prefetch untuk key yang sudah mengirim permintaan ditunggu (tidak
+        mengulang query); yang masih antre/menunggu jeda dibatalkan.
+        """
+        if self._prefetch is None:
+            return
+        prefetch_key, task, started, done = self._prefetch
+        self._prefetch = None
+        if done.is_set():
+            return
+        if prefetch_key == key and started.is_set():
+            self.status.object = "waiting for station prefetch . . ."
+            done.wait()
+        elif task is self.prefetch_task:
+            self._cancel_prefetch()
+
     def update_selected_quake(self, index):
         """
         Memperbarui selected_quake berdasarkan indeks gempa yang dipilih.
         """
-        if self.earthquake_data and 0 <= index < len(self.earthquake_data):
-            self.selected_quake = self.earthquake_data[index]
+        if 0 <= index < len(self.earthquake_data):
+            self.selected_quake = self.earthquake_data.iloc[index].to_dict()
 
     def on_table_select(self, event):
         """
         Handler saat baris di tabel dipilih.
         """
+        # Batch hanya aktif jika ada baris terpilih
+        self.batch_button.disabled = not event.new
         if event.new:
             selected_index = event.new[0]  # Ambil indeks baris yang dipilih
             self.update_selected_quake(selected_index)
@@ -741,49 +1139,135 @@ class WaveFetcherParam(param.Parameterized):
             longitude = clicked_point['lon']
             
             # Cari gempa yang sesuai dengan koordinat yang diklik
-            for index, quake in enumerate(self.earthquake_data):
-                if quake['latitude'] == latitude and quake['longitude'] == longitude:
-                    self.update_selected_quake(index)
-                    self.search_button.disabled = False
-                    break
+            df = self.earthquake_data
+            found = np.flatnonzero((df['latitude'] == latitude).to_numpy() & (df['longitude'] == longitude).to_numpy())
+            if len(found):
+                self.update_selected_quake(int(found[0]))
+                self.search_button.disabled = False
     
+    def _cache_get(self, kind, key):
+        """Ambil dari cache bersama dan catat rujukan sesi ini (None jika tidak ada)"""
+        value = get_shared_cache().get(key, session=session_id())
+        if value is not None:
+            self._cache_hold(kind, key)
+        return value
+
+    def _cache_put(self, kind, key, value, ttl=None):
+        """Simpan ke cache bersama; mengembalikan salinan kanonik yang dibagi antar sesi"""
+        value = get_shared_cache().put(key, value, session=session_id(), ttl=ttl)
+        self._cache_hold(kind, key)
+        return value
+
+    def _cache_hold(self, kind, key):
+        old = self._cache_keys.get(kind)
+        if old is not None and old != key:
+            get_shared_cache().release(old, session_id())
+        self._cache_keys[kind] = key
+
+    def _queued(self, name, priority=INTERACTIVE):
+        """Pekerjaan berat lewat antrean server; posisi antrean tampil di status"""
+        return get_job_queue().job(name, owner=session_id(), priority=priority,
+                                   on_wait=self._show_queue_position)
+
+    def _show_queue_position(self, position):
+        self.status.object = queue_message(position)
+
     def fetch_earthquake_data(self, event):
-        try:
-            beginning = time.time()
-            self.progress.active = True
-            client = Client("IRIS")
-            
-            start = UTCDateTime(self.start_date.value)
-            end = UTCDateTime(self.end_date.value)
-            min_mag = self.min_mag.value
-            limit = self.limit_input.value if not self.limit_check.value else None
-            
-            catalog = client.get_events(
-                starttime=start,
-                endtime=end,
-                minmagnitude=min_mag,
-                limit=limit
-            )
-            
-            self.earthquake_data = [{
-                "time": str(ev.origins[0].time),
-                "latitude": ev.origins[0].latitude,
-                "longitude": ev.origins[0].longitude,
-                "depth": ev.origins[0].depth/1000,
-                "magnitude": ev.magnitudes[0].mag,
-                "magnitude_type": ev.magnitudes[0].magnitude_type
-            } for ev in catalog]
-            
-        except FDSNNoServiceException:
+        """Mengambil katalog di thread latar belakang, per halaman waktu"""
+        if self.fetch_task is not None:
+            self.fetch_task.cancel()
+        task = self.fetch_task = BackgroundTask()
+        doc = current_document()
+
+        beginning = task.started
+        self.progress.active = True
+        self.cancel_fetch_button.disabled = False
+        self.earthquake_data = empty_events()
+        self.status.object = "fetching events . . ."
+
+        start = UTCDateTime(self.start_date.value)
+        end = UTCDateTime(self.end_date.value)
+        min_mag = self.min_mag.value
+        limit = self.limit_input.value if not self.limit_check.value else None
+        page_days = self.page_days.value
+        full_detail = self.quakeml_check.value
+
+        # Katalog yang sama sudah diambil sesi lain: pakai salinan bersama
+        key = events_key(IRIS_BASE_URL, full_detail, start, end, min_mag, limit)
+        cached = self._cache_get("events", key)
+        if cached is not None:
+            self._append_events(task, cached, 1, 1)
+            self._finish_fetch(task, beginning, None)
+            return
+
+        def on_page(records, done, total):
+            on_ui_thread(doc, self._append_events, task, records, done, total)
+
+        def on_wait(position):
+            on_ui_thread(doc, self._show_queue_position, position)
+
+        owner = session_id()
+
+        def run():
+            try:
+                with get_job_queue().job("event_query", owner=owner, on_wait=on_wait, task=task):
+                    on_ui_thread(doc, setattr, self.status, "object", "fetching events . . .")
+                    # Jalur cepat format=text; QuakeML hanya jika detail penuh diminta
+                    source = event_client() if full_detail else IRIS_BASE_URL
+                    result = fetch_events_paged(source, start, end, min_mag, limit=limit,
+                                                page_days=page_days, on_page=on_page, task=task)
+                on_ui_thread(doc, self._finish_fetch, task, beginning, None, result, key, events_ttl(end))
+            except JobCancelled:
+                pass
+            except Exception as e:
+                on_ui_thread(doc, self._finish_fetch, task, beginning, e)
+
+        task.submit(run)
+
+    def _append_events(self, task, page, done, total):
+        """Menambahkan hasil satu halaman ke tabel dan peta (di IOLoop sesi)"""
+        if task.cancelled or task is not self.fetch_task:
+            return
+        if len(page):
+            page = page.sort_values("time", kind="stable", ignore_index=True)
+            catalog = self.earthquake_data
+            if not len(catalog):
+                self.earthquake_data = page
+            else:
+                # Halaman adalah rentang waktu yang tidak tumpang tindih: cukup
+                # disisipkan di posisinya, tanpa mengurutkan ulang seluruh katalog
+                at = catalog["time"].searchsorted(page["time"].iloc[0], side="right")
+                self.earthquake_data = pd.concat([catalog.iloc[:at], page, catalog.iloc[at:]], ignore_index=True)
+        self.status.object = f"fetching events . . . {done}/{total} pages, {len(self.earthquake_data)} events"
+
+    def _finish_fetch(self, task, beginning, error, result=None, key=None, ttl=None):
+        if task is not self.fetch_task:
+            return
+        if result is not None and not task.cancelled:
+            self._cache_put("events", key, result, ttl=ttl)
+        self.progress.active = False
+        self.cancel_fetch_button.disabled = True
+        self.fetch_task = None
+
+        if isinstance(error, FDSNNoServiceException):
             pn.state.notifications.error("Service Error: Unable to connect to FDSN service")
-        except Exception as e:
-            pn.state.notifications.error(f"Error fetching data: {str(e)}")
-        finally:
-            self.progress.active = False
-            execution_time = time.time() - beginning
-            txt = f"Finished! Duration {execution_time:.6f} s."
-            self.status.object = txt
+        elif error is not None:
+            pn.state.notifications.error(f"Error fetching data: {str(error)}")
+
+        execution_time = time.time() - beginning
+        txt = f"Finished! {len(self.earthquake_data)} events. Duration {execution_time:.6f} s."
+        if task.cancelled:
+            txt = f"Cancelled! {len(self.earthquake_data)} events kept. Duration {execution_time:.6f} s."
+        self.status.object = txt
+
+    def cancel_fetch(self, event):
+        """Membatalkan pengambilan katalog yang sedang berjalan"""
+        if self.fetch_task is not None:
+            task = self.fetch_task
+            task.cancel()
+            self._finish_fetch(task, task.started, None)
 
+    @profiled("search_stations", sizes=_data_sizes)
     def search_stations(self, event):
         """Mencari stasiun berdasarkan parameter yang dimasukkan"""
         # try:
@@ -795,7 +1279,7 @@ class WaveFetcherParam(param.Parameterized):
             return
         
         # Dapatkan parameter dari kontrol
-        client = RoutingClient("iris-federator")
+        client = waveform_client()
         starttime = UTCDateTime(self.selected_quake['time']) + self.start_offset.value
         endtime = UTCDateTime(self.selected_quake['time']) + self.end_offset.value
 
@@ -803,20 +1287,24 @@ class WaveFetcherParam(param.Parameterized):
 
         def seek_st():
             self.status.object = "search available stations . . ."
-            
-            # Lakukan pencarian stasiun
-            return client.get_stations(
-                network="*",
-                station="*",
-                channel=self.channel.value,
-                starttime=starttime,
-                endtime=endtime,
-                latitude=self.selected_quake['latitude'],
-                longitude=self.selected_quake['longitude'],
-                minradius=self.min_radius.value,
-                maxradius=self.max_radius.value,
-                level="response"
-            )
+
+            query = self._station_query(self.selected_quake)
+            key = station_key(query)
+            self._await_prefetch(key)
+            inventory = self._cache_get("stations", key)
+            if inventory is None:
+                superset = covering_stations(query)
+                if superset is not None:
+                    # Radius lebih sempit dari pencarian sebelumnya: seleksi lokal
+                    inventory = select_within(superset, query['latitude'], query['longitude'],
+                                              query['minradius'], query['maxradius'])
+                else:
+                    # Lakukan pencarian stasiun
+                    with upstream(), span("inventory_query") as s:
+                        inventory = client.get_stations(**query)
+                        s.add(records=sum(len(net) for net in inventory))
+                inventory = self._cache_put("stations", key, inventory)
+            return inventory
         
         if self.inventory is None:
             inventory = seek_st()
@@ -828,89 +1316,144 @@ class WaveFetcherParam(param.Parameterized):
 
         if self.seis_check.value:
             self.waveform_data = None
-
             self.status.object = "search available waveforms . . ."
 
-            if self.wave_limit.value == -1:
-                net_code = ",".join(list(set([network.code for network in inventory])))
-                stat_code = ",".join(list(set([station.code for network in inventory for station in network])))
-                self.waveform_data = client.get_waveforms(
-                                network=net_code, station=stat_code, location="*",
-                                channel=self.channel.value, starttime=starttime, endtime=endtime
-                            )
-
-                strcode = []
-                for network in inventory:
-                    for station in network:
-                        strcode.append(f"{network.code}.{station.code}")
-                strcode = list(set(strcode))
-
-                for tr in self.waveform_data:
-                    if f"{tr.stats.network}.{tr.stats.station}" not in strcode:
-                        self.waveform_data.remove(tr)
-
+            # Jendela per stasiun di sekitar P/S, atau jendela tetap dari offset
+            windows = None
+            table_note = None
+            if self.phase_check.value:
+                windows = phase_windows(inventory, self.selected_quake,
+                                        before_p=self.before_p.value, after_s=self.after_s.value)
+                building = build_progress()
+                if windows is None and building is not None:
+                    # Tabel TauP pertama dibangun di latar belakang: sementara pakai offset tetap
+                    table_note = (f"Travel-time table is being built ({building[0]}/{building[1]} depths); "
+                                  "fixed offsets were used for the time windows.")
+                    self.status.object = f"search available waveforms . . . {table_note}"
+
+            def station_window(network, station):
+                if windows is None:
+                    return starttime, endtime
+                return windows.get((network.code, station.code), (starttime, endtime))
+
+            # Rencana permintaan per stasiun (net, sta, loc, cha, start, end)
+            plan = {}
+            for network in inventory:
+                for station in network:
+                    t1, t2 = station_window(network, station)
+                    plan.setdefault((network.code, station.code), (network.code, station.code, "*", self.channel.value, t1, t2))
+            plan = list(plan.values())
+
+            # Waveform untuk rencana yang sama (termasuk opsi merge) dibagi antar sesi
+            wave_key = waveform_key(self.wave_limit.value, self.avail_check.value, self.merge_check.value, plan)
+            shared = self._cache_get("waveforms", wave_key)
+
+            if shared is not None:
+                self.waveform_data, report = shared
+                self.raw_waveform_data = None
+                self.waveform_cache = self.waveform_data
+                if report is not None:
+                    self.merge_table.value = pd.DataFrame(report)
+                pruned = failed = unchecked = 0
             else:
-                tot = len([s for network in inventory for s in network])
-                nn = 0
-                ii = 0
-                for network in inventory:
-                    for station in network:
-                        ii += 1
-                        try:
-                            # Download waveform
-                            st = client.get_waveforms(
-                                network=network.code, station=station.code, location="*",
-                                channel=self.channel.value, starttime=starttime, endtime=endtime
-                            )
-                            if len(st) > 0:
-                                if nn == 0:
-                                    self.waveform_data = st
-                                else:
-                                    self.waveform_data += st
-
-                                nn += 1
-                                if self.wave_limit.value > 0:
-                                    self.status.object = f"{nn}. {network.code}.{station.code}\ndownloaded ({int(100*nn/self.wave_limit.value)}%)"
-                                else:
-                                    self.status.object = f"{nn}. {network.code}.{station.code}\ndownloaded ({int(100*ii/tot)}%)"
-                        except:
-                            pass
-                    
-                        if self.wave_limit.value > 0:
-                            if nn >= self.wave_limit.value: break
-                    
-                    if self.wave_limit.value > 0:
-                        if nn >= self.wave_limit.value: break
-        
-            if self.merge_check.value:
-                self.waveform_data.merge(method=1, interpolation_samples=-1, fill_value='interpolate')
+                # Unduhan waveform lewat antrean server; rencana besar dihitung sebagai BULK
+                priority = BULK if len(plan) > WIDE_HARVEST else INTERACTIVE
+                with self._queued("waveform_fetch", priority):
+                    # Waveform ditulis ke file sementara saat tiba dan dibuka secara lazy
+                    spool = WaveformSpool()
+                    pruned = unchecked = 0
+                    if self.avail_check.value:
+                        self.status.object = "check data availability . . ."
+                        with span("availability_check") as s:
+                            plan, pruned, unchecked = check_availability(plan, cached=self.waveform_cache)
+                            s.add(records=len(plan) + pruned)
+
+                    self.status.object = "search available waveforms . . ."
+                    failed = 0
+
+                    with span("waveform_fetch") as s:
+                        if self.wave_limit.value == -1:
+                            if windows is None and pruned == 0:
+                                net_code = ",".join(list(set([network.code for network in inventory])))
+                                stat_code = ",".join(list(set([station.code for network in inventory for station in network])))
+                                with upstream():
+                                    st = client.get_waveforms(
+                                                    network=net_code, station=stat_code, location="*",
+                                                    channel=self.channel.value, starttime=starttime, endtime=endtime
+                                                )
+                            elif plan:
+                                bulk = [(net, sta, loc, cha.strip(), t1, t2)
+                                        for net, sta, loc, chans, t1, t2 in plan for cha in chans.split(",")]
+                                with upstream():
+                                    st = client.get_waveforms_bulk(bulk)
+                            else:
+                                st = None
+
+                            if st is not None:
+                                strcode = set(f"{net}.{sta}" for net, sta, _, _, _, _ in plan)
+                                st.traces = [tr for tr in st if f"{tr.stats.network}.{tr.stats.station}" in strcode]
+                                spool.append(st)
+                                del st
+
+                        else:
+                            tot = len(plan)
+                            nn = 0
+                            for ii, (net, sta, loc, cha, t1, t2) in enumerate(plan, start=1):
+                                try:
+                                    # Download waveform
+                                    with upstream():
+                                        st = client.get_waveforms(
+                                            network=net, station=sta, location=loc,
+                                            channel=cha, starttime=t1, endtime=t2
+                                        )
+                                    if len(st) > 0:
+                                        spool.append(st)
+
+                                        nn += 1
+                                        if self.wave_limit.value > 0:
+                                            self.status.object = f"{nn}. {net}.{sta}\ndownloaded ({int(100*nn/self.wave_limit.value)}%)"
+                                        else:
+                                            self.status.object = f"{nn}. {net}.{sta}\ndownloaded ({int(100*ii/tot)}%)"
+                                except Exception:
+                                    failed += 1
 
-            if self.statfilt_check.value:
+                                if self.wave_limit.value > 0:
+                                    if nn >= self.wave_limit.value: break
+
+                        self.waveform_data = spool.finalize()
+                        if self.waveform_data:
+                            s.add(nbytes=len(self.waveform_data.index.buffer), records=len(self.waveform_data))
+
+                    self.raw_waveform_data = None
+                    # Simpan sebagai cache extent untuk pra-pemeriksaan berikutnya
+                    self.waveform_cache = self.waveform_data
+
+                    report = None
+                    if self.merge_check.value and self.waveform_data:
+                        self.status.object = "merge the same traces . . ."
+                        # Merge per NSLC + laporan gap/overlap tiap kanal
+                        with span("merge") as s:
+                            self.waveform_data, report = merge_stream(self.waveform_data, **DEFAULT_MERGE)
+                            s.add(records=len(report))
+                        self.merge_table.value = pd.DataFrame(report)
+
+                    # Hasil parsial karena permintaan gagal tidak dibagikan
+                    if self.waveform_data and failed == 0:
+                        self.waveform_data, _ = self._cache_put("waveforms", wave_key, (self.waveform_data, report))
+                        self.waveform_cache = self.waveform_data
+
+            if self.statfilt_check.value and self.waveform_data:
                 self.status.object = "select stations based on the waveforms . . ."
 
-                net_code = list(set(tr.stats.network for tr in self.waveform_data))
-                stat_code = list(set(tr.stats.station for tr in self.waveform_data))
-
-                net_code = list(set(network.code for network in inventory if network.code not in net_code))
-                for ncode in net_code:
-                    inventory = inventory.remove(network=ncode)
-
-                stat_code = list(set(station.code for network in inventory for station in network if station.code not in stat_code))
-                for scode in stat_code:
-                    inventory = inventory.remove(station=scode)
+                # Seleksi satu lintasan berdasarkan kunci (network, station, location, channel)
+                with span("filter") as s:
+                    nslc_keys = [tuple(seed_id.split(".")) for seed_id in seed_ids(self.waveform_data)]
+                    inventory = prune_inventory(inventory, nslc_keys)
+                    s.add(records=len(nslc_keys))
         
         def update_st():
-            st_data = []
-            for net in inventory:
-                for sta in net:
-                    st_data.append({
-                        'network': net.code,
-                        'station': sta.code,
-                        'latitude': sta.latitude,
-                        'longitude': sta.longitude,
-                        'elevation': sta.elevation
-                    })
-            self.station_data = st_data
+            # Jarak/azimuth terhadap event terpilih, diurutkan dari yang terdekat
+            self.station_data = station_records(inventory, origin=self.selected_quake)
             self.inventory = inventory
         
         # Format data stasiun
@@ -923,7 +1466,6 @@ class WaveFetcherParam(param.Parameterized):
         # Update UI
         # if self.station_data:
         #     self.station_table.value = pd.DataFrame(self.station_data)
-        #     self.update_station_map()
             # pn.state.notifications.success(f"Found {len(self.station_data)} stations!")
             
         # except Exception as e:
@@ -933,36 +1475,352 @@ class WaveFetcherParam(param.Parameterized):
         self.progress.active = False
         execution_time = time.time() - beginning
         txt = f"search finished! {len(self.station_data)} stations"
-        if self.seis_check.value: txt += f" and {len(self.waveform_data)} waveforms"
+        if self.seis_check.value: txt += f" and {len(self.waveform_data) if self.waveform_data else 0} waveforms"
         txt += f" downloaded. Duration {execution_time:.6f} s."
+        if self.seis_check.value:
+            txt += f" {pruned} requests pruned by availability check, {failed} failed."
+            if unchecked:
+                txt += f" Availability check failed for {unchecked} service(s); their requests were not pruned."
+            if table_note:
+                txt += f" {table_note}"
         self.status.object = txt
     
+    def batch_search(self):
+        """Mengunduh stasiun + waveform untuk semua event terpilih dan mengemasnya dalam ZIP"""
+        beginning = time.time()
+        rows = [i for i in self.table.selection if 0 <= i < len(self.earthquake_data)]
+        events = self.earthquake_data.iloc[rows].to_dict(orient="records")
+        if not events:
+            self.status.object = "Please select at least one earthquake first!"
+            return io.BytesIO()
+
+        self.progress.active = True
+        output_dir = tempfile.mkdtemp(prefix="quakesee_batch_")
+
+        def progress(n, total):
+            self.status.object = f"batch: {n}/{total} events written"
+
+        try:
+            with self._queued("batch_harvest", BULK):
+                harvest_events(
+                    waveform_client(), events, output_dir,
+                    channel=self.channel.value,
+                    min_radius=self.min_radius.value,
+                    max_radius=self.max_radius.value,
+                    start_offset=self.start_offset.value,
+                    end_offset=self.end_offset.value,
+                    max_workers=self.batch_workers.value,
+                    merge=self.merge_check.value,
+                    progress=progress,
+                )
+            zip_buffer = zip_directory(output_dir, new_spool())
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            self.progress.active = False
+
+        execution_time = time.time() - beginning
+        self.status.object = f"batch finished! {len(events)} events. Duration {execution_time:.6f} s."
+        return zip_buffer
+
+    def _band_error(self, source):
+        """Pesan kesalahan jika pita bandpass tidak valid untuk data ini (None jika valid)"""
+        freqmin, freqmax = self.freqmin.value, self.freqmax.value
+        if freqmin is None or freqmax is None or freqmin <= 0 or freqmax <= 0:
+            return "Bandpass frequencies must be positive."
+        if freqmin >= freqmax:
+            return f"Freq Min ({freqmin:g} Hz) must be below Freq Max ({freqmax:g} Hz)."
+        rates = sampling_rates(source)
+        if rates and freqmin >= 0.5 * rates[0]:
+            # Freq Max di atas Nyquist tetap boleh (menjadi highpass seperti obspy)
+            return f"Freq Min ({freqmin:g} Hz) must be below the Nyquist frequency ({0.5 * rates[0]:g} Hz)."
+        return None
+
+    def process_waveforms(self, event):
+        """Menjalankan pipeline pemrosesan pada data mentah (hasil unduhan/unggahan)"""
+        if self.waveform_data is None:
+            self.status.object = "Please load or download waveforms first!"
+            return
+
+        # Selalu proses dari data mentah agar parameter dapat diubah ulang
+        source = self.raw_waveform_data if self.raw_waveform_data is not None else self.waveform_data
+
+        params = dict(
+            detrend=None if self.detrend_select.value == 'none' else self.detrend_select.value,
+            taper=self.taper_input.value or None,
+            remove_response=self.response_output.value if self.response_check.value else None,
+            water_level=self.water_level.value,
+            bandpass=(self.freqmin.value, self.freqmax.value) if self.bandpass_check.value else None,
+            corners=self.corners.value,
+            zerophase=self.zerophase_check.value,
+        )
+
+        if params["remove_response"] and self.inventory is None:
+            self.status.object = "Instrument response needs station metadata (.xml or Search!)."
+            return
+        if params["bandpass"] is not None:
+            error = self._band_error(source)
+            if error is not None:
+                self.status.object = error
+                return
+
+        beginning = time.time()
+        self.progress.active = True
+        self.raw_waveform_data = source
+
+        def progress(n, total):
+            self.status.object = f"processing stations . . . {n}/{total}"
+
+        uncorrected = []
+        try:
+            # scipy/obspy.signal hanya dimuat saat pemrosesan pertama kali dipakai
+            from quakesee_web.processing import process_stream
+            with span("processing") as s:
+                self.waveform_data = process_stream(source, self.inventory, params, progress=progress,
+                                                    uncorrected=uncorrected)
+                s.add(records=len(self.waveform_data) if self.waveform_data else 0)
+        except Exception as e:
+            self.status.object = f"processing failed: {e}"
+            return
+        finally:
+            self.progress.active = False
+
+        execution_time = time.time() - beginning
+        self.status.object = f"processing finished! {len(self.waveform_data) if self.waveform_data else 0} waveforms. Duration {execution_time:.6f} s."
+        if uncorrected:
+            # Trace tanpa respons di metadata dibuang agar satuan tidak tercampur
+            shown = ", ".join(sorted(uncorrected)[:10])
+            more = f" and {len(uncorrected) - 10} more" if len(uncorrected) > 10 else ""
+            self.status.object += (f" {len(uncorrected)} waveforms without instrument response were "
+                                   f"left out (not corrected): {shown}{more}.")
+
     def show_tm_plot(self, event):
         if len(self.earthquake_data) > 0:
-            df = pd.DataFrame(self.earthquake_data)
-            df['time'] = pd.to_datetime(df['time'])
-            fig = px.scatter(
-                df,
-                x='time',
-                y='magnitude',
-                labels={'magnitude': 'Magnitude', 'time': 'Time'}
-            )
-            self.tm_pane[0].object = fig
+            self.update_tm_plot()
             self.tm_pane.visible = True
 
+    def get_catalog_stats(self):
+        """Agregat analitik katalog, dihitung sekali per versi katalog"""
+        version, stats = self._catalog_stats
+        if version != self._catalog_version:
+            with span("catalog_stats") as s:
+                stats = catalog_stats(self.earthquake_data)
+                s.add(records=len(self.earthquake_data))
+            self._catalog_stats = (self._catalog_version, stats)
+        return stats
+
+    @profiled("update_tm_plot", sizes=_data_sizes)
+    def update_tm_plot(self):
+        """Laju event, distribusi frekuensi-magnitudo (G-R) dan densitas magnitudo-waktu"""
+        stats = self.get_catalog_stats()
+        if stats is None:
+            self.tm_pane[0].object = None
+            self.tm_pane[1].object = "No events with time and magnitude."
+            return
+
+        fig = make_subplots(
+            rows=2, cols=2,
+            specs=[[{"colspan": 2}, None], [{}, {}]],
+            subplot_titles=(f"Events per {stats['rate_label']}", "Frequency-Magnitude", "Magnitude vs Time"),
+            vertical_spacing=0.12,
+        )
+        fig.add_trace(go.Bar(x=stats['rate_edges'], y=stats['rate_counts'], name='Events',
+                             marker_color='steelblue'), row=1, col=1)
+
+        centers = stats['mag_centers']
+        fig.add_trace(go.Scatter(x=centers, y=stats['mag_cumulative'], mode='markers', name='N(>=M)',
+                                 marker=dict(symbol='square', color='black', size=6)), row=2, col=1)
+        nonzero = stats['mag_counts'] > 0
+        fig.add_trace(go.Scatter(x=centers[nonzero], y=stats['mag_counts'][nonzero], mode='markers',
+                                 name='N(M)', marker=dict(symbol='triangle-up', color='gray', size=6)), row=2, col=1)
+        if stats['b'] is not None:
+            # Garis G-R log10 N = a - bM di atas Mc
+            fit = centers[centers >= stats['mc'] - stats['dm'] / 2]
+            fig.add_trace(go.Scatter(x=fit, y=10 ** (stats['a'] - stats['b'] * fit), mode='lines',
+                                     name=f"b = {stats['b']:.2f}", line=dict(color='red')), row=2, col=1)
+        fig.add_vline(x=stats['mc'], line_dash='dash', line_color='red', row=2, col=1)
+        fig.update_yaxes(type='log', title_text='Count', row=2, col=1)
+        fig.update_xaxes(title_text='Magnitude', row=2, col=1)
+
+        # Skala log agar cluster kecil tetap terlihat di samping puncak padat
+        density = stats['density'].astype(np.float64)
+        density[density == 0] = np.nan
+        fig.add_trace(go.Heatmap(x=stats['density_edges'], y=stats['density_mags'], z=np.log10(density),
+                                 colorscale='Viridis', showscale=False, name='log10 N',
+                                 hovertemplate='%{x}<br>M %{y}<br>log10 N %{z:.2f}<extra></extra>'),
+                      row=2, col=2)
+        fig.update_yaxes(title_text='Magnitude', row=2, col=2)
+        fig.update_layout(showlegend=True, margin=dict(l=40, r=20, t=40, b=40))
+        self.tm_pane[0].object = fig
+
+        if stats['b'] is not None:
+            b_text = (f"b = {stats['b']:.2f} ± {stats['b_err']:.2f}, a = {stats['a']:.2f} "
+                      f"({stats['n_above_mc']} events ≥ Mc)")
+        else:
+            b_text = f"b-value not estimated ({stats['n_above_mc']} events ≥ Mc)"
+        self.tm_pane[1].object = (f"{stats['events']} events from {str(stats['start'])[:19]} to {str(stats['end'])[:19]}. "
+                                  f"Mc = {stats['mc']:.1f} (maximum curvature), {b_text}.")
+
+    def show_record_section(self, event):
+        self._section_view = dict(time_range=None, distance_range=None)
+        self._section_revision += 1
+        self.update_record_section()
+        self.section_pane.visible = True
+
+    def _section_distances(self):
+        """(network, station) -> (derajat, km) dari event terpilih ke stasiun inventory"""
+        keys, lats, lons = station_arrays(self.inventory)
+        if not keys:
+            return {}
+        dist, _, _ = spherical(self.selected_quake['latitude'], self.selected_quake['longitude'], lats, lons)
+        return {key: (float(d), float(d) * KM_PER_DEGREE) for key, d in zip(keys, dist)}
+
+    def _section_zoom(self, event):
+        """Zoom/pan pada plot: jendela baru diringkas ulang (di-debounce)"""
+        data = event.new or {}
+        view = dict(self._section_view)
+        if data.get('xaxis.autorange') or data.get('yaxis.autorange'):
+            view = dict(time_range=None, distance_range=None)
+            self._section_revision += 1
+        if 'xaxis.range[0]' in data and 'xaxis.range[1]' in data:
+            view['time_range'] = (float(data['xaxis.range[0]']), float(data['xaxis.range[1]']))
+        if 'yaxis.range[0]' in data and 'yaxis.range[1]' in data:
+            view['distance_range'] = (float(data['yaxis.range[0]']), float(data['yaxis.range[1]']))
+        if view != self._section_view:
+            self._section_view = view
+            self.views.mark(self.update_record_section, delay=SECTION_DEBOUNCE)
+
+    @profiled("update_record_section", sizes=_data_sizes)
+    def update_record_section(self):
+        """Trace terurut jarak dari waveform aktif, diringkas ke resolusi layar"""
+        info = self.section_pane[1]
+        if self.waveform_data is None or not self.waveform_data:
+            info.object = "No waveforms. Download or upload seismograms first."
+            return
+        if not self.selected_quake or self.inventory is None:
+            info.object = "Select an earthquake and search its stations first (distances need both)."
+            return
+
+        beginning = time.time()
+        reduction = self.section_reduction.value or None
+        with span("plot_build"):
+            section = record_section(
+                self.waveform_data, self.selected_quake['time'], self._section_distances(),
+                channel=f"??{self.section_component.value}", reduction=reduction,
+                time_range=self._section_view['time_range'],
+                distance_range=self._section_view['distance_range'],
+                gain=self.section_gain.value,
+            )
+        if section is None:
+            info.object = f"No {self.section_component.value} traces with station coordinates in this window."
+            return
+
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(x=section['x'], y=section['y'], mode='lines', name='traces',
+                                   line=dict(width=0.7, color='black'), hoverinfo='skip'))
+        # Penanda di tepi kiri: id trace dan jarak saat hover
+        t0, t1 = section['time_range']
+        fig.add_trace(go.Scatter(
+            x=[t0] * len(section['labels']), y=[d for _, d, _ in section['labels']], mode='markers',
+            marker=dict(size=5, color='red'), name='stations',
+            text=[f"{seed_id} ({km:.0f} km)" for seed_id, _, km in section['labels']],
+            hovertemplate='%{text}<br>%{y:.2f}°<extra></extra>'))
+        d0, d1 = section['distance_range']
+        xlabel = f"Time - distance / {reduction:g} km/s (s)" if reduction else "Time after origin (s)"
+        fig.update_layout(
+            xaxis=dict(title=xlabel, range=[t0, t1]),
+            yaxis=dict(title='Distance (degrees)', range=[d0 - section['scale'], d1 + section['scale']]),
+            showlegend=False, uirevision=f'section-{self._section_revision}', margin=dict(l=60, r=20, t=30, b=50),
+        )
+        self.section_pane[0].object = fig
+
+        execution_time = time.time() - beginning
+        info.object = (f"{section['stations']} stations, {len(section['labels'])} traces ({self.section_component.value}), "
+                       f"{d0:.2f}-{d1:.2f} degrees, {t0:.1f}-{t1:.1f} s. Duration {execution_time:.6f} s.")
+
+    @timed("plot_build")
+    def plot_spectra(self, st, station):
+        """
+        Spektrogram (kiri) dan PSD (kanan) untuk semua kanal satu stasiun,
+        baris sejajar dengan subplot seismogram. Spektrum dihitung sekali per
+        trace dan parameter (SpectraCache), gambar sudah diringkas ke resolusi layar.
+        """
+        filtered_st = st.select(station=station)
+        if not filtered_st:
+            return go.Figure()
+        self.spectra.bind(self.waveform_data)
+        results = self.spectra.station(filtered_st, self.spectra_window.value, SPECTRAL_OVERLAP)
+
+        fig = make_subplots(rows=len(filtered_st), cols=2, column_widths=[0.65, 0.35],
+                            horizontal_spacing=0.08, vertical_spacing=0.05)
+        for i, (tr, result) in enumerate(results, start=1):
+            if result is None:
+                continue  # trace lebih pendek dari satu jendela
+            times = np.datetime64(tr.stats.starttime.datetime, 'us') + (result['times'] * 1e6).astype('timedelta64[us]')
+            fig.add_trace(go.Heatmap(x=times, y=result['spec_freqs'], z=result['spec_db'], colorscale='Viridis',
+                                     showscale=False, name=tr.id,
+                                     hovertemplate='%{x}<br>%{y:.2f} Hz<br>%{z:.1f} dB<extra></extra>'),
+                          row=i, col=1)
+            fig.add_trace(go.Scatter(x=result['freqs'], y=result['psd_db'], mode='lines', name=tr.id),
+                          row=i, col=2)
+            fig.update_yaxes(type='log', title_text='Hz', row=i, col=1)
+            fig.update_xaxes(tickformat="%H:%M:%S", row=i, col=1)
+            fig.update_xaxes(type='log', row=i, col=2)
+            fig.update_yaxes(title_text='dB', row=i, col=2)
+        fig.update_layout(title=f"Spectra untuk Stasiun {station}", height=300 * len(filtered_st),
+                          showlegend=False)
+        return fig
+
+    def show_event_psd(self, event):
+        """PSD semua trace event (paralel per stasiun) diringkas per komponen"""
+        if self.waveform_data is None or not self.waveform_data:
+            self.status.object = "No waveforms. Download or upload seismograms first."
+            return
+        beginning = time.time()
+        window = self.spectra_window.value
+        cached = self._event_psd
+        if cached is not None and cached[0] is self.waveform_data and cached[1] == window:
+            results = cached[2]
+        else:
+            def progress(done, total):
+                self.status.object = f"computing PSD . . . {done}/{total} stations"
+
+            with self._queued("event_psd", BULK):
+                self.status.object = "computing PSD . . ."
+                results = stream_psd(self.waveform_data, window, SPECTRAL_OVERLAP, progress=progress)
+            self._event_psd = (self.waveform_data, window, results)
+
+        summary = psd_summary(results)
+        fig = go.Figure()
+        colors = px.colors.qualitative.Plotly
+        for i, (component, (freqs, p10, median, p90, count)) in enumerate(summary.items()):
+            color = colors[i % len(colors)]
+            fig.add_trace(go.Scatter(x=freqs, y=median, mode='lines', line=dict(color=color),
+                                     name=f"{component} median ({count})"))
+            fig.add_trace(go.Scatter(x=np.r_[freqs, freqs[::-1]], y=np.r_[p90, p10[::-1]], fill='toself',
+                                     opacity=0.2, line=dict(width=0, color=color), hoverinfo='skip',
+                                     name=f"{component} 10-90%"))
+        fig.update_xaxes(type='log', title_text='Frequency (Hz)')
+        fig.update_yaxes(title_text='Power (dB)')
+        fig.update_layout(title='PSD per component')
+        self.psd_pane[0].object = fig
+        self.psd_pane.visible = True
+
+        execution_time = time.time() - beginning
+        self.status.object = f"PSD of {len(results)} traces. Duration {execution_time:.6f} s."
+
+    @profiled("show_seismogram", sizes=_data_sizes)
     def show_seismogram(self, event):
         if self.waveform_data is not None:
             st = self.waveform_data
 
-            # 2. Dapatkan daftar stasiun unik
-            stations = sorted(set(tr.stats.station for tr in st))
+            # 2. Dapatkan daftar stasiun unik (dari indeks jika LazyStream)
+            stations = station_codes(st)
             self.station_index = 0  # Mulai dari stasiun pertama
 
-            # 3. **Optimasi: Simpan hasil filtering di dictionary**
-            station_dict = {station: [tr for tr in st if tr.stats.station == station] for station in stations}
-
+            @timed("plot_build")
             def plot_seismogram(station):
-                filtered_st = station_dict.get(station, [])  # Ambil dari dictionary
+                # 3. Decode hanya stasiun yang ditampilkan
+                filtered_st = st.select(station=station)
                 
                 if not filtered_st:
                     return go.Figure(layout={"title": f"Tidak ada data untuk stasiun {station}"})
@@ -970,7 +1828,8 @@ class WaveFetcherParam(param.Parameterized):
                 fig = make_subplots(rows=len(filtered_st), cols=1, shared_xaxes=True, vertical_spacing=0.05)
 
                 for i, tr in enumerate(filtered_st):
-                    time = mdates.num2date(tr.times("matplotlib"))  # Konversi waktu ke datetime
+                    # Waktu sebagai datetime64 (vektor, tanpa objek datetime per sampel)
+                    time = np.datetime64(tr.stats.starttime.datetime, 'us') + (tr.times() * 1e6).astype('timedelta64[us]')
                     data = tr.data  # Amplitudo
                     
                     fig.add_trace(
@@ -991,20 +1850,31 @@ class WaveFetcherParam(param.Parameterized):
 
                 return fig
             
-            self.seis_pane[0].object = plot_seismogram(stations[self.station_index])
+            def show_station(station):
+                self.seis_plot.object = plot_seismogram(station)
+                self.spectra_plot.visible = self.spectra_check.value
+                if self.spectra_check.value:
+                    # Stasiun yang sama baru saja di-decode (cache LazyStream)
+                    self.spectra_plot.object = self.plot_spectra(st, station)
+
+            show_station(stations[self.station_index])
             
             # 5. Fungsi untuk tombol navigasi
             def previous_station(event):
                 self.station_index = (self.station_index - 1) % len(stations)
-                self.seis_pane[0].object = plot_seismogram(stations[self.station_index])
+                show_station(stations[self.station_index])
 
             def next_station(event):
                 self.station_index = (self.station_index + 1) % len(stations)
-                self.seis_pane[0].object = plot_seismogram(stations[self.station_index])
-
-            # 6. Tombol navigasi
-            self.seis_prev_button.on_click(previous_station)
-            self.seis_next_button.on_click(next_station)
+                show_station(stations[self.station_index])
+
+            # 6. Tombol navigasi (handler plot sebelumnya dilepas)
+            for button, watcher in self._seis_watchers:
+                button.param.unwatch(watcher)
+            self._seis_watchers = [
+                (self.seis_prev_button, self.seis_prev_button.on_click(previous_station)),
+                (self.seis_next_button, self.seis_next_button.on_click(next_station)),
+            ]
 
             self.seis_pane.visible = True
 
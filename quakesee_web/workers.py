@@ -0,0 +1,77 @@
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Pool proses bersama untuk pekerjaan berat (encode, merge, proses sinyal)
+_process_pool = None
+# Jumlah worker yang diatur dari opsi server (None = otomatis)
+_max_workers = None
+
+
+def default_workers():
+    if _max_workers is not None:
+        return _max_workers
+    if os.environ.get("QUAKESEE_WORKERS"):
+        return max(1, int(os.environ["QUAKESEE_WORKERS"]))
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def set_max_workers(n):
+    """Mengatur ukuran pool proses (berlaku untuk pool yang dibuat setelahnya)"""
+    global _max_workers
+    _max_workers = None if n is None else max(1, int(n))
+    shutdown_pools()
+
+
+def get_process_pool():
+    """Membuat pool proses sekali dan memakainya ulang di semua sesi"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=default_workers())
+    return _process_pool
+
+
+def shutdown_pools():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def imap_unordered(func, arg_list, parallel=True, min_items=2, window=None):
+    """
+    Menjalankan func(*args) untuk setiap tuple args dan menghasilkan (args, hasil)
+    segera setelah selesai. Pekerjaan sedikit dikerjakan langsung tanpa pool.
+
+    arg_list dibaca malas: paling banyak window pekerjaan (bawaan 2 x worker)
+    berada di pool sekaligus, sehingga payload dan hasil tidak menumpuk di
+    memori untuk event besar.
+    """
+    args_iter = iter(arg_list)
+    head = list(itertools.islice(args_iter, min_items))
+    args_iter = itertools.chain(head, args_iter)
+    if not parallel or len(head) < min_items or default_workers() < 2:
+        for args in args_iter:
+            yield args, func(*args)
+        return
+
+    pool = get_process_pool()
+    window = max(1, window or 2 * default_workers())
+    pending = {}
+
+    def fill():
+        for args in itertools.islice(args_iter, window - len(pending)):
+            pending[pool.submit(func, *args)] = args
+
+    fill()
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            results = [(pending.pop(future), future) for future in done]
+            # Pool diisi lagi sebelum hasil diproses pemanggil
+            fill()
+            for args, future in results:
+                yield args, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+from obspy import UTCDateTime
+from tornado.web import HTTPError
+
+from quakesee_web.api import TableEncoder, _parse_bulk
+
+
+@pytest.fixture
+def frames():
+    df = pd.DataFrame(dict(time=["2024-01-01T00:00:00", "2024-01-02T00:00:00", "2024-01-03T00:00:00"],
+                           magnitude=[5.0, 5.5, 6.1]))
+    return df.iloc[:2], df.iloc[2:]
+
+
+def test_csv_header_only_once(frames):
+    encoder = TableEncoder("csv")
+    body = b"".join(encoder.encode(df) for df in frames) + encoder.close()
+    assert pd.read_csv(io.BytesIO(body))["magnitude"].tolist() == [5.0, 5.5, 6.1]
+    assert body.count(b"time,magnitude") == 1
+
+
+def test_empty_csv_keeps_header():
+    encoder = TableEncoder("csv", columns=["network", "station"])
+    assert encoder.encode(pd.DataFrame()) == b""
+    assert encoder.close() == b"network,station\n"
+
+
+def test_json_is_one_record_per_line(frames):
+    encoder = TableEncoder("json")
+    body = b"".join(encoder.encode(df) for df in frames) + encoder.close()
+    records = [json.loads(line) for line in body.splitlines() if line]
+    assert [r["magnitude"] for r in records] == [5.0, 5.5, 6.1]
+
+
+def test_parse_bulk_groups_channels():
+    body = ("# komentar\n"
+            "merge=true\n"
+            "IU ANMO 00 BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00\n"
+            "IU ANMO 00 BHN 2024-01-01T00:00:00 2024-01-01T00:10:00\n"
+            "GE APE -- HHZ 2024-01-01T00:00:00 2024-01-01T00:05:00\n")
+    plan, options = _parse_bulk(body)
+    t0 = UTCDateTime(2024, 1, 1)
+    assert options == {"merge": "true"}
+    assert plan == [("IU", "ANMO", "00", "BHZ,BHN", t0, t0 + 600), ("GE", "APE", "", "HHZ", t0, t0 + 300)]
+
+
+@pytest.mark.parametrize("line", ["IU ANMO 00 BHZ 2024-01-01T00:00:00",
+                                  "IU ANMO 00 BHZ yesterday 2024-01-01T00:10:00"])
+def test_parse_bulk_rejects_bad_lines(line):
+    with pytest.raises(HTTPError) as error:
+        _parse_bulk(line)
+    assert error.value.status_code == 400
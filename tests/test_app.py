@@ -0,0 +1,25 @@
+from quakesee_web.app import START_PAGE, MainApp
+
+
+class _Click:
+    def __init__(self, name):
+        self.obj = type("Button", (), {"name": name})()
+
+
+def test_opens_on_about_and_builds_pages_lazily():
+    app = MainApp()
+    assert START_PAGE == "About"
+    assert list(app.frames) == ["About"]
+    # Nama halaman tak dikenal kembali ke About tanpa membangun halaman lain
+    assert app.get_frame("HVSR") is app.frames["About"]
+    assert list(app.frames) == ["About"]
+
+
+def test_navigation_builds_page_once():
+    app = MainApp()
+    app.navigate_handler(_Click("Catalog Bulk Fetcher"))
+    frame = app.frames["Catalog Bulk Fetcher"]
+    app.navigate_handler(_Click("About"))
+    app.navigate_handler(_Click("Catalog Bulk Fetcher"))
+    assert app.frames["Catalog Bulk Fetcher"] is frame
+    assert "Fetcher & Loader" not in app.frames
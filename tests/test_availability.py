@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from obspy import Stream, Trace, UTCDateTime
+
+from quakesee_web import availability
+from quakesee_web.availability import (bulk_lines, check_availability, extents_from_stream,
+                                       parse_availability, prune_requests, split_routes)
+
+T0 = UTCDateTime(2024, 1, 1)
+
+
+def _request(net, sta, start=0, end=600):
+    return (net, sta, "*", "BHZ,HHZ", T0 + start, T0 + end)
+
+
+def _span(start, end):
+    return ((T0 + start).timestamp, (T0 + end).timestamp)
+
+
+def test_bulk_lines_one_line_per_channel():
+    assert bulk_lines([_request("XX", "A")]) == [
+        "XX A * BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00",
+        "XX A * HHZ 2024-01-01T00:00:00 2024-01-01T00:10:00",
+    ]
+
+
+def test_split_routes_keeps_dataselect_data_centers():
+    text = ("DATACENTER=GEOFON,http://geofon.gfz-potsdam.de\n"
+            "DATASELECTSERVICE=http://geofon.gfz-potsdam.de/fdsnws/dataselect/1/\n"
+            "STATIONSERVICE=http://geofon.gfz-potsdam.de/fdsnws/station/1/\n"
+            "GE APE -- BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00\n"
+            "\n"
+            "DATACENTER=NODATA,http://example.org\n"
+            "STATIONSERVICE=http://example.org/fdsnws/station/1/\n"
+            "ZZ X -- BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00\n"
+            "\n"
+            "DATACENTER=IRISDMC,http://ds.iris.edu\n"
+            "DATASELECTSERVICE=http://service.iris.edu/fdsnws/dataselect/1/\n"
+            "IU ANMO 00 BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00\n"
+            "IU COLA 00 BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00\n")
+    assert split_routes(text) == {
+        "http://geofon.gfz-potsdam.de": ["GE APE -- BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00"],
+        "http://service.iris.edu": ["IU ANMO 00 BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00",
+                                    "IU COLA 00 BHZ 2024-01-01T00:00:00 2024-01-01T00:10:00"],
+    }
+
+
+def test_parse_availability_skips_header_and_bad_lines():
+    text = ("#Network Station Location Channel Quality SampleRate Earliest Latest\n"
+            "XX A 00 HHZ M 100.0 2024-01-01T00:00:00 2024-01-01T00:05:00\n"
+            "XX A 00 HHZ M 100.0 2024-01-01T00:07:00 2024-01-01T00:09:00\n"
+            "XX B -- BHZ M 40.0 not-a-time 2024-01-01T00:09:00\n"
+            "\n")
+    assert parse_availability(text) == {("XX", "A"): [_span(0, 300), _span(420, 540)]}
+
+
+def test_prune_only_covered_networks():
+    extents = {("XX", "A"): [_span(300, 900)]}
+    requests_list = [_request("XX", "A"), _request("XX", "B"), _request("YY", "C")]
+    kept, pruned = prune_requests(requests_list, extents)
+    # YY tidak dicakup layanan availability: tetap diminta
+    assert [r[1] for r in kept] == ["A", "C"]
+    assert pruned == 1
+
+    kept, pruned = prune_requests([_request("XX", "A", 1000, 1600)], extents)
+    assert kept == [] and pruned == 1
+
+
+def test_extents_from_stream():
+    st = Stream([Trace(np.zeros(100), header=dict(network="XX", station="A", channel="HHZ",
+                                                   sampling_rate=1.0, starttime=T0))])
+    assert extents_from_stream(st) == {("XX", "A"): [_span(0, 99)]}
+    assert extents_from_stream(None) == {}
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    answers = {
+        "http://dc1/fdsnws/availability/1/query": {("XX", "A"): [_span(0, 600)]},
+        "http://dc2/fdsnws/availability/1/query": RuntimeError("timeout"),
+        # Pusat data menjawab "tidak ada data" (204/404)
+        "http://dc3/fdsnws/availability/1/query": {},
+    }
+    networks = {"dc1": "XX", "dc2": "YY", "dc3": "ZZ"}
+
+    def fake_routes(lines, timeout=60):
+        routes = {}
+        for url in answers:
+            routed = [line for line in lines if line.startswith(networks[url.split("/")[2]])]
+            if routed:
+                routes[url] = routed
+        return routes
+
+    def fake_query(requests_list, url=None, timeout=60, lines=None):
+        answer = answers[url]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(availability, "availability_routes", fake_routes)
+    monkeypatch.setattr(availability, "query_availability", fake_query)
+
+
+def test_check_availability_keeps_failed_data_center(routes):
+    requests_list = [_request("XX", "A"), _request("XX", "B"), _request("YY", "C")]
+    kept, pruned, failed = check_availability(requests_list)
+    assert [r[1] for r in kept] == ["A", "C"]
+    assert pruned == 1
+    assert failed == 1
+
+
+def test_check_availability_prunes_network_without_data(routes):
+    requests_list = [_request("XX", "A"), _request("ZZ", "D"), _request("ZZ", "E")]
+    kept, pruned, failed = check_availability(requests_list)
+    assert [r[1] for r in kept] == ["A"]
+    assert pruned == 2
+    assert failed == 0
+
+
+def test_check_availability_counts_cached_waveforms(routes):
+    cached = Stream([Trace(np.zeros(60), header=dict(network="XX", station="B", channel="HHZ",
+                                                      sampling_rate=1.0, starttime=T0))])
+    kept, pruned, _ = check_availability([_request("XX", "A"), _request("XX", "B")], cached)
+    assert [r[1] for r in kept] == ["A", "B"]
+    assert pruned == 0
+
+
+def test_check_availability_without_routing(monkeypatch):
+    def fail(lines, timeout=60):
+        raise RuntimeError("routing down")
+
+    monkeypatch.setattr(availability, "availability_routes", fail)
+    requests_list = [_request("XX", "A")]
+    assert check_availability(requests_list) == (requests_list, 0, 1)
@@ -0,0 +1,70 @@
+import pytest
+from obspy import UTCDateTime
+from obspy.geodetics import locations2degrees
+
+from quakesee_web.batch_harvest import MAX_GROUP_SPAN, plan_station_queries
+
+T0 = UTCDateTime(2024, 1, 1)
+
+
+def _event(lat, lon, offset=0.0):
+    return dict(time=str(T0 + offset), latitude=lat, longitude=lon, magnitude=5.0)
+
+
+def _plan(events, min_radius=0.0, max_radius=5.0, **kwargs):
+    return plan_station_queries(events, min_radius, max_radius, -300, 3600, **kwargs)
+
+
+def _check_covers(events, queries, max_radius):
+    """Tiap event dilayani tepat satu query yang cincinnya mencakup lingkaran pencariannya"""
+    served = sorted(i for q in queries for i in q['events'])
+    assert served == list(range(len(events)))
+    for q in queries:
+        for i in q['events']:
+            ev = events[i]
+            offset = locations2degrees(q['latitude'], q['longitude'], ev['latitude'], ev['longitude'])
+            assert offset + max_radius <= q['maxradius'] + 1e-3
+            t = UTCDateTime(ev['time'])
+            assert q['starttime'] <= t - 300 and t + 3600 <= q['endtime']
+
+
+def test_nearby_events_share_one_query():
+    events = [_event(-7.0, 110.0), _event(-7.5, 110.5, 3600)]
+    (query,) = _plan(events)
+    assert query['events'] == [0, 1]
+    assert query['minradius'] == 0.0
+    assert query['maxradius'] <= 10.0
+    _check_covers(events, [query], 5.0)
+
+
+def test_single_event_keeps_min_radius():
+    (query,) = _plan([_event(-7.0, 110.0)], min_radius=1.0)
+    assert query['minradius'] == 1.0
+    assert query['maxradius'] == pytest.approx(5.0)
+    assert query['endtime'] - query['starttime'] == pytest.approx(3900)
+
+
+def test_chain_of_events_does_not_grow_reach():
+    # Event tiap 3 derajat sepanjang ekuator: tiap pasangan tetangga tumpang tindih
+    events = [_event(0.0, 3.0 * k, 60.0 * k) for k in range(30)]
+    queries = _plan(events)
+    assert len(queries) > 1
+    assert max(q['maxradius'] for q in queries) <= 10.0 + 1e-6
+    _check_covers(events, queries, 5.0)
+
+
+def test_time_window_is_capped():
+    # Lokasi sama, satu event per 10 hari selama setahun
+    events = [_event(-7.0, 110.0, 10 * 86400.0 * k) for k in range(37)]
+    queries = _plan(events)
+    assert len(queries) > 1
+    for q in queries:
+        assert q['endtime'] - q['starttime'] <= MAX_GROUP_SPAN + 3900
+    _check_covers(events, queries, 5.0)
+
+
+def test_far_events_get_separate_queries():
+    events = [_event(-7.0, 110.0), _event(35.0, 139.0), _event(-7.2, 110.1, 600)]
+    queries = _plan(events)
+    assert sorted(q['events'] for q in queries) == [[0, 2], [1]]
+    _check_covers(events, queries, 5.0)
@@ -0,0 +1,82 @@
+import pytest
+
+from quakesee_web import coalesce
+from quakesee_web.coalesce import Coalescer
+
+
+class FakeDocument:
+    """Mencatat callback IOLoop; dijalankan manual oleh tes"""
+
+    def __init__(self):
+        self.callbacks = []
+        self.timeouts = []
+
+    def add_next_tick_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def add_timeout_callback(self, callback, timeout):
+        self.timeouts.append((timeout, callback))
+
+    def run(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+@pytest.fixture
+def doc(monkeypatch):
+    doc = FakeDocument()
+    monkeypatch.setattr(coalesce, "current_document", lambda: doc)
+    return doc
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(coalesce.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _view(log):
+    def view():
+        log.append("render")
+    return view
+
+
+def test_renders_immediately_without_document(monkeypatch):
+    monkeypatch.setattr(coalesce, "current_document", lambda: None)
+    log = []
+    coalescer = Coalescer()
+    coalescer.mark(_view(log))
+    assert log == ["render"]
+
+
+def test_marks_in_one_tick_render_once(doc, clock):
+    log = []
+    view = _view(log)
+    coalescer = Coalescer()
+    for _ in range(5):
+        coalescer.mark(view)
+    assert log == []
+    # Satu jadwal flush untuk semua tanda
+    assert len(doc.callbacks) == 1
+    doc.run()
+    assert log == ["render"]
+    assert coalescer.renders == {"view": 1}
+
+
+def test_debounce_is_capped_by_max_wait(doc, clock):
+    log = []
+    view = _view(log)
+    coalescer = Coalescer()
+    coalescer.mark(view, delay=0.25, max_wait=1.0)
+    doc.run()
+    (timeout, flush), = doc.timeouts
+    assert timeout == 250
+
+    # Tanda baru terus menggeser jadwal, tetapi tidak melewati max_wait
+    for _ in range(8):
+        clock[0] += 0.2
+        coalescer.mark(view, delay=0.25, max_wait=1.0)
+    clock[0] = 1000.0 + 1.0
+    flush()
+    assert log == ["render"]
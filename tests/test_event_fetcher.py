@@ -0,0 +1,112 @@
+import threading
+
+from obspy import UTCDateTime
+from obspy.clients.fdsn.header import FDSNNoDataException
+from obspy.core.event import Catalog, Event, Magnitude, Origin
+
+from quakesee_web import event_fetcher
+from quakesee_web.event_fetcher import (EVENT_COLUMNS, fetch_events_paged, fetch_page_text,
+                                        parse_event_text, time_pages)
+
+T0 = UTCDateTime(2024, 1, 1)
+DAY = 86400
+
+TEXT = """#EventID|Time|Latitude|Longitude|Depth/km|Author|Catalog|Contributor|ContributorID|MagType|Magnitude|MagAuthor|EventLocationName
+11952283|2024-01-02T03:04:05.5|-7.1|110.2|12.0|us|NEIC PDE|us|us7000|mb|5.1|us|JAVA, INDONESIA
+11952290|2024-01-03T00:00:00|-8.0|111.0|35.5|us|NEIC PDE|us|us7001|Mww|6.0|us|JAVA, INDONESIA
+"""
+
+
+def _event(time):
+    return Event(origins=[Origin(time=time, latitude=-7.0, longitude=110.0, depth=10000.0)],
+                 magnitudes=[Magnitude(mag=5.0, magnitude_type="Mw")])
+
+
+class FakeClient:
+    """get_events dengan semantik FDSN: starttime dan endtime inklusif"""
+
+    def __init__(self, times):
+        self.times = times
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_events(self, starttime, endtime, minmagnitude=None, limit=None, **kwargs):
+        with self.lock:
+            self.calls.append((starttime, endtime, limit))
+        events = [_event(t) for t in self.times if starttime <= t <= endtime][:limit]
+        if not events:
+            raise FDSNNoDataException("No data available for request.")
+        return Catalog(events)
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+def test_time_pages_cover_range():
+    pages = time_pages(T0, T0 + 70 * DAY, 30)
+    assert pages == [(T0, T0 + 30 * DAY), (T0 + 30 * DAY, T0 + 60 * DAY), (T0 + 60 * DAY, T0 + 70 * DAY)]
+    assert time_pages(T0, T0, 30) == []
+
+
+def test_parse_event_text():
+    df = parse_event_text(TEXT)
+    assert list(df.columns) == EVENT_COLUMNS + ["event_id"]
+    assert list(df["time"]) == ["2024-01-02T03:04:05.500000Z", "2024-01-03T00:00:00.000000Z"]
+    assert list(df["depth"]) == [12.0, 35.5]
+    assert list(df["magnitude_type"]) == ["mb", "Mww"]
+    assert list(df["event_id"]) == ["11952283", "11952290"]
+
+    empty = parse_event_text("")
+    assert list(empty.columns) == EVENT_COLUMNS and len(empty) == 0
+
+
+def test_fetch_page_text(monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append((url, params))
+        return FakeResponse(200, TEXT) if params["minmagnitude"] < 6 else FakeResponse(204)
+
+    monkeypatch.setattr(event_fetcher.requests, "get", fake_get)
+    df = fetch_page_text("http://fdsn.test/", T0, T0 + DAY, 5.0, limit=10)
+    assert len(df) == 2
+    url, params = calls[0]
+    assert url == "http://fdsn.test/fdsnws/event/1/query"
+    assert params["format"] == "text" and params["limit"] == 10
+
+    assert len(fetch_page_text("http://fdsn.test", T0, T0 + DAY, 7.0)) == 0
+
+
+def test_event_on_page_boundary_counted_once():
+    times = [T0 + DAY, T0 + 30 * DAY, T0 + 45 * DAY, T0 + 60 * DAY]
+    client = FakeClient(times)
+    pages = []
+    df = fetch_events_paged(client, T0, T0 + 60 * DAY, 4.0, page_days=30,
+                            on_page=lambda page, done, total: pages.append((len(page), done, total)))
+    assert list(df["time"]) == [str(t) for t in times]
+    assert df["depth"].iloc[0] == 10.0
+    # Halaman selesai dalam urutan apa pun; event di batas hanya ada di halaman kedua
+    assert sorted(n for n, _, _ in pages) == [1, 3]
+    assert sorted(done for _, done, _ in pages) == [1, 2]
+    assert {total for _, _, total in pages} == {2}
+
+
+def test_limit_uses_single_request():
+    client = FakeClient([T0 + k * DAY for k in range(10)])
+    df = fetch_events_paged(client, T0, T0 + 90 * DAY, 4.0, limit=3, page_days=30)
+    assert len(df) == 3
+    assert client.calls == [(T0, T0 + 90 * DAY, 3)]
+
+
+def test_empty_pages():
+    df = fetch_events_paged(FakeClient([]), T0, T0 + 60 * DAY, 4.0)
+    assert len(df) == 0
+    assert set(EVENT_COLUMNS) <= set(df.columns)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from obspy.core.inventory import Inventory, Network, Station
+from obspy.geodetics import gps2dist_azimuth, locations2degrees
+
+from quakesee_web import geometry
+from quakesee_web.geometry import covers, event_station_geometry, pairs_within, spherical, stations_within
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(1)
+    return rng.uniform(-60, 60, 200), rng.uniform(-180, 180, 200)
+
+
+def test_spherical_matches_obspy(points):
+    lats, lons = points
+    dist, az, baz = spherical(lats[0], lons[0], lats[1:], lons[1:])
+    np.testing.assert_allclose(dist, locations2degrees(lats[0], lons[0], lats[1:], lons[1:]), atol=1e-8)
+    # Azimuth bola vs elipsoid hanya berbeda sedikit
+    for k in range(1, 20):
+        _, az_e, baz_e = gps2dist_azimuth(lats[0], lons[0], lats[k], lons[k])
+        assert abs((az[k - 1] - az_e + 180) % 360 - 180) < 0.5
+        assert abs((baz[k - 1] - baz_e + 180) % 360 - 180) < 0.5
+
+
+def test_event_station_geometry_shapes(points):
+    lats, lons = points
+    geo = event_station_geometry(lats[:3], lons[:3], lats[3:10], lons[3:10])
+    assert set(geo) == set(geometry.GEOMETRY_COLUMNS)
+    assert all(v.shape == (3, 7) for v in geo.values())
+    np.testing.assert_allclose(geo["distance_km"], geo["distance"] * geometry.KM_PER_DEGREE)
+
+
+def test_wgs84_matches_gps2dist(points):
+    lats, lons = points
+    geo = event_station_geometry(lats[:2], lons[:2], lats[2:6], lons[2:6], method="wgs84")
+    np.testing.assert_allclose(geo["distance"], geo["distance_km"] / geometry.KM_PER_DEGREE)
+    for e in range(2):
+        for s in range(4):
+            meters, az, baz = gps2dist_azimuth(lats[e], lons[e], lats[2 + s], lons[2 + s])
+            assert geo["distance_km"][e, s] == pytest.approx(meters / 1000.0, rel=1e-6)
+            assert geo["azimuth"][e, s] == pytest.approx(az, abs=1e-6)
+            assert geo["back_azimuth"][e, s] == pytest.approx(baz, abs=1e-6)
+
+
+def test_pairs_within_matches_brute_force(points, monkeypatch):
+    # Blok kecil agar beberapa blok dan batasnya ikut diuji
+    monkeypatch.setattr(geometry, "BLOCK_ROWS", 64)
+    lats, lons = points
+    i, j = pairs_within(lats, lons, 20.0, dtype=np.float64)
+    expected = {(a, b) for a in range(len(lats)) for b in range(a + 1, len(lats))
+                if locations2degrees(lats[a], lons[a], lats[b], lons[b]) <= 20.0}
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    assert len(i) == len(expected)
+
+
+def test_stations_within():
+    inventory = Inventory(networks=[Network("XX", stations=[
+        Station(code, latitude=0.0, longitude=lon, elevation=0.0)
+        for code, lon in (("A", 1.0), ("B", 5.0), ("C", 12.0))])], source="test")
+    assert stations_within(inventory, 0.0, 0.0, 2.0, 10.0) == [("XX", "B")]
+    assert stations_within(inventory, 0.0, 0.0, 0.0, 180.0) == [("XX", "A"), ("XX", "B"), ("XX", "C")]
+
+
+def test_covers():
+    cached = dict(latitude=0.0, longitude=0.0, minradius=0.0, maxradius=10.0, channel="BH?")
+    assert covers(cached, dict(cached, longitude=2.0, maxradius=5.0))
+    assert not covers(cached, dict(cached, longitude=6.0, maxradius=5.0))
+    assert not covers(cached, dict(cached, maxradius=5.0, channel="HH?"))
+    ring = dict(cached, minradius=4.0)
+    assert covers(ring, dict(ring, longitude=1.0, minradius=6.0, maxradius=8.0))
+    assert not covers(ring, dict(ring, longitude=1.0, minradius=4.0, maxradius=8.0))
@@ -0,0 +1,60 @@
+import pytest
+from obspy.core.inventory import Channel, Inventory, Network, Station
+
+from quakesee_web.inventory_index import InventoryIndex, prune_inventory
+
+
+def _station(code, channels=()):
+    return Station(code, latitude=-7.0, longitude=110.0, elevation=100.0,
+                   channels=[Channel(cha, "00", latitude=-7.0, longitude=110.0, elevation=100.0, depth=0.0)
+                             for cha in channels])
+
+
+@pytest.fixture
+def inventory():
+    # Kode stasiun ABC ada di dua network; CSV1 tanpa kanal (hasil konversi .csv)
+    return Inventory(networks=[
+        Network("XX", stations=[_station("ABC", ["HHZ", "HHN"]), _station("DEF", ["HHZ"])]),
+        Network("YY", stations=[_station("ABC", ["HHZ"])]),
+        Network("ZZ", stations=[_station("CSV1")]),
+    ], source="test")
+
+
+def _codes(inventory):
+    return {(net.code, sta.code, tuple(cha.code for cha in sta)) for net in inventory for sta in net}
+
+
+def test_same_station_code_in_two_networks(inventory):
+    pruned = prune_inventory(inventory, [("YY", "ABC", "00", "HHZ")])
+    assert _codes(pruned) == {("YY", "ABC", ("HHZ",))}
+
+    pruned = prune_inventory(inventory, [("XX", "ABC", "00", "HHN")])
+    assert _codes(pruned) == {("XX", "ABC", ("HHN",))}
+
+
+def test_keeps_only_channels_with_waveforms(inventory):
+    keys = [("XX", "ABC", "00", "HHZ"), ("XX", "DEF", "00", "HHZ"), ("XX", "DEF", "10", "HHZ")]
+    assert _codes(prune_inventory(inventory, keys)) == {("XX", "ABC", ("HHZ",)), ("XX", "DEF", ("HHZ",))}
+
+
+def test_station_without_channels(inventory):
+    # Stasiun tanpa kanal dipertahankan jika ada waveform untuk (network, station)
+    pruned = prune_inventory(inventory, [("ZZ", "CSV1", "", "BHZ")])
+    assert _codes(pruned) == {("ZZ", "CSV1", ())}
+
+    assert len(prune_inventory(inventory, [("ZZ", "OTHER", "", "BHZ")])) == 0
+
+
+def test_source_inventory_is_not_modified(inventory):
+    prune_inventory(inventory, [("XX", "ABC", "00", "HHZ")])
+    assert _codes(inventory) == {("XX", "ABC", ("HHZ", "HHN")), ("XX", "DEF", ("HHZ",)),
+                                 ("YY", "ABC", ("HHZ",)), ("ZZ", "CSV1", ())}
+
+
+def test_index_keys(inventory):
+    index = InventoryIndex(inventory)
+    assert ("YY", "ABC", "00", "HHZ") in index
+    assert ("ZZ", "CSV1", None, None) in index
+    assert index.station_keys() == {("XX", "ABC"), ("XX", "DEF"), ("YY", "ABC"), ("ZZ", "CSV1")}
+    assert index.get_channel(("XX", "ABC", "00", "HHN")).code == "HHN"
+    assert index.get_channel(("ZZ", "CSV1", None, None)) is None
@@ -0,0 +1,116 @@
+import asyncio
+
+from quakesee_web.background import in_thread_pool
+from quakesee_web.jobs import BULK, INTERACTIVE, PREFETCH, JobQueue
+
+
+def _granted(*jobs):
+    return [job.granted.is_set() for job in jobs]
+
+
+def test_bulk_never_takes_reserved_slot():
+    queue = JobQueue(slots=2, reserved=1)
+    bulk1 = queue.submit("harvest", owner="a", priority=BULK)
+    bulk2 = queue.submit("harvest", owner="b", priority=BULK)
+    assert _granted(bulk1, bulk2) == [True, False]
+
+    # Slot cadangan tetap untuk pekerjaan interaktif
+    interactive = queue.submit("search", owner="c", priority=INTERACTIVE)
+    assert interactive.granted.is_set()
+    assert queue.stats()["running"] == 2
+
+    queue.finish(bulk1)
+    assert bulk2.granted.is_set()
+
+
+def test_interactive_goes_before_waiting_bulk():
+    queue = JobQueue(slots=1, reserved=0)
+    running = queue.submit("search", owner="a")
+    bulk = queue.submit("harvest", owner="b", priority=BULK)
+    interactive = queue.submit("search", owner="c", priority=INTERACTIVE)
+    assert queue.position(interactive) == 1
+    assert queue.position(bulk) == 2
+
+    queue.finish(running)
+    assert _granted(interactive, bulk) == [True, False]
+
+
+def test_fair_share_between_owners():
+    queue = JobQueue(slots=2, reserved=0)
+    a1 = queue.submit("search", owner="a")
+    other = queue.submit("search", owner="x")
+    a2 = queue.submit("search", owner="a")
+    b1 = queue.submit("search", owner="b")
+    assert _granted(a1, other, a2, b1) == [True, True, False, False]
+
+    # "b" belum punya pekerjaan berjalan, jadi didahulukan meski datang belakangan
+    queue.finish(other)
+    assert _granted(a2, b1) == [False, True]
+
+
+def test_prefetch_has_its_own_budget():
+    queue = JobQueue(slots=1, reserved=0, prefetch_slots=1)
+    search = queue.submit("search", owner="a")
+    prefetch1 = queue.submit("prefetch", owner="b", priority=PREFETCH)
+    prefetch2 = queue.submit("prefetch", owner="c", priority=PREFETCH)
+    # Prefetch tidak memakai slot umum, tetapi dibatasi prefetch_slots
+    assert _granted(search, prefetch1, prefetch2) == [True, True, False]
+
+    # Prefetch yang berjalan tidak menahan pekerjaan nyata
+    queue.finish(search)
+    interactive = queue.submit("search", owner="d")
+    assert interactive.granted.is_set()
+
+    queue.finish(prefetch1)
+    assert prefetch2.granted.is_set()
+
+
+def test_on_grant_runs_when_slot_frees():
+    queue = JobQueue(slots=1, reserved=0)
+    running = queue.submit("search", owner="a")
+    calls = []
+    waiting = queue.submit("search", owner="b", on_grant=calls.append)
+    assert calls == []
+    queue.finish(running)
+    assert calls == [waiting]
+
+
+def test_withdraw_waiting_and_granted_job():
+    queue = JobQueue(slots=1, reserved=0, prefetch_slots=1)
+    granted = queue.submit("prefetch", owner="a", priority=PREFETCH)
+    waiting = queue.submit("prefetch", owner="b", priority=PREFETCH)
+
+    assert queue.withdraw(waiting)
+    assert queue.stats()["waiting"] == 0
+
+    # Pekerjaan yang sudah mendapat slot tidak bisa ditarik; slot dilepas lewat finish
+    assert not queue.withdraw(granted)
+    assert queue.stats()["running"] == 1
+    queue.finish(granted)
+    assert queue.stats()["running"] == 0
+
+    # Slot prefetch kembali tersedia
+    assert queue.submit("prefetch", owner="c", priority=PREFETCH).granted.is_set()
+
+
+def test_busy_queue_waits_off_the_event_loop():
+    queue = JobQueue(slots=1, reserved=0)
+    running = queue.submit("search", owner="a")
+    ran = []
+
+    def callback():
+        with queue.job("export", owner="b", poll=0.01):
+            ran.append(True)
+        return "done"
+
+    async def click():
+        # Slot dilepas saat callback sudah menunggu di thread pool
+        pending = asyncio.ensure_future(in_thread_pool(callback)())
+        await asyncio.sleep(0.05)
+        assert not pending.done() and queue.stats()["waiting"] == 1
+        queue.finish(running)
+        return await asyncio.wait_for(pending, timeout=5)
+
+    assert asyncio.run(click()) == "done"
+    assert ran == [True]
+    assert queue.stats()["running"] == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quakesee_web.magnitude_stats import (MAG_BIN, MIN_EVENTS_B, b_value, catalog_stats, frequency_magnitude,
+                                          mc_maxc)
+
+B_TRUE = 1.0
+M_MIN = 2.0
+
+
+def _gr_magnitudes(n, b=B_TRUE, m_min=M_MIN, dm=MAG_BIN, seed=0):
+    """Katalog Gutenberg-Richter sintetis: M >= m_min dengan b diketahui, dibulatkan ke bin dm"""
+    rng = np.random.default_rng(seed)
+    continuous = (m_min - dm / 2) + rng.exponential(np.log10(np.e) / b, n)
+    return np.round(np.round(continuous / dm) * dm, 6)
+
+
+@pytest.fixture
+def mags():
+    return _gr_magnitudes(20000)
+
+
+def test_mc_maxc_is_peak_bin_plus_correction(mags):
+    centers, counts, cumulative = frequency_magnitude(mags)
+    assert cumulative[0] == len(mags)
+    assert mc_maxc(centers, counts, correction=0.0) == pytest.approx(M_MIN)
+    assert mc_maxc(centers, counts) == pytest.approx(M_MIN + 0.2)
+
+
+def test_b_value_recovers_known_b(mags):
+    b, sigma, a, n = b_value(mags, M_MIN)
+    assert n == len(mags)
+    assert b == pytest.approx(B_TRUE, abs=0.05)
+    assert a == pytest.approx(np.log10(n) + b * M_MIN)
+
+
+def test_b_value_shi_bolt_uncertainty(mags):
+    b, sigma, _, n = b_value(mags, M_MIN)
+    above = mags[mags >= M_MIN - MAG_BIN / 2 - 1e-9]
+    expected = 2.3 * b**2 * np.sqrt(((above - above.mean()) ** 2).sum() / (n * (n - 1)))
+    assert sigma == pytest.approx(expected)
+    # Untuk data GR murni kira-kira b / sqrt(n)
+    assert sigma == pytest.approx(b / np.sqrt(n), rel=0.1)
+
+
+def test_b_value_needs_min_events(mags):
+    too_few = mags[mags >= M_MIN][:MIN_EVENTS_B - 1]
+    assert b_value(too_few, M_MIN) == (None, None, None, MIN_EVENTS_B - 1)
+    enough = np.append(too_few, M_MIN + 0.5)
+    b, sigma, a, n = b_value(enough, M_MIN)
+    assert n == MIN_EVENTS_B
+    assert b is not None and sigma > 0
+
+
+def test_b_value_ignores_events_below_mc(mags):
+    b_all, _, _, n_all = b_value(mags, M_MIN)
+    b_cut, _, _, n_cut = b_value(mags, M_MIN + 0.5)
+    assert n_cut < n_all
+    assert b_cut == pytest.approx(b_all, abs=0.1)
+
+
+def test_catalog_stats_from_dataframe(mags):
+    rng = np.random.default_rng(1)
+    seconds = rng.integers(0, 365 * 86400, len(mags))
+    times = np.datetime64("2020-01-01T00:00:00", "us") + seconds.astype("timedelta64[s]")
+    frame = pd.DataFrame(dict(time=[t + "Z" for t in np.datetime_as_string(times, unit="us")], magnitude=mags))
+
+    stats = catalog_stats(frame)
+    assert stats["events"] == len(mags)
+    assert stats["start"] == times.min()
+    assert stats["mc"] == pytest.approx(M_MIN + 0.2)
+    assert stats["b"] == pytest.approx(B_TRUE, abs=0.1)
+    assert stats["rate_counts"].sum() == len(mags)
+    assert stats["density"].sum() == len(mags)
@@ -0,0 +1,117 @@
+import io
+
+import numpy as np
+import pytest
+from obspy import Stream, Trace, UTCDateTime, read
+
+from quakesee_web.merge_engine import DEFAULT_MERGE, merge_stream
+from quakesee_web.mseed_index import LazyStream, WaveformSpool
+
+T0 = UTCDateTime(2024, 1, 1)
+
+
+def _mseed(pieces, reclen=512):
+    """pieces: (channel, offset detik, jumlah sampel) per trace, ditulis sesuai urutan"""
+    rng = np.random.default_rng(0)
+    st = Stream()
+    for channel, offset, npts in pieces:
+        data = rng.integers(-1000, 1000, npts).astype(np.int32)
+        st.append(Trace(data, header=dict(network="XX", station="A", channel=channel,
+                                          sampling_rate=100.0, starttime=T0 + offset)))
+    buffer = io.BytesIO()
+    st.write(buffer, format="MSEED", reclen=reclen)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def overlap():
+    # Tiap kanal: 60 s data lalu 60 s berikutnya yang mulai 1 s lebih awal
+    return _mseed([(f"HH{c}", offset, 6000) for c in "ZNE" for offset in (0, 59)])
+
+
+def test_traces_match_obspy(overlap):
+    lazy = LazyStream.from_bytes(overlap)
+    assert len(lazy) == len(read(io.BytesIO(overlap))) == 6
+    assert len(lazy.select(station="A", channel="HHZ")) == 2
+
+
+def test_gap_report_single_overlap(overlap):
+    report = {row["id"]: row for row in LazyStream.from_bytes(overlap).gap_report()}
+    row = report["XX.A..HHZ"]
+    assert row["segments"] == 2
+    assert row["overlaps"] == 1
+    assert row["overlap_s"] == pytest.approx(1.0)
+    assert row["gaps"] == 0
+
+
+def test_gap_report_single_gap():
+    data = _mseed([("HHZ", 0, 6000), ("HHZ", 70, 6000)])
+    (row,) = LazyStream.from_bytes(data).gap_report()
+    assert (row["segments"], row["gaps"], row["overlaps"]) == (2, 1, 0)
+    assert row["gap_s"] == pytest.approx(10.0, abs=0.01)
+
+
+def test_merge_matches_obspy(overlap):
+    merged, report = merge_stream(LazyStream.from_bytes(overlap), parallel=False, **DEFAULT_MERGE)
+    expected = read(io.BytesIO(overlap)).merge(**DEFAULT_MERGE)
+    assert len(merged) == len(expected) == 3
+    for tr in expected:
+        (ours,) = merged.select(station="A", channel=tr.stats.channel)
+        assert ours.stats.starttime == tr.stats.starttime
+        np.testing.assert_array_equal(ours.data, tr.data)
+    assert all(row["overlaps"] == 1 for row in report)
+
+
+def test_select_decodes_only_matching_records(overlap):
+    lazy = LazyStream.from_bytes(overlap)
+    st = lazy.select(channel="HHN", starttime=T0 + 100)
+    # Hanya record trace kedua (59..119 s) yang mencakup waktu tersebut
+    assert len(st) == 1
+    assert st[0].stats.channel == "HHN"
+    assert st[0].stats.starttime <= T0 + 100 <= st[0].stats.endtime
+    assert lazy.stations() == ["A"]
+    assert sorted(lazy.get_id_list()) == ["XX.A..HHE", "XX.A..HHN", "XX.A..HHZ"]
+
+
+def test_to_stream_matches_obspy(overlap):
+    ours = LazyStream.from_bytes(overlap).to_stream()
+    expected = read(io.BytesIO(overlap))
+    key = lambda tr: (tr.id, tr.stats.starttime)
+    for a, b in zip(sorted(ours, key=key), sorted(expected, key=key)):
+        assert a.id == b.id and a.stats.starttime == b.stats.starttime
+        np.testing.assert_array_equal(a.data, b.data)
+
+
+def test_mseed_write_copies_raw_records(overlap):
+    buffer = io.BytesIO()
+    LazyStream.from_bytes(overlap).write(buffer, format="MSEED")
+    assert len(buffer.getvalue()) == len(overlap)
+    assert len(read(io.BytesIO(buffer.getvalue()))) == 6
+
+
+def test_spool_opens_downloaded_data_lazily():
+    spool = WaveformSpool()
+    spool.append(read(io.BytesIO(_mseed([("HHZ", 0, 3000)]))))
+    spool.append(read(io.BytesIO(_mseed([("HHE", 0, 3000)]))))
+    lazy = spool.finalize()
+    assert isinstance(lazy, LazyStream)
+    assert sorted(lazy.get_id_list()) == ["XX.A..HHE", "XX.A..HHZ"]
+    assert WaveformSpool().finalize() is None
+
+
+def test_masked_merge_leaves_input_untouched(overlap):
+    lazy = LazyStream.from_bytes(overlap)
+    merged, _ = merge_stream(lazy, parallel=False, method=0, fill_value=None)
+    assert merged is not lazy
+    assert len(merged) == 3
+    # Objek yang sama dibagi antar sesi lewat SharedCache: tetap belum di-merge
+    assert lazy.merge_kwargs is None
+    assert len(lazy) == 6
+
+
+def test_merge_stream_leaves_obspy_stream_untouched():
+    st = read(io.BytesIO(_mseed([("HHZ", 0, 6000), ("HHZ", 60, 6000), ("HHN", 0, 6000), ("HHN", 59, 6000)])))
+    before = [(tr.id, tr.stats.starttime, tr.stats.npts) for tr in st]
+    merged, _ = merge_stream(st, parallel=False, **DEFAULT_MERGE)
+    assert len(merged) == 2
+    assert [(tr.id, tr.stats.starttime, tr.stats.npts) for tr in st] == before
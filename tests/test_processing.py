@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from obspy import read, read_inventory
+
+from quakesee_web.processing import process_stream, process_trace
+
+
+@pytest.fixture
+def stream():
+    # Data contoh ObsPy: BW.RJOB..EH? dengan inventory yang cocok
+    return read()
+
+
+def _params(**kwargs):
+    return dict(dict(detrend=None, taper=None, remove_response=None, bandpass=None), **kwargs)
+
+
+def _close(a, b):
+    np.testing.assert_allclose(a.data, b.data, rtol=1e-6, atol=1e-6 * np.abs(b.data).max())
+
+
+def test_bandpass_matches_obspy(stream):
+    tr = stream[0]
+    expected = tr.copy().filter("bandpass", freqmin=1.0, freqmax=10.0, corners=4, zerophase=True)
+    _close(process_trace(tr.copy(), _params(bandpass=(1.0, 10.0))), expected)
+
+
+def test_taper_matches_obspy(stream):
+    tr = stream[0]
+    tr.data = tr.data.astype(np.float64)
+    expected = tr.copy().taper(0.05, type="hann")
+    _close(process_trace(tr.copy(), _params(taper=0.05)), expected)
+
+
+def test_remove_response_matches_obspy(stream):
+    inventory = read_inventory()
+    tr = stream[0]
+    expected = tr.copy().remove_response(inventory=inventory, output="VEL", water_level=60, taper=False)
+    s = tr.stats
+    cha = inventory.select(network=s.network, station=s.station, channel=s.channel, time=s.starttime)[0][0][0]
+    response = ((tr.id, str(cha.start_date)), cha.response)
+    got = process_trace(tr.copy(), _params(remove_response="VEL", water_level=60.0), response)
+    _close(got, expected)
+
+
+def test_process_stream_keeps_every_trace(stream):
+    params = dict(detrend="linear", taper=0.05, remove_response="VEL", bandpass=(1.0, 10.0))
+    out = process_stream(stream, read_inventory(), params, parallel=False)
+    assert sorted(out.get_id_list()) == sorted(tr.id for tr in stream)
+    assert all(np.isfinite(tr.data).all() for tr in out.to_stream())
+
+
+def test_process_stream_reports_traces_without_response(stream):
+    inventory = read_inventory().select(channel="EHZ")
+    uncorrected = []
+    out = process_stream(stream, inventory, _params(remove_response="VEL"), parallel=False,
+                         uncorrected=uncorrected)
+    assert out.get_id_list() == ["BW.RJOB..EHZ"]
+    assert sorted(uncorrected) == ["BW.RJOB..EHE", "BW.RJOB..EHN"]
+
+
+def test_process_stream_without_response_removal_keeps_traces(stream):
+    uncorrected = []
+    out = process_stream(stream, read_inventory().select(channel="EHZ"), _params(detrend="linear"),
+                         parallel=False, uncorrected=uncorrected)
+    assert sorted(out.get_id_list()) == sorted(tr.id for tr in stream)
+    assert uncorrected == []
@@ -0,0 +1,61 @@
+import numpy as np
+from obspy import Stream, Trace, UTCDateTime
+
+from quakesee_web.record_section import envelope, record_section
+
+T0 = UTCDateTime(2024, 1, 1)
+
+
+def test_envelope_keeps_min_max_per_column():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=10000)
+    times, values = envelope(data, 0.0, 0.01, 0.0, 100.0, columns=100)
+    assert len(times) == len(values) == 200
+
+    # 100 sampel per kolom; min dan max tiap kolom bergantian
+    blocks = data.reshape(100, 100)
+    expected = np.empty(200)
+    expected[0::2] = blocks.min(axis=1)
+    expected[1::2] = blocks.max(axis=1)
+    expected -= data.mean()
+    expected /= np.abs(expected).max()
+    np.testing.assert_allclose(values, expected)
+    np.testing.assert_allclose(times, np.repeat(np.arange(100) + 0.5, 2))
+
+
+def test_envelope_short_window_keeps_samples():
+    data = np.arange(1000, dtype=np.float64)
+    times, values = envelope(data, 0.0, 0.01, 2.0, 4.0, columns=800)
+    np.testing.assert_allclose(times, 2.0 + np.arange(201) * 0.01)
+    assert np.abs(values).max() == 1.0
+    assert envelope(data, 0.0, 0.01, 20.0, 30.0) is None
+
+
+def _trace(station, npts=6000):
+    rng = np.random.default_rng(len(station))
+    return Trace(rng.normal(size=npts), header=dict(network="XX", station=station, channel="HHZ",
+                                                    sampling_rate=100.0, starttime=T0))
+
+
+def test_record_section_orders_by_distance():
+    st = Stream([_trace("FAR"), _trace("NEAR"), _trace("OTHER")])
+    distances = {("XX", "FAR"): (8.0, 890.0), ("XX", "NEAR"): (2.0, 222.0)}
+    section = record_section(st, T0, distances, columns=100, parallel=False)
+
+    assert [label[0] for label in section["labels"]] == ["XX.NEAR..HHZ", "XX.FAR..HHZ"]
+    assert section["stations"] == 2
+    assert section["distance_range"] == (2.0, 8.0)
+    # Dua trace diringkas 2 x 100 titik, dipisah NaN
+    assert len(section["x"]) == 2 * 201
+    assert np.isnan(section["x"][200]) and np.isnan(section["y"][-1])
+    first = section["y"][:200]
+    assert abs(np.abs(first - 2.0).max() - section["scale"]) < 1e-5
+
+
+def test_record_section_reduction_shifts_time():
+    st = Stream([_trace("NEAR")])
+    distances = {("XX", "NEAR"): (2.0, 240.0)}
+    plain = record_section(st, T0, distances, parallel=False)
+    reduced = record_section(st, T0, distances, reduction=8.0, parallel=False)
+    assert reduced["time_range"][0] == plain["time_range"][0] - 30.0
+    assert record_section(st, T0, {}, parallel=False) is None
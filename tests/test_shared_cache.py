@@ -0,0 +1,96 @@
+import pytest
+
+from quakesee_web import shared_cache
+from quakesee_web.shared_cache import SharedCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_put_returns_canonical_object():
+    cache = SharedCache(budget_bytes=100)
+    first = cache.put("k", ["first"], nbytes=10)
+    assert cache.put("k", ["second"], nbytes=10) is first
+    assert cache.get("k") is first
+    assert cache.nbytes == 10
+
+
+def test_evicts_unreferenced_entries_first():
+    cache = SharedCache(budget_bytes=100)
+    cache.put("a", "A", session="s1", nbytes=40)
+    cache.put("b", "B", nbytes=40)
+    cache.put("c", "C", nbytes=40)
+    # "b" tidak dirujuk sesi: dibuang dulu meski "a" lebih lama
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.nbytes == 80
+
+
+def test_budget_holds_with_referenced_entries():
+    cache = SharedCache(budget_bytes=100)
+    cache.put("a", "A", session="s1", nbytes=60)
+    cache.put("b", "B", session="s2", nbytes=60)
+    # Semua entri dirujuk sesi: yang paling lama dibuang agar anggaran tetap berlaku
+    assert "a" not in cache and "b" in cache
+    assert cache.nbytes == 60
+    cache.release("a", "s1")
+    assert cache.stats()["nbytes"] == 60
+
+
+def test_larger_than_budget_is_not_stored():
+    cache = SharedCache(budget_bytes=100)
+    cache.put("small", "S", nbytes=50)
+    value = object()
+    assert cache.put("big", value, nbytes=200) is value
+    assert "big" not in cache
+    assert "small" in cache
+
+
+def test_get_refreshes_lru_order():
+    cache = SharedCache(budget_bytes=100)
+    cache.put("a", "A", nbytes=40)
+    cache.put("b", "B", nbytes=40)
+    cache.get("a")
+    cache.put("c", "C", nbytes=40)
+    assert "a" in cache and "b" not in cache
+
+
+def test_ttl_expires_entry(clock):
+    cache = SharedCache(budget_bytes=100)
+    cache.put("recent", "R", nbytes=10, ttl=300)
+    cache.put("old", "O", nbytes=10)
+    clock[0] += 299
+    assert cache.get("recent") == "R"
+    clock[0] += 2
+    assert "recent" not in cache
+    assert cache.get("recent") is None
+    assert cache.nbytes == 10
+    # Entri kedaluwarsa diganti hasil baru
+    assert cache.put("recent", "R2", nbytes=10, ttl=300) == "R2"
+    # Tanpa ttl tidak pernah kedaluwarsa
+    clock[0] += 10**6
+    assert cache.get("old") == "O"
+
+
+def test_release_session_unpins_entries():
+    cache = SharedCache(budget_bytes=100)
+    cache.put("a", "A", session="s1", nbytes=50)
+    cache.put("b", "B", session="s1", nbytes=30)
+    cache.put("a", "A", session="s2")
+    cache.release_session("s1")
+    assert cache.stats()["sessions"] == 1
+
+    # "a" masih dirujuk s2, "b" sudah bebas
+    cache.put("c", "C", nbytes=40)
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+    cache.release_session("s2")
+    assert cache.stats()["sessions"] == 0
+    cache.put("d", "D", nbytes=40)
+    assert "a" not in cache
+    assert cache.nbytes == 80
@@ -0,0 +1,72 @@
+import numpy as np
+from obspy import Stream, Trace, UTCDateTime
+from scipy.signal import welch
+
+from quakesee_web.spectra import SpectraCache, batch_spectra, psd_summary, segment_length, stream_psd, trace_key
+
+T0 = UTCDateTime(2024, 1, 1)
+
+
+def _trace(channel, sampling_rate=100.0, npts=30000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(npts) / sampling_rate
+    data = np.sin(2 * np.pi * 2.0 * t) + 0.1 * rng.normal(size=npts)
+    return Trace(data, header=dict(network="XX", station="A", channel=channel,
+                                   sampling_rate=sampling_rate, starttime=T0))
+
+
+def test_segment_length():
+    assert segment_length(100.0, 20.0) == 2048
+    assert segment_length(1.0, 1.0) == 16
+
+
+def test_psd_matches_scipy_welch():
+    traces = [_trace("HHZ"), _trace("HHN", seed=1), _trace("BHZ", sampling_rate=40.0, npts=12000)]
+    results = batch_spectra([(tr.id, T0.timestamp, tr.stats.sampling_rate, tr.data) for tr in traces],
+                            window=20.0, overlap=0.5)
+    assert len(results) == 3
+    for tr in traces:
+        nperseg = segment_length(tr.stats.sampling_rate, 20.0)
+        freqs, psd = welch(tr.data, fs=tr.stats.sampling_rate, window="hann", nperseg=nperseg,
+                           noverlap=nperseg // 2, detrend="constant", scaling="density")
+        result = results[trace_key(tr.id, T0.timestamp, tr.stats.sampling_rate, tr.stats.npts, 20.0, 0.5)]
+        np.testing.assert_allclose(result["freqs"], freqs[1:])
+        np.testing.assert_allclose(result["psd_db"], 10 * np.log10(psd[1:] + 1e-30), atol=1e-3)
+        # Puncak pada frekuensi sinyal
+        assert abs(result["freqs"][np.argmax(result["psd_db"])] - 2.0) < 0.1
+
+
+def test_spectrogram_is_pooled_to_screen_size():
+    tr = _trace("HHZ", npts=200000)
+    (result,) = batch_spectra([(tr.id, T0.timestamp, 100.0, tr.data)], window=2.0, overlap=0.5,
+                              columns=50, rows=32).values()
+    assert result["spec_db"].shape == (len(result["spec_freqs"]), len(result["times"]))
+    assert len(result["times"]) <= 50 and len(result["spec_freqs"]) <= 32
+    assert np.all(np.diff(result["times"]) > 0)
+
+
+def test_short_trace_is_skipped():
+    tr = _trace("HHZ", npts=100)
+    assert batch_spectra([(tr.id, T0.timestamp, 100.0, tr.data)]) == {}
+
+
+def test_stream_psd_and_summary():
+    st = Stream([_trace("HHZ"), _trace("HHN", seed=1), _trace("HHE", seed=2)])
+    results = stream_psd(st, parallel=False)
+    assert len(results) == 3
+    summary = psd_summary(results, points=50)
+    assert sorted(summary) == ["E", "N", "Z"]
+    grid, p10, median, p90, count = summary["Z"]
+    assert len(grid) == 50 and count == 1
+    assert np.all(p10 <= median + 1e-6) and np.all(median <= p90 + 1e-6)
+
+
+def test_cache_computes_missing_traces_only():
+    st = Stream([_trace("HHZ"), _trace("HHN", seed=1)])
+    cache = SpectraCache(size=8)
+    cache.bind(st)
+    first = cache.station(st)
+    again = cache.station(st)
+    assert all(a[1] is b[1] for a, b in zip(first, again))
+    cache.bind(Stream())
+    assert cache.get(trace_key(st[0].id, T0.timestamp, 100.0, 30000, 20.0, 0.5)) is None
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from obspy import UTCDateTime
+from obspy.core.inventory import Inventory, Network, Station
+
+from quakesee_web import traveltime
+from quakesee_web.traveltime import TravelTimeTable, phase_windows
+
+DISTANCES = np.array([0.0, 10.0, 20.0, 30.0])
+DEPTHS = np.array([0.0, 100.0])
+
+
+def _small_table(model="test"):
+    # tp linier terhadap jarak dan kedalaman; S tidak ada pada 30 derajat (bayangan)
+    tp = 10.0 * DISTANCES[None, :] + 0.1 * DEPTHS[:, None]
+    ts = 1.7 * tp
+    ts[:, -1] = np.nan
+    return TravelTimeTable(model, DISTANCES, DEPTHS, tp, ts)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = _small_table()
+    monkeypatch.setitem(traveltime._tables, "test", table)
+    return table
+
+
+def test_predict_interpolates_distance_and_depth(table):
+    tp, ts = table.predict([5.0, 15.0], 50.0)
+    np.testing.assert_allclose(tp, [55.0, 155.0])
+    np.testing.assert_allclose(ts, [1.7 * 55.0, 1.7 * 155.0])
+
+    # Di luar rentang fase yang ada: NaN
+    tp, ts = table.predict([25.0, 40.0], 0.0)
+    assert tp[0] == pytest.approx(250.0) and np.isnan(tp[1])
+    assert np.isnan(ts).all()
+
+
+def test_phase_windows(table):
+    inventory = Inventory(networks=[Network("XX", stations=[
+        Station("NEAR", latitude=0.0, longitude=10.0, elevation=0.0),
+        Station("SHADOW", latitude=0.0, longitude=25.0, elevation=0.0),
+        Station("FAR", latitude=0.0, longitude=40.0, elevation=0.0),
+    ])], source="test")
+    origin = UTCDateTime(2024, 1, 1)
+    quake = dict(time=str(origin), latitude=0.0, longitude=0.0, depth=0.0)
+
+    windows = phase_windows(inventory, quake, before_p=60, after_s=120, model="test")
+    # Stasiun di luar tabel tidak mendapat jendela fase
+    assert set(windows) == {("XX", "NEAR"), ("XX", "SHADOW")}
+    start, end = windows[("XX", "NEAR")]
+    assert start - origin == pytest.approx(100.0 - 60, abs=0.5)
+    assert end - origin == pytest.approx(170.0 + 120, abs=0.5)
+    # Tanpa S dipakai perkiraan 1.8 x P
+    start, end = windows[("XX", "SHADOW")]
+    assert end - origin == pytest.approx(1.8 * 250.0 + 120, abs=1.0)
+
+
+def test_table_roundtrip_through_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delitem(traveltime._tables, "disk", raising=False)
+    saved = TravelTimeTable("disk")
+    shape = (len(saved.depths), len(saved.distances))
+    saved.tp = np.arange(np.prod(shape), dtype=np.float64).reshape(shape)
+    saved.ts = 1.7 * saved.tp
+    saved.save()
+
+    def fail(self):
+        raise AssertionError("table should be read from the cache")
+
+    monkeypatch.setattr(TravelTimeTable, "build", fail)
+    table = TravelTimeTable.load("disk")
+    np.testing.assert_array_equal(table.tp, saved.tp)
+    np.testing.assert_array_equal(table.ts, saved.ts)
+    assert TravelTimeTable.load("disk") is table
+    traveltime._tables.pop("disk")
+
+
+def test_first_table_is_built_in_background(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.delitem(traveltime._tables, "bg", raising=False)
+    started, release = threading.Event(), threading.Event()
+
+    def build(self, progress=None):
+        progress(1, len(self.depths))
+        started.set()
+        release.wait(5)
+        self.tp = np.tile(10.0 * self.distances, (len(self.depths), 1))
+        self.ts = 1.7 * self.tp
+        return self
+
+    monkeypatch.setattr(TravelTimeTable, "build", build)
+    inventory = Inventory(networks=[Network("XX", stations=[
+        Station("NEAR", latitude=0.0, longitude=10.0, elevation=0.0)])], source="test")
+    quake = dict(time=str(UTCDateTime(2024, 1, 1)), latitude=0.0, longitude=0.0, depth=0.0)
+
+    # Belum ada tabel: pemanggil tidak menunggu dan memakai jendela tetap
+    assert phase_windows(inventory, quake, model="bg") is None
+    assert started.wait(5)
+    assert traveltime.build_progress("bg") == (1, len(traveltime.DEPTHS))
+    assert phase_windows(inventory, quake, model="bg") is None
+
+    release.set()
+    for _ in range(500):
+        if traveltime.build_progress("bg") is None:
+            break
+        time.sleep(0.01)
+    assert set(phase_windows(inventory, quake, model="bg")) == {("XX", "NEAR")}
+    assert os.path.exists(TravelTimeTable("bg").path)
+    traveltime._tables.pop("bg")